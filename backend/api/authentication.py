@@ -0,0 +1,114 @@
+import hashlib
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS
+from rest_framework.authentication import TokenAuthentication
+from rest_framework.authtoken.models import Token
+
+from api.cache import LocalLRUCache
+from api.metrics import registry
+from invalidation.bus import get_model_key, invalidation_bus
+
+User = get_user_model()
+
+local_token_cache = LocalLRUCache(
+    max_size=settings.TOKEN_CACHE_MAX_SIZE,
+    ttl=settings.TOKEN_CACHE_LOCAL_TTL,
+    name="token_local",
+)
+# other workers drop their local copies once a token is invalidated
+invalidation_bus.subscribe(get_model_key(Token), local_token_cache.clear)
+registry.register_collector(
+    lambda: [
+        (
+            "foodgram_cache_entries",
+            {"cache": "token_local"},
+            len(local_token_cache),
+        )
+    ]
+)
+
+
+def get_token_cache_key(key):
+    digest = hashlib.sha256(key.encode()).hexdigest()
+    return f"auth_token_snapshot:{digest}"
+
+
+def invalidate_token(key):
+    cache_key = get_token_cache_key(key)
+    local_token_cache.delete(cache_key)
+    cache.delete(cache_key)
+    invalidation_bus.publish(get_model_key(Token))
+
+
+def invalidate_user_tokens(user):
+    for key in Token.objects.filter(user=user).values_list("key", flat=True):
+        invalidate_token(key)
+
+
+def dump_snapshot(user, token):
+    """Returns the field values of a user and their token.
+
+    The password hash is left out, so whoever can read the shared cache
+    does not get it.
+    """
+    user_fields = {
+        field.attname: getattr(user, field.attname)
+        for field in User._meta.concrete_fields
+        if field.attname != "password"
+    }
+    token_fields = {
+        field.attname: getattr(token, field.attname)
+        for field in Token._meta.concrete_fields
+    }
+    return user_fields, token_fields
+
+
+def load_snapshot(snapshot):
+    """Builds new instances from a snapshot, the password is deferred."""
+    user_fields, token_fields = snapshot
+    user = User.from_db(
+        DEFAULT_DB_ALIAS, list(user_fields), list(user_fields.values())
+    )
+    token = Token.from_db(
+        DEFAULT_DB_ALIAS, list(token_fields), list(token_fields.values())
+    )
+    token.user = user
+    return user, token
+
+
+class CachedTokenAuthentication(TokenAuthentication):
+    """TokenAuthentication that caches token->user snapshots.
+
+    Snapshots are kept in a bounded per-process LRU for
+    TOKEN_CACHE_LOCAL_TTL seconds and in the shared cache for
+    TOKEN_CACHE_TTL seconds, so most requests skip the token lookup.
+    Entries are invalidated on logout, password change and deactivation,
+    other workers clear their local copies on the next poll of the
+    invalidation bus.
+    """
+
+    def authenticate_credentials(self, key):
+        invalidation_bus.poll()
+        cache_key = get_token_cache_key(key)
+        snapshot = local_token_cache.get(cache_key)
+        if snapshot is None:
+            snapshot = cache.get(cache_key)
+            registry.inc(
+                "foodgram_cache_requests_total",
+                {
+                    "cache": "token_shared",
+                    "result": "miss" if snapshot is None else "hit",
+                },
+            )
+            if snapshot is not None:
+                local_token_cache.set(cache_key, snapshot)
+        if snapshot is None:
+            snapshot = dump_snapshot(*super().authenticate_credentials(key))
+            cache.set(cache_key, snapshot, settings.TOKEN_CACHE_TTL)
+            local_token_cache.set(cache_key, snapshot)
+        # every request gets its own instances, so that changes made
+        # to request.user never leak into the cached snapshot
+        return load_snapshot(snapshot)
@@ -0,0 +1,27 @@
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+
+from api.hashing import hash_password, verify_password
+
+User = get_user_model()
+
+
+class PooledHashingModelBackend(ModelBackend):
+    """ModelBackend that verifies passwords in the hashing pool."""
+
+    def authenticate(self, request, username=None, password=None, **kwargs):
+        if username is None:
+            username = kwargs.get(User.USERNAME_FIELD)
+        if username is None or password is None:
+            return None
+        try:
+            user = User._default_manager.get_by_natural_key(username)
+        except User.DoesNotExist:
+            # hash anyway to keep the timing of missing users the same
+            hash_password(password)
+            return None
+        if verify_password(user, password) and self.user_can_authenticate(
+            user
+        ):
+            return user
+        return None
@@ -0,0 +1,258 @@
+"""Dataset, scenarios and measurement helpers of endpoint benchmarks."""
+
+import socket
+import subprocess
+import sys
+import tracemalloc
+from base64 import b64encode
+from contextlib import contextmanager
+from io import BytesIO, StringIO
+from statistics import quantiles
+from tempfile import TemporaryDirectory
+from time import monotonic, perf_counter, sleep
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client
+from django.test.utils import (
+    CaptureQueriesContext,
+    override_settings,
+    setup_test_environment,
+    teardown_test_environment,
+)
+from django.urls import reverse
+from djoser.conf import settings as djoser_settings
+from PIL import Image
+
+from recipes.models import Ingredient, Recipe, Tag
+
+User = get_user_model()
+
+# generate_dataset options of the dataset every baseline is recorded on
+DATASET = {
+    "users": 2000,
+    "recipes_per_author": 10,
+    "authors_share": 0.2,
+    "ingredients_per_recipe": 8,
+    "favorites": 50000,
+    "cart_items": 20000,
+    "subscriptions": 20000,
+    "seed": 0,
+}
+
+# metrics that may grow by the relative threshold before it is a regression
+TIMED_METRICS = ("p50_ms", "p95_ms", "peak_kib")
+
+
+class BenchmarkError(Exception):
+    pass
+
+
+@contextmanager
+def benchmark_database(stdout, keepdb=False):
+    """Runs the block against a test database holding DATASET.
+
+    The dataset is generated unless a kept database already has it, and
+    the planner statistics are refreshed afterwards.
+    """
+    setup_test_environment()
+    old_name = connection.creation.create_test_db(
+        verbosity=0, autoclobber=True, keepdb=keepdb
+    )
+    try:
+        with TemporaryDirectory() as media_root, override_settings(
+            MEDIA_ROOT=media_root
+        ):
+            if not Recipe.objects.exists():
+                stdout.write("Generating the dataset")
+                call_command("generate_dataset", stdout=StringIO(), **DATASET)
+                with connection.cursor() as cursor:
+                    cursor.execute("ANALYZE")
+            yield
+    finally:
+        connection.creation.destroy_test_db(
+            old_name, verbosity=0, keepdb=keepdb
+        )
+        teardown_test_environment()
+
+
+def get_recipe_payload():
+    buffer = BytesIO()
+    Image.new("RGB", (64, 64), (40, 120, 200)).save(buffer, "PNG")
+    image = b64encode(buffer.getvalue()).decode()
+    return {
+        "name": "Benchmark recipe",
+        "text": "Mix everything",
+        "cooking_time": 10,
+        "image": f"data:image/png;base64,{image}",
+        "tags": list(
+            Tag.objects.order_by("pk").values_list("pk", flat=True)[:2]
+        ),
+        "ingredients": [
+            {"id": pk, "amount": 10}
+            for pk in Ingredient.objects.order_by("pk").values_list(
+                "pk", flat=True
+            )[:5]
+        ],
+    }
+
+
+def get_scenarios():
+    """Returns {name: request} for the benchmarked endpoints."""
+    user = User.objects.get(username=f"dataset{DATASET['seed']}_0")
+    token, _ = djoser_settings.TOKEN_MODEL.objects.get_or_create(user=user)
+    anonymous = Client()
+    client = Client(HTTP_AUTHORIZATION=f"Token {token}")
+    recipe = user.recipes.order_by("pk").first()
+    tag = Tag.objects.order_by("pk").first()
+    ingredient = Ingredient.objects.order_by("pk").first()
+    recipes_url = reverse("api:recipes-list")
+    recipe_url = reverse("api:recipes-detail", args=[recipe.pk])
+    payload = get_recipe_payload()
+    return {
+        "recipes-list-anonymous": lambda: anonymous.get(recipes_url),
+        "recipes-list": lambda: client.get(recipes_url),
+        "recipes-list-tag": lambda: client.get(
+            recipes_url, {"tags": tag.slug}
+        ),
+        "recipes-list-favorited": lambda: client.get(
+            recipes_url, {"is_favorited": 1}
+        ),
+        "recipes-detail": lambda: client.get(recipe_url),
+        "ingredients-search": lambda: anonymous.get(
+            reverse("api:ingredients-list"),
+            {"name": ingredient.name[:3]},
+        ),
+        "subscriptions": lambda: client.get(
+            reverse("api:subscriptions"), {"recipes_limit": 3}
+        ),
+        "download-shopping-cart": lambda: client.get(
+            reverse("api:download_shopping_cart")
+        ),
+        "recipes-create": lambda: client.post(
+            recipes_url, payload, content_type="application/json"
+        ),
+        "recipes-update": lambda: client.patch(
+            recipe_url, payload, content_type="application/json"
+        ),
+    }
+
+
+def select_scenarios(scenarios, names):
+    unknown = set(names or ()) - set(scenarios)
+    if unknown:
+        raise BenchmarkError(f"Unknown scenarios: {', '.join(unknown)}")
+    return {name: scenarios[name] for name in names or scenarios}
+
+
+def call(request):
+    """Calls the request and reads the whole response body."""
+    response = request()
+    if response.status_code >= 400:
+        raise BenchmarkError(
+            f"{response.status_code}: {response.getvalue()[:200]!r}"
+        )
+    response.getvalue()
+    return response
+
+
+def measure(request, iterations, warmup=3):
+    """Returns latency percentiles, query count and peak allocations.
+
+    Queries and allocations are measured on separate calls, so that
+    neither the query log nor tracemalloc skews the timings.
+    """
+    for _ in range(warmup):
+        call(request)
+    timings = []
+    for _ in range(iterations):
+        started_at = perf_counter()
+        call(request)
+        timings.append((perf_counter() - started_at) * 1000)
+    percentiles = quantiles(timings, n=100, method="inclusive")
+    with CaptureQueriesContext(connection) as queries:
+        call(request)
+    # the next request resets the query log, so the count is taken now
+    query_count = len(queries)
+    tracemalloc.start()
+    try:
+        call(request)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return {
+        "p50_ms": round(percentiles[49], 3),
+        "p95_ms": round(percentiles[94], 3),
+        "p99_ms": round(percentiles[98], 3),
+        "queries": query_count,
+        "peak_kib": round(peak / 1024, 1),
+    }
+
+
+def find_regressions(results, baseline, threshold, slack_ms=0):
+    """Yields descriptions of the metrics that are worse than the baseline.
+
+    Timings and allocations may exceed the baseline by `threshold` (a
+    fraction), timings by `slack_ms` more, which covers the jitter of
+    fast endpoints. Query counts are deterministic and may not grow at
+    all. Scenarios missing from the baseline are not compared.
+    """
+    for name, result in results.items():
+        expected = baseline.get(name)
+        if expected is None:
+            continue
+        for metric in TIMED_METRICS:
+            limit = expected[metric] * (1 + threshold)
+            if metric.endswith("_ms"):
+                limit += slack_ms
+            if result[metric] > limit:
+                yield (
+                    f"{name}: {metric} {result[metric]} > {limit:.3f} "
+                    f"(baseline {expected[metric]})"
+                )
+        if result["queries"] > expected["queries"]:
+            yield (
+                f"{name}: queries {result['queries']} > "
+                f"{expected['queries']}"
+            )
+
+
+class GunicornServer:
+    """Runs gunicorn.conf.py on a local port for the with block."""
+
+    def __init__(self, port, env, startup_timeout=30):
+        self.port = port
+        self.env = env
+        self.startup_timeout = startup_timeout
+        self.process = None
+
+    def __enter__(self):
+        self.process = subprocess.Popen(
+            [
+                sys.executable,
+                "-m",
+                "gunicorn",
+                "--bind",
+                f"127.0.0.1:{self.port}",
+            ],
+            cwd=settings.BASE_DIR,
+            env=self.env,
+            stdout=subprocess.DEVNULL,
+        )
+        deadline = monotonic() + self.startup_timeout
+        while monotonic() < deadline:
+            if self.process.poll() is not None:
+                raise BenchmarkError("gunicorn exited on start")
+            try:
+                socket.create_connection(("127.0.0.1", self.port)).close()
+                return self
+            except OSError:
+                sleep(0.2)
+        self.__exit__(None, None, None)
+        raise BenchmarkError("gunicorn did not start in time")
+
+    def __exit__(self, *exc_info):
+        self.process.terminate()
+        self.process.wait()
@@ -0,0 +1,63 @@
+from collections import OrderedDict
+from threading import Lock
+from time import monotonic
+
+from api.metrics import registry
+
+
+class LocalLRUCache:
+    """Thread-safe in-process LRU cache with a per-entry TTL.
+
+    Holds at most `max_size` entries; the least recently used one is
+    evicted first. Expired entries are dropped when they are read. Caches
+    with a `name` report their hits and misses to the metrics registry.
+    """
+
+    def __init__(self, max_size, ttl, name=None):
+        self.max_size = max_size
+        self.ttl = ttl
+        self.name = name
+        self._data = OrderedDict()
+        self._lock = Lock()
+
+    def get(self, key, default=None):
+        value = self._get(key, default)
+        if self.name is not None:
+            registry.inc(
+                "foodgram_cache_requests_total",
+                {
+                    "cache": self.name,
+                    "result": "miss" if value is default else "hit",
+                },
+            )
+        return value
+
+    def _get(self, key, default):
+        with self._lock:
+            try:
+                expires_at, value = self._data[key]
+            except KeyError:
+                return default
+            if expires_at <= monotonic():
+                del self._data[key]
+                return default
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = (monotonic() + self.ttl, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
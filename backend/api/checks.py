@@ -0,0 +1,24 @@
+from django.conf import settings
+from django.core.cache import DEFAULT_CACHE_ALIAS, caches
+from django.core.cache.backends.dummy import DummyCache
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.checks import Error, Tags, register
+
+
+@register(Tags.caches)
+def check_read_your_writes_cache(app_configs, **kwargs):
+    """Read-your-writes markers must be seen by every worker process."""
+    if not settings.DATABASE_REPLICAS or not settings.READ_YOUR_WRITES_SECONDS:
+        return []
+    if isinstance(caches[DEFAULT_CACHE_ALIAS], (LocMemCache, DummyCache)):
+        return [
+            Error(
+                "Read replicas need a default cache shared by all workers.",
+                hint=(
+                    "Set DJANGO_CACHE_BACKEND and DJANGO_CACHE_LOCATION, "
+                    "e.g. to the database cache."
+                ),
+                id="api.E001",
+            )
+        ]
+    return []
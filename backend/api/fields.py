@@ -0,0 +1,161 @@
+from django.core.files.uploadedfile import UploadedFile
+from django.core.validators import ValidationError as DjangoValidationError
+from django.utils import timezone
+from drf_extra_fields.fields import Base64ImageField
+from rest_framework import serializers
+from rest_framework.relations import MANY_RELATION_KWARGS
+
+from api.uploads import ChunkedUploadedFile, UnknownFileType
+from recipes.models import ImageUpload
+from recipes.storage import recipe_image_storage
+
+
+class RecipeImageField(Base64ImageField):
+    """Image field that accepts three kinds of input.
+
+    - a base64 encoded string, as sent by the frontend;
+    - a file from a multipart/form-data request, spooled to disk;
+    - `upload:<token>` referencing a completed chunked upload.
+    """
+
+    upload_token_prefix = "upload:"
+    default_error_messages = {
+        "invalid_upload": "Upload does not exist or is not completed.",
+    }
+
+    def to_internal_value(self, data):
+        if isinstance(data, UploadedFile):
+            return serializers.ImageField.to_internal_value(self, data)
+        if isinstance(data, str) and data.startswith(self.upload_token_prefix):
+            return self.get_uploaded_image(
+                data.removeprefix(self.upload_token_prefix)
+            )
+        return super().to_internal_value(data)
+
+    def get_uploaded_image(self, token):
+        try:
+            upload = ImageUpload.objects.get(
+                token=token,
+                user=self.context["request"].user,
+                expires_at__gt=timezone.now(),
+            )
+        except (ImageUpload.DoesNotExist, DjangoValidationError):
+            self.fail("invalid_upload")
+        if not upload.completed:
+            self.fail("invalid_upload")
+        try:
+            image = ChunkedUploadedFile(upload)
+        except UnknownFileType:
+            self.fail("invalid_image")
+        try:
+            return serializers.ImageField.to_internal_value(self, image)
+        except serializers.ValidationError:
+            image.close()
+            raise
+
+
+class ImageVariantsField(serializers.Field):
+    """Represents the resized variants of an image as absolute URLs.
+
+    Returns {"thumbnail": {"webp": url, "jpeg": url}, ...} or an empty
+    object while the variants are still being rendered.
+    """
+
+    def __init__(self, **kwargs):
+        kwargs["read_only"] = True
+        super().__init__(**kwargs)
+
+    def to_representation(self, variants):
+        request = self.context.get("request")
+        storage = recipe_image_storage()
+        representation = {}
+        for variant, formats in variants.items():
+            if variant == "source":
+                continue
+            representation[variant] = {}
+            for extension, name in formats.items():
+                url = storage.url(name)
+                if request is not None:
+                    url = request.build_absolute_uri(url)
+                representation[variant][extension] = url
+        return representation
+
+
+class BulkManyRelatedField(serializers.ManyRelatedField):
+    def to_internal_value(self, data):
+        if isinstance(data, list):
+            self.child_relation.prefetch(data)
+        return super().to_internal_value(data)
+
+
+class BulkPrimaryKeyRelatedField(serializers.PrimaryKeyRelatedField):
+    """Primary key field that resolves a list of keys with one query.
+
+    The keys are fetched by prefetch(), called by BulkManyRelatedField or
+    by a parent list serializer. Keys that were not found fall back to the
+    regular lookup, so validation errors stay the same.
+    """
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self.objects = {}
+
+    @classmethod
+    def many_init(cls, *args, **kwargs):
+        list_kwargs = {"child_relation": cls(*args, **kwargs)}
+        for key in kwargs:
+            if key in MANY_RELATION_KWARGS:
+                list_kwargs[key] = kwargs[key]
+        return BulkManyRelatedField(**list_kwargs)
+
+    @staticmethod
+    def to_pk(data):
+        if isinstance(data, int) and not isinstance(data, bool):
+            return data
+        if isinstance(data, str) and data.isdigit():
+            return int(data)
+        return None
+
+    def prefetch(self, keys):
+        pks = {self.to_pk(key) for key in keys} - {None}
+        self.objects = self.get_queryset().in_bulk(pks)
+
+    def to_internal_value(self, data):
+        instance = self.objects.get(self.to_pk(data))
+        if instance is not None:
+            return instance
+        return super().to_internal_value(data)
+
+
+class ReferencePrimaryKeyRelatedField(BulkPrimaryKeyRelatedField):
+    """Bulk primary key field resolving tags or ingredients in memory.
+
+    Keys are looked up in the reference data of the table, keys missing
+    from it fall back to the regular lookup.
+    """
+
+    def __init__(self, reference, **kwargs):
+        self.reference = reference
+        kwargs.setdefault("queryset", reference.model.objects.all())
+        super().__init__(**kwargs)
+
+    def prefetch(self, keys):
+        by_id = self.reference.get().by_id
+        pks = {self.to_pk(key) for key in keys} - {None}
+        self.objects = {pk: by_id[pk].to_model() for pk in pks if pk in by_id}
+
+
+class ReferenceAttributeField(serializers.ReadOnlyField):
+    """Reads an attribute of a related tag or ingredient in memory.
+
+    `source` points to the foreign key column, the related row is looked
+    up in the reference data instead of being joined.
+    """
+
+    def __init__(self, reference, attribute, **kwargs):
+        self.reference = reference
+        self.attribute = attribute
+        super().__init__(**kwargs)
+
+    def to_representation(self, pk):
+        return getattr(self.reference.lookup(pk), self.attribute)
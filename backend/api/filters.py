@@ -1,23 +1,36 @@
 import django_filters
+from django import forms
+from django.conf import settings
+from django.db.models import Case, IntegerField, When
+from rest_framework.exceptions import ValidationError
 
-from recipes.models import Ingredient, Recipe
+from recipes.models import Recipe
+from recipes.reference import reference_tags
 
 
-class IngredientFilter(django_filters.FilterSet):
-    name = django_filters.Filter(method="filter_name")
+def filter_ingredients_by_name(ingredients, value):
+    """Ingredients whose name contains value, ignoring the case."""
+    value = value.upper()
+    return [
+        ingredient
+        for ingredient in ingredients
+        if value in ingredient.name.upper()
+    ]
 
-    class Meta:
-        model = Ingredient
-        fields = ["name"]
 
-    def filter_name(self, queryset, name, value):
-        return queryset.filter(name__startswith=value) | queryset.filter(
-            name__icontains=value
-        )
+def get_tag_choices():
+    return [(slug, slug) for slug in reference_tags.get().by_slug]
+
+
+class IdListFilter(django_filters.BaseInFilter):
+    field_class = forms.IntegerField
 
 
 class RecipeFilter(django_filters.FilterSet):
-    tags = django_filters.AllValuesMultipleFilter(field_name="tags__slug")
+    ids = IdListFilter(method="filter_ids")
+    tags = django_filters.MultipleChoiceFilter(
+        choices=get_tag_choices, method="filter_tags"
+    )
     is_in_shopping_cart = django_filters.NumberFilter(
         method="filter_is_in_shopping_cart"
     )
@@ -25,7 +38,19 @@ class RecipeFilter(django_filters.FilterSet):
 
     class Meta:
         model = Recipe
-        fields = ["tags", "author", "is_in_shopping_cart", "is_favorited"]
+        fields = [
+            "ids",
+            "tags",
+            "author",
+            "is_in_shopping_cart",
+            "is_favorited",
+        ]
+
+    def filter_tags(self, queryset, name, value):
+        by_slug = reference_tags.get().by_slug
+        return queryset.filter(
+            tags__in=[by_slug[slug].id for slug in value]
+        ).distinct()
 
     def filter_is_favorited(self, queryset, name, value):
         if value:
@@ -36,3 +61,28 @@ class RecipeFilter(django_filters.FilterSet):
         if value:
             return queryset.filter(is_in_shopping_cart=True)
         return queryset
+
+    def filter_ids(self, queryset, name, value):
+        """Recipes with the given ids, in the order they were requested.
+
+        Repeated ids are returned once, missing ones are skipped.
+        """
+        ids = list(dict.fromkeys(value))
+        if len(ids) > settings.RECIPE_BATCH_MAX_SIZE:
+            raise ValidationError(
+                {
+                    name: [
+                        "No more than "
+                        f"{settings.RECIPE_BATCH_MAX_SIZE} ids are allowed."
+                    ]
+                }
+            )
+        return queryset.filter(pk__in=ids).order_by(
+            Case(
+                *[
+                    When(pk=pk, then=position)
+                    for position, pk in enumerate(ids)
+                ],
+                output_field=IntegerField(),
+            )
+        )
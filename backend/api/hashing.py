@@ -0,0 +1,118 @@
+"""Bounded executor for password hashing and verification.
+
+PBKDF2 is CPU bound and releases the GIL, so a burst of logins can use
+up every CPU of a host. All hashing goes through a small thread pool,
+which caps hashing concurrency separately from request concurrency.
+When too many hashes are pending, new ones are rejected with 503.
+"""
+
+from concurrent.futures import ThreadPoolExecutor
+from threading import Lock
+from time import perf_counter
+
+from django.conf import settings
+from django.contrib.auth.hashers import check_password, make_password
+from rest_framework.exceptions import APIException
+
+from api.metrics import registry
+
+
+class HashingOverloaded(APIException):
+    status_code = 503
+    default_detail = "Too many authentication requests, try again later."
+    default_code = "hashing_overloaded"
+
+
+class PasswordHashingPool:
+    def __init__(self, max_workers, max_pending):
+        self.max_pending = max_pending
+        self._executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix="password-hashing"
+        )
+        self._lock = Lock()
+        self.pending = 0
+        self.completed = 0
+        self.rejected = 0
+        self.wait_seconds = 0.0
+        self.hash_seconds = 0.0
+
+    def run(self, func, *args):
+        with self._lock:
+            if self.pending >= self.max_pending:
+                self.rejected += 1
+                raise HashingOverloaded
+            self.pending += 1
+        submitted_at = perf_counter()
+        try:
+            return self._executor.submit(
+                self._timed, submitted_at, func, *args
+            ).result()
+        finally:
+            with self._lock:
+                self.pending -= 1
+                self.completed += 1
+
+    def _timed(self, submitted_at, func, *args):
+        started_at = perf_counter()
+        try:
+            return func(*args)
+        finally:
+            with self._lock:
+                self.wait_seconds += started_at - submitted_at
+                self.hash_seconds += perf_counter() - started_at
+
+    def stats(self):
+        with self._lock:
+            return {
+                "queue_depth": self.pending,
+                "completed": self.completed,
+                "rejected": self.rejected,
+                "wait_seconds": self.wait_seconds,
+                "hash_seconds": self.hash_seconds,
+            }
+
+
+hashing_pool = PasswordHashingPool(
+    max_workers=settings.PASSWORD_HASHING_WORKERS,
+    max_pending=settings.PASSWORD_HASHING_MAX_PENDING,
+)
+registry.register_collector(
+    lambda: [
+        (f"foodgram_password_hashing_{name}", {}, value)
+        for name, value in hashing_pool.stats().items()
+    ]
+)
+
+
+def hash_password(password):
+    return hashing_pool.run(make_password, password)
+
+
+def set_password(user, password):
+    """Runs user.set_password in the pool.
+
+    The user is left to be saved by the caller, whose save() then runs
+    the password_changed hooks of the password validators.
+    """
+    hashing_pool.run(user.set_password, password)
+
+
+def _verify(password, encoded):
+    needs_update = []
+    is_correct = check_password(password, encoded, needs_update.append)
+    return is_correct, bool(needs_update)
+
+
+def verify_password(user, password):
+    """Checks a user's password off the request thread.
+
+    Mirrors AbstractBaseUser.check_password, including the hash upgrade
+    when the stored hash uses outdated parameters.
+    """
+    is_correct, needs_update = hashing_pool.run(
+        _verify, password, user.password
+    )
+    if needs_update:
+        set_password(user, password)
+        user.save(update_fields=["password"])
+    return is_correct
@@ -0,0 +1,111 @@
+"""Plan checks of the index audit.
+
+Every SELECT an endpoint runs is explained and the plan is searched for
+full scans and sorts of large tables. PostgreSQL plans are read from
+EXPLAIN (FORMAT JSON), SQLite ones from EXPLAIN QUERY PLAN.
+"""
+
+import json
+import re
+
+from django.apps import apps
+
+SQLITE_ACCESS = re.compile(
+    r"^(?P<kind>SCAN|SEARCH) (?P<table>\w+)(?: AS \w+)?"
+    r"(?P<index> USING (?:COVERING |INTEGER PRIMARY KEY|INDEX|ROWID))?"
+)
+SQLITE_SORT = "USE TEMP B-TREE FOR ORDER BY"
+TABLE_ALIAS = re.compile(r'"(\w+)" (?:AS )?"?([A-Z]\d+)"?\b')
+
+
+class SelectRecorder:
+    """Execute wrapper keeping the SELECT statements and their params."""
+
+    def __init__(self):
+        self.statements = []
+
+    def __call__(self, execute, sql, params, many, context):
+        if not many and sql.lstrip()[:6].upper() == "SELECT":
+            self.statements.append((sql, params))
+        return execute(sql, params, many, context)
+
+
+def get_table_sizes():
+    return {
+        model._meta.db_table: model._base_manager.count()
+        for model in apps.get_models()
+        if model._meta.managed and not model._meta.proxy
+    }
+
+
+def explain(connection, sql, params):
+    """Returns the plan problems as [(problem, table, rows)].
+
+    rows is the table size for a scan and the number of sorted rows for
+    a sort, None when the database does not report it.
+    """
+    with connection.cursor() as cursor:
+        if connection.vendor == "postgresql":
+            cursor.execute(f"EXPLAIN (FORMAT JSON) {sql}", params)
+            plan = cursor.fetchone()[0]
+            if isinstance(plan, str):
+                plan = json.loads(plan)
+            return list(walk_postgresql_plan(plan[0]["Plan"]))
+        cursor.execute(f"EXPLAIN QUERY PLAN {sql}", params)
+        details = [row[-1] for row in cursor.fetchall()]
+    return parse_sqlite_plan(details, get_aliases(sql))
+
+
+def walk_postgresql_plan(node):
+    if node["Node Type"] == "Seq Scan":
+        yield "sequential scan", node["Relation Name"], None
+    elif node["Node Type"] == "Sort":
+        tables = sorted(set(get_relation_names(node)))
+        yield "sort", ", ".join(tables), node["Plan Rows"]
+    for child in node.get("Plans", ()):
+        yield from walk_postgresql_plan(child)
+
+
+def get_relation_names(node):
+    if "Relation Name" in node:
+        yield node["Relation Name"]
+    for child in node.get("Plans", ()):
+        yield from get_relation_names(child)
+
+
+def get_aliases(sql):
+    """Maps the table aliases of Django subqueries, like U0, to tables."""
+    return {alias: table for table, alias in TABLE_ALIAS.findall(sql)}
+
+
+def parse_sqlite_plan(details, aliases=None):
+    """Returns the problems of EXPLAIN QUERY PLAN detail lines.
+
+    SQLite does not estimate row counts, so a temporary sort is reported
+    against the table the query starts from and only when that table is
+    read in full.
+    """
+    aliases = aliases or {}
+    problems = []
+    outer_scan = None
+    for position, detail in enumerate(details):
+        match = SQLITE_ACCESS.match(detail)
+        if match:
+            table = aliases.get(match["table"], match["table"])
+            full_scan = match["kind"] == "SCAN" and not match["index"]
+            if full_scan and table != "CONSTANT":
+                problems.append(("sequential scan", table, None))
+            if position == 0 and full_scan:
+                outer_scan = table
+        elif detail.startswith(SQLITE_SORT) and outer_scan:
+            problems.append(("sort", outer_scan, None))
+    return problems
+
+
+def find_problems(problems, table_sizes, min_rows):
+    """Filters the problems down to the ones on large tables."""
+    for problem, table, rows in problems:
+        if rows is None:
+            rows = table_sizes.get(table, 0)
+        if rows >= min_rows:
+            yield problem, table, rows
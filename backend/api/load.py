@@ -0,0 +1,112 @@
+"""HTTP load generation against a running server.
+
+Requests are written over raw asyncio connections, one connection per
+request, so a single process can keep hundreds of clients in flight and
+can imitate clients on slow links.
+"""
+
+import asyncio
+from statistics import quantiles
+from time import perf_counter
+
+
+async def fetch(host, port, path, headers=None, send_delay=0.0):
+    """Sends a GET request and returns (status, seconds).
+
+    With send_delay the request is written one header line at a time,
+    pausing after every line like a client on a slow link.
+    """
+    started_at = perf_counter()
+    reader, writer = await asyncio.open_connection(host, port)
+    try:
+        lines = [
+            f"GET {path} HTTP/1.1",
+            f"Host: {host}",
+            "Connection: close",
+            *(f"{name}: {value}" for name, value in (headers or {}).items()),
+        ]
+        for line in lines:
+            writer.write(f"{line}\r\n".encode())
+            await writer.drain()
+            if send_delay:
+                await asyncio.sleep(send_delay)
+        writer.write(b"\r\n")
+        await writer.drain()
+        response = await reader.read()
+    finally:
+        writer.close()
+    status = int(response.split(b" ", 2)[1]) if response else 0
+    return status, perf_counter() - started_at
+
+
+async def run_load(
+    host,
+    port,
+    requests,
+    concurrency,
+    duration,
+    slow_clients=0,
+    slow_delay=0.5,
+    timeout=10.0,
+):
+    """Runs fast and slow clients for duration seconds.
+
+    requests is a list of (path, headers) the fast clients cycle
+    through. Slow clients send the first request of the list with
+    slow_delay seconds between header lines. Only fast clients are
+    measured: a request fails on an error status, a connection error or
+    after timeout seconds.
+    """
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + duration
+    latencies = []
+    failures = 0
+
+    async def fast_client(offset):
+        nonlocal failures
+        sent = offset
+        while loop.time() < deadline:
+            path, headers = requests[sent % len(requests)]
+            sent += 1
+            try:
+                status, latency = await asyncio.wait_for(
+                    fetch(host, port, path, headers), timeout
+                )
+            except (OSError, asyncio.TimeoutError, ValueError):
+                failures += 1
+                continue
+            if status >= 400:
+                failures += 1
+            else:
+                latencies.append(latency)
+
+    async def slow_client():
+        path, headers = requests[0]
+        while loop.time() < deadline:
+            try:
+                await fetch(host, port, path, headers, send_delay=slow_delay)
+            except (OSError, ValueError):
+                await asyncio.sleep(slow_delay)
+
+    started_at = loop.time()
+    await asyncio.gather(
+        *(fast_client(offset) for offset in range(concurrency)),
+        *(slow_client() for _ in range(slow_clients)),
+    )
+    elapsed = loop.time() - started_at
+    return summarize(latencies, failures, elapsed)
+
+
+def summarize(latencies, failures, elapsed):
+    result = {
+        "requests": len(latencies),
+        "failures": failures,
+        "rps": len(latencies) / elapsed,
+        "p50_ms": None,
+        "p95_ms": None,
+    }
+    if len(latencies) > 1:
+        percentiles = quantiles(latencies, n=100, method="inclusive")
+        result["p50_ms"] = percentiles[49] * 1000
+        result["p95_ms"] = percentiles[94] * 1000
+    return result
@@ -0,0 +1,93 @@
+from django.core.management.base import (
+    BaseCommand,
+    CommandError,
+    CommandParser,
+)
+from django.db import connection, transaction
+
+from api.benchmarks import (
+    BenchmarkError,
+    benchmark_database,
+    call,
+    get_scenarios,
+    select_scenarios,
+)
+from api.index_audit import (
+    SelectRecorder,
+    explain,
+    find_problems,
+    get_table_sizes,
+)
+from api.slow_queries import normalize
+
+
+class Command(BaseCommand):
+    help = "Explain the queries of API endpoints and flag missing indexes"
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument(
+            "--min-rows",
+            type=int,
+            default=3000,
+            help="Scans and sorts of fewer rows are not reported",
+        )
+        parser.add_argument(
+            "--scenario",
+            action="append",
+            dest="scenarios",
+            help="Audit only the named scenario, may be repeated",
+        )
+        parser.add_argument(
+            "--keepdb",
+            action="store_true",
+            help="Keep the benchmark database and its dataset between runs",
+        )
+
+    def handle(self, *args, **options):
+        """Runs every benchmark scenario once and explains its SELECTs.
+
+        The scenarios run against the benchmark dataset, so the planner
+        sees realistic table sizes. The command fails when a plan reads
+        or sorts a table of at least --min-rows rows without an index.
+        """
+        with benchmark_database(self.stdout, options["keepdb"]):
+            findings = self.audit(options)
+        if findings:
+            raise CommandError(
+                "Plans without a usable index:\n" + "\n".join(findings)
+            )
+        self.stdout.write(self.style.SUCCESS("No problems found"))
+
+    def audit(self, options):
+        try:
+            scenarios = select_scenarios(get_scenarios(), options["scenarios"])
+        except BenchmarkError as e:
+            raise CommandError(e)
+        table_sizes = get_table_sizes()
+        findings = []
+        for name, request in scenarios.items():
+            self.stdout.write(f"Auditing {name}")
+            recorder = SelectRecorder()
+            with transaction.atomic():
+                try:
+                    with connection.execute_wrapper(recorder):
+                        call(request)
+                except BenchmarkError as e:
+                    raise CommandError(f"{name} failed with {e}")
+                explained = set()
+                for sql, params in recorder.statements:
+                    if normalize(sql) in explained:
+                        continue
+                    explained.add(normalize(sql))
+                    problems = find_problems(
+                        explain(connection, sql, params),
+                        table_sizes,
+                        options["min_rows"],
+                    )
+                    for problem, table, rows in problems:
+                        findings.append(
+                            f"{name}: {problem} of {table} ({rows} rows)\n"
+                            f"  {normalize(sql)}"
+                        )
+                transaction.set_rollback(True)
+        return findings
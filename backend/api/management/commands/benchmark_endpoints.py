@@ -0,0 +1,140 @@
+import json
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import (
+    BaseCommand,
+    CommandError,
+    CommandParser,
+)
+from django.db import connection, transaction
+
+from api.benchmarks import (
+    DATASET,
+    BenchmarkError,
+    benchmark_database,
+    find_regressions,
+    get_scenarios,
+    measure,
+    select_scenarios,
+)
+
+
+class Command(BaseCommand):
+    help = "Benchmark API endpoints and compare them to a baseline"
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument(
+            "--baseline",
+            type=Path,
+            default=settings.BASE_DIR / "benchmarks" / "baseline.json",
+            help="Path to the baseline JSON",
+        )
+        parser.add_argument(
+            "--save-baseline",
+            action="store_true",
+            help="Record the results as the new baseline",
+        )
+        parser.add_argument(
+            "--threshold",
+            type=float,
+            default=0.5,
+            help="Allowed relative slowdown before a metric fails",
+        )
+        parser.add_argument(
+            "--slack-ms",
+            type=float,
+            default=10,
+            help="Allowed absolute slowdown of the timings on top of "
+            "--threshold",
+        )
+        parser.add_argument("--iterations", type=int, default=50)
+        parser.add_argument(
+            "--scenario",
+            action="append",
+            dest="scenarios",
+            help="Run only the named scenario, may be repeated",
+        )
+        parser.add_argument(
+            "--keepdb",
+            action="store_true",
+            help="Keep the benchmark database and its dataset between runs",
+        )
+
+    def handle(self, *args, **options):
+        """Runs every scenario against a dedicated test database.
+
+        The database is filled by generate_dataset with fixed options, so
+        results are comparable between runs on the same machine. Writes
+        are rolled back after each scenario.
+        """
+        with benchmark_database(self.stdout, options["keepdb"]):
+            results = self.run_scenarios(options)
+        self.report(results, options)
+
+    def run_scenarios(self, options):
+        try:
+            scenarios = select_scenarios(get_scenarios(), options["scenarios"])
+        except BenchmarkError as e:
+            raise CommandError(e)
+        results = {}
+        for name, request in scenarios.items():
+            self.stdout.write(f"Running {name}")
+            with transaction.atomic():
+                try:
+                    results[name] = measure(request, options["iterations"])
+                except BenchmarkError as e:
+                    raise CommandError(f"{name} failed with {e}")
+                transaction.set_rollback(True)
+        return results
+
+    def report(self, results, options):
+        self.stdout.write(
+            f"{'scenario':<26}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}"
+            f"{'queries':>9}{'peak KiB':>10}"
+        )
+        for name, result in results.items():
+            self.stdout.write(
+                f"{name:<26}{result['p50_ms']:>10.2f}"
+                f"{result['p95_ms']:>10.2f}{result['p99_ms']:>10.2f}"
+                f"{result['queries']:>9}{result['peak_kib']:>10.1f}"
+            )
+        environment = {"database": connection.vendor, "dataset": DATASET}
+        if options["save_baseline"]:
+            options["baseline"].parent.mkdir(parents=True, exist_ok=True)
+            options["baseline"].write_text(
+                json.dumps(
+                    {"environment": environment, "results": results},
+                    indent=2,
+                )
+                + "\n"
+            )
+            self.stdout.write(
+                self.style.SUCCESS(f"Baseline saved to {options['baseline']}")
+            )
+            return
+        try:
+            baseline = json.loads(options["baseline"].read_text())
+        except FileNotFoundError:
+            raise CommandError(
+                f"No baseline at {options['baseline']}, record one on "
+                "the code to compare against with --save-baseline"
+            )
+        if baseline["environment"] != environment:
+            raise CommandError(
+                "The baseline was recorded on a different database or "
+                "dataset, record a new one with --save-baseline"
+            )
+        regressions = list(
+            find_regressions(
+                results,
+                baseline["results"],
+                options["threshold"],
+                options["slack_ms"],
+            )
+        )
+        if regressions:
+            raise CommandError(
+                "Performance regressions:\n" + "\n".join(regressions)
+            )
+        self.stdout.write(self.style.SUCCESS("No regressions"))
@@ -0,0 +1,170 @@
+import asyncio
+import os
+from statistics import mean
+from threading import Event, Thread
+
+from django.core.management.base import (
+    BaseCommand,
+    CommandError,
+    CommandParser,
+)
+from django.db import connection
+from django.db.models import Count
+from django.urls import reverse
+
+from api.benchmarks import BenchmarkError, GunicornServer, benchmark_database
+from api.load import run_load
+from recipes.models import Recipe
+
+
+class TransactionSampler:
+    """Samples the transaction rate of the database in a thread.
+
+    Django runs every query outside atomic blocks in a transaction of
+    its own, so the rate is close to the query rate of the servers.
+    """
+
+    def __init__(self, interval):
+        self.interval = interval
+        self.rates = []
+        self._stopped = Event()
+        self._thread = Thread(target=self._run, name="transaction-sampler")
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stopped.set()
+        self._thread.join()
+
+    def _run(self):
+        try:
+            previous = self.count_transactions()
+            while not self._stopped.wait(self.interval):
+                current = self.count_transactions()
+                self.rates.append((current - previous) / self.interval)
+                previous = current
+        finally:
+            connection.close()
+
+    def count_transactions(self):
+        with connection.cursor() as cursor:
+            # statistics are otherwise cached for the whole transaction
+            cursor.execute("SELECT pg_stat_clear_snapshot()")
+            cursor.execute(
+                "SELECT xact_commit + xact_rollback FROM pg_stat_database "
+                "WHERE datname = current_database()"
+            )
+            return cursor.fetchone()[0]
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure the database load of hot anonymous recipe pages "
+        "while their cached responses keep expiring"
+    )
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument("--workers", type=int, default=3)
+        parser.add_argument(
+            "--concurrency",
+            type=int,
+            default=50,
+            help="Number of clients sending requests back to back",
+        )
+        parser.add_argument("--duration", type=float, default=30)
+        parser.add_argument(
+            "--ttl",
+            type=int,
+            default=2,
+            help="RESPONSE_CACHE_TTL and stale window of the cached run",
+        )
+        parser.add_argument(
+            "--interval",
+            type=float,
+            default=1,
+            help="Seconds between two samples of the transaction rate",
+        )
+        parser.add_argument("--port", type=int, default=8765)
+        parser.add_argument(
+            "--keepdb",
+            action="store_true",
+            help="Keep the benchmark database and its dataset between runs",
+        )
+
+    def handle(self, *args, **options):
+        """Runs gunicorn without and with the response cache.
+
+        The same few keys are requested by every client, so each of
+        them expires every --ttl seconds in the cached run. A flat
+        transaction rate means the expiries do not make the requests
+        waiting on them query the database. With the default local
+        memory cache every worker computes its own entries, set
+        DJANGO_CACHE_BACKEND to share them between the workers.
+        """
+        if connection.vendor != "postgresql":
+            raise CommandError("The servers need a PostgreSQL database")
+        results = {}
+        with benchmark_database(self.stdout, options["keepdb"]):
+            requests = self.get_requests()
+            for name, ttl in (("uncached", 0), ("cached", options["ttl"])):
+                self.stdout.write(f"Benchmarking {name}")
+                try:
+                    with self.run_server(ttl, options):
+                        with TransactionSampler(
+                            options["interval"]
+                        ) as sampler:
+                            results[name] = asyncio.run(
+                                run_load(
+                                    "127.0.0.1",
+                                    options["port"],
+                                    requests,
+                                    concurrency=options["concurrency"],
+                                    duration=options["duration"],
+                                )
+                            )
+                except BenchmarkError as e:
+                    raise CommandError(e)
+                results[name]["rates"] = sampler.rates
+        self.report(results)
+
+    def get_requests(self):
+        recipe = (
+            Recipe.objects.annotate(favorites_count=Count("favorites"))
+            .order_by("-favorites_count", "pk")
+            .first()
+        )
+        return [
+            (reverse("api:recipes-list"), {}),
+            (reverse("api:recipes-detail", args=[recipe.pk]), {}),
+        ]
+
+    def run_server(self, ttl, options):
+        return GunicornServer(
+            options["port"],
+            env={
+                **os.environ,
+                "GUNICORN_WORKERS": str(options["workers"]),
+                "POSTGRES_DB": connection.settings_dict["NAME"],
+                "RESPONSE_CACHE_TTL": str(ttl),
+                "RESPONSE_CACHE_STALE_SECONDS": str(ttl),
+            },
+        )
+
+    def report(self, results):
+        self.stdout.write(
+            f"{'run':<10}{'requests/s':>12}{'p95 ms':>10}"
+            f"{'db tx/s':>10}{'max tx/s':>10}{'failures':>10}"
+        )
+        for name, result in results.items():
+            rates = result["rates"] or [0]
+            self.stdout.write(
+                f"{name:<10}{result['rps']:>12.1f}"
+                f"{result['p95_ms'] or 0:>10.2f}"
+                f"{mean(rates):>10.1f}{max(rates):>10.1f}"
+                f"{result['failures']:>10}"
+            )
+        for name, result in results.items():
+            rates = " ".join(f"{rate:.0f}" for rate in result["rates"])
+            self.stdout.write(f"{name} tx/s per sample: {rates}")
@@ -0,0 +1,83 @@
+from time import perf_counter
+
+from django.core.management.base import (
+    BaseCommand,
+    CommandError,
+    CommandParser,
+)
+from django.test import Client
+from django.urls import reverse
+from rest_framework.renderers import JSONRenderer
+
+from api.benchmarks import benchmark_database
+from api.renderers import MessagePackRenderer, ORJSONRenderer
+
+RENDERERS = {
+    "json": JSONRenderer(),
+    "orjson": ORJSONRenderer(),
+    "msgpack": MessagePackRenderer(),
+}
+
+
+class Command(BaseCommand):
+    help = "Compare the throughput of the API renderers on recipe pages"
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument(
+            "--page-size",
+            type=int,
+            action="append",
+            dest="page_sizes",
+            help="Recipes per rendered page, may be repeated",
+        )
+        parser.add_argument("--iterations", type=int, default=200)
+        parser.add_argument(
+            "--keepdb",
+            action="store_true",
+            help="Keep the benchmark database and its dataset between runs",
+        )
+
+    def handle(self, *args, **options):
+        """Renders anonymous recipe list pages with every renderer.
+
+        The pages are read from the API once, so only rendering is
+        timed. orjson output has to match JSONRenderer byte for byte.
+        """
+        with benchmark_database(self.stdout, options["keepdb"]):
+            pages = {
+                size: self.get_page(size)
+                for size in options["page_sizes"] or (10, 100)
+            }
+        self.stdout.write(
+            f"{'page':>6}  {'renderer':<10}{'renders/s':>12}{'MiB/s':>10}"
+            f"{'bytes':>10}"
+        )
+        for size, data in pages.items():
+            expected = RENDERERS["json"].render(data)
+            for name, renderer in RENDERERS.items():
+                rendered = renderer.render(data)
+                if name == "orjson" and rendered != expected:
+                    raise CommandError(
+                        f"orjson output differs on a page of {size}"
+                    )
+                seconds = self.time_renderer(
+                    renderer, data, options["iterations"]
+                )
+                rate = options["iterations"] / seconds
+                self.stdout.write(
+                    f"{size:>6}  {name:<10}{rate:>12.1f}"
+                    f"{rate * len(rendered) / 2**20:>10.1f}"
+                    f"{len(rendered):>10}"
+                )
+
+    def get_page(self, size):
+        response = Client().get(reverse("api:recipes-list"), {"limit": size})
+        if response.status_code != 200:
+            raise CommandError(f"Recipe list failed: {response.status_code}")
+        return response.data
+
+    def time_renderer(self, renderer, data, iterations):
+        started_at = perf_counter()
+        for _ in range(iterations):
+            renderer.render(data)
+        return perf_counter() - started_at
@@ -0,0 +1,145 @@
+import asyncio
+import os
+from urllib.parse import urlencode
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import (
+    BaseCommand,
+    CommandError,
+    CommandParser,
+)
+from django.db import connection
+from django.urls import reverse
+from djoser.conf import settings as djoser_settings
+
+from api.benchmarks import (
+    DATASET,
+    BenchmarkError,
+    GunicornServer,
+    benchmark_database,
+)
+from api.load import run_load
+from recipes.models import Ingredient, Tag
+
+User = get_user_model()
+
+SERVER_MODES = ("wsgi", "asgi")
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare the throughput of the WSGI and the ASGI deployment "
+        "under concurrent slow clients"
+    )
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument(
+            "--mode",
+            action="append",
+            dest="modes",
+            choices=SERVER_MODES,
+            help="Benchmark only the given SERVER_MODE, may be repeated",
+        )
+        parser.add_argument("--workers", type=int, default=3)
+        parser.add_argument(
+            "--concurrency",
+            type=int,
+            default=20,
+            help="Number of clients sending requests back to back",
+        )
+        parser.add_argument(
+            "--slow-clients",
+            type=int,
+            default=20,
+            help="Number of clients sending their requests slowly",
+        )
+        parser.add_argument(
+            "--slow-delay",
+            type=float,
+            default=0.5,
+            help="Seconds a slow client waits after every header line",
+        )
+        parser.add_argument("--duration", type=float, default=20)
+        parser.add_argument("--port", type=int, default=8765)
+        parser.add_argument(
+            "--keepdb",
+            action="store_true",
+            help="Keep the benchmark database and its dataset between runs",
+        )
+
+    def handle(self, *args, **options):
+        """Runs gunicorn in every mode against the benchmark database.
+
+        The servers are separate processes, so the database has to be a
+        PostgreSQL one they can connect to. Only the fast clients are
+        measured, the slow ones hold connections open the whole time.
+        """
+        if connection.vendor != "postgresql":
+            raise CommandError("The servers need a PostgreSQL database")
+        results = {}
+        with benchmark_database(self.stdout, options["keepdb"]):
+            requests = self.get_requests()
+            for mode in options["modes"] or SERVER_MODES:
+                self.stdout.write(f"Benchmarking {mode}")
+                try:
+                    with self.run_server(mode, options):
+                        results[mode] = asyncio.run(
+                            run_load(
+                                "127.0.0.1",
+                                options["port"],
+                                requests,
+                                concurrency=options["concurrency"],
+                                duration=options["duration"],
+                                slow_clients=options["slow_clients"],
+                                slow_delay=options["slow_delay"],
+                            )
+                        )
+                except BenchmarkError as e:
+                    raise CommandError(e)
+        self.report(results)
+
+    def get_requests(self):
+        user = User.objects.get(username=f"dataset{DATASET['seed']}_0")
+        token, _ = djoser_settings.TOKEN_MODEL.objects.get_or_create(user=user)
+        auth = {"Authorization": f"Token {token}"}
+        recipe = user.recipes.order_by("pk").first()
+        tag = Tag.objects.order_by("pk").first()
+        ingredient = Ingredient.objects.order_by("pk").first()
+        recipes_url = reverse("api:recipes-list")
+        return [
+            (recipes_url, {}),
+            (f"{recipes_url}?{urlencode({'tags': tag.slug})}", auth),
+            (reverse("api:recipes-detail", args=[recipe.pk]), auth),
+            (reverse("api:tags-list"), {}),
+            (
+                # request targets must be ASCII, ingredient names are not
+                f"{reverse('api:ingredients-list')}"
+                f"?{urlencode({'name': ingredient.name[:3]})}",
+                {},
+            ),
+            (reverse("api:download_shopping_cart"), auth),
+        ]
+
+    def run_server(self, mode, options):
+        return GunicornServer(
+            options["port"],
+            env={
+                **os.environ,
+                "SERVER_MODE": mode,
+                "GUNICORN_WORKERS": str(options["workers"]),
+                "POSTGRES_DB": connection.settings_dict["NAME"],
+            },
+        )
+
+    def report(self, results):
+        self.stdout.write(
+            f"{'mode':<8}{'requests/s':>12}{'p50 ms':>10}{'p95 ms':>10}"
+            f"{'failures':>10}"
+        )
+        for mode, result in results.items():
+            self.stdout.write(
+                f"{mode:<8}{result['rps']:>12.1f}"
+                f"{result['p50_ms'] or 0:>10.2f}"
+                f"{result['p95_ms'] or 0:>10.2f}"
+                f"{result['failures']:>10}"
+            )
@@ -0,0 +1,51 @@
+import shutil
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandParser
+
+from api.slow_queries import read_entries
+
+
+class Command(BaseCommand):
+    help = "Print the slowest query fingerprints with their plans"
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument("--limit", type=int, default=10)
+        parser.add_argument(
+            "--order-by",
+            choices=("total", "max", "count"),
+            default="total",
+            help="Statistic the fingerprints are ranked by",
+        )
+        parser.add_argument(
+            "--clear",
+            action="store_true",
+            help="Delete the recorded statistics",
+        )
+
+    def handle(self, *args, **options):
+        if options["clear"]:
+            shutil.rmtree(settings.SLOW_QUERY_DIR, ignore_errors=True)
+            self.stdout.write(self.style.SUCCESS("Slow query log cleared"))
+            return
+        entries = sorted(
+            read_entries(settings.SLOW_QUERY_DIR),
+            key=lambda entry: entry[options["order_by"]],
+            reverse=True,
+        )[: options["limit"]]
+        if not entries:
+            self.stdout.write("No slow queries recorded")
+        for entry in entries:
+            self.stdout.write(
+                self.style.MIGRATE_HEADING(
+                    f"{entry['fingerprint']}  count={entry['count']} "
+                    f"total={entry['total'] * 1000:.1f}ms "
+                    f"mean={entry['total'] / entry['count'] * 1000:.1f}ms "
+                    f"max={entry['max'] * 1000:.1f}ms"
+                )
+            )
+            self.stdout.write(f"views: {', '.join(entry['views'])}")
+            self.stdout.write(entry["sql"])
+            if entry["plan"]:
+                self.stdout.write(entry["plan"])
+            self.stdout.write("")
@@ -0,0 +1,320 @@
+"""Prometheus metrics shared by all worker processes.
+
+Every process keeps its metrics in memory and a daemon thread dumps
+them to `<METRICS_DIR>/<pid>.json` every METRICS_FLUSH_INTERVAL
+seconds. A scrape merges the files, so no worker waits for another and
+requests never touch the files. Gunicorn's child_exit hook folds the
+counters and histograms of an exited worker into `archive.json`, so the
+merged totals never go down, gauges are only reported for running
+processes.
+"""
+
+import gc
+import json
+import os
+import resource
+from collections import defaultdict
+from pathlib import Path
+from threading import Lock, Thread
+from time import sleep
+
+from django.conf import settings
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+ARCHIVE_FILE = "archive.json"
+
+
+class MetricsRegistry:
+    def __init__(self, directory, flush_interval, enabled=True):
+        self.enabled = enabled
+        self.directory = Path(directory)
+        self.flush_interval = flush_interval
+        self.collectors = []
+        self._lock = Lock()
+        self._pid = None
+        self._reset()
+
+    def _reset(self):
+        self.counters = defaultdict(float)
+        self.histograms = {}
+
+    def _ensure_process(self):
+        """Starts over in a freshly forked worker."""
+        pid = os.getpid()
+        if pid == self._pid:
+            return
+        self._pid = pid
+        self._reset()
+        Thread(
+            target=self._flush_periodically, name="metrics", daemon=True
+        ).start()
+
+    def _flush_periodically(self):
+        pid = self._pid
+        while pid == os.getpid():
+            sleep(self.flush_interval)
+            if self.enabled:
+                self.flush()
+
+    def register_collector(self, collector):
+        """Registers a callable returning [(name, labels, value)] gauges."""
+        self.collectors.append(collector)
+
+    def inc(self, name, labels, amount=1):
+        if not self.enabled:
+            return
+        with self._lock:
+            self._ensure_process()
+            self.counters[(name, tuple(sorted(labels.items())))] += amount
+
+    def observe(self, name, labels, value, buckets=LATENCY_BUCKETS):
+        if not self.enabled:
+            return
+        with self._lock:
+            self._ensure_process()
+            key = (name, tuple(sorted(labels.items())))
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = {
+                    "buckets": dict.fromkeys(buckets, 0),
+                    "sum": 0.0,
+                    "count": 0,
+                }
+            for bound in buckets:
+                if value <= bound:
+                    histogram["buckets"][bound] += 1
+            histogram["sum"] += value
+            histogram["count"] += 1
+
+    def snapshot(self):
+        with self._lock:
+            self._ensure_process()
+            counters, histograms = dump(self.counters, self.histograms)
+        gauges = [
+            [name, labels, value]
+            for collector in [collect_process_gauges, *self.collectors]
+            for name, labels, value in collector()
+        ]
+        return {
+            "pid": self._pid,
+            "counters": counters,
+            "histograms": histograms,
+            "gauges": gauges,
+        }
+
+    def flush(self):
+        snapshot = self.snapshot()
+        self.directory.mkdir(parents=True, exist_ok=True)
+        write_snapshot(self.directory / f"{snapshot['pid']}.json", snapshot)
+
+    def archive(self, pid):
+        """Folds the counters and histograms of an exited process into the
+        archive and removes its file.
+
+        The archive lists the pid while the file is being removed, so a
+        concurrent scrape counts the process exactly once.
+        """
+        path = self.directory / ARCHIVE_FILE
+        snapshots = [
+            read_snapshot(path),
+            read_snapshot(self.directory / f"{pid}.json"),
+        ]
+        counters, histograms, _ = merge_snapshots(filter(None, snapshots))
+        counters, histograms = dump(counters, histograms)
+        archive = {
+            "pid": None,
+            "archived": [pid],
+            "counters": counters,
+            "histograms": histograms,
+            "gauges": [],
+        }
+        self.directory.mkdir(parents=True, exist_ok=True)
+        write_snapshot(path, archive)
+        for suffix in (".json", ".tmp"):
+            (self.directory / f"{pid}{suffix}").unlink(missing_ok=True)
+        write_snapshot(path, {**archive, "archived": []})
+
+
+def dump(counters, histograms):
+    """Converts counters and histograms to JSON serializable lists."""
+    return (
+        [
+            [name, dict(labels), value]
+            for (name, labels), value in counters.items()
+        ],
+        [
+            [
+                name,
+                dict(labels),
+                list(histogram["buckets"].items()),
+                histogram["sum"],
+                histogram["count"],
+            ]
+            for (name, labels), histogram in histograms.items()
+        ],
+    )
+
+
+def read_snapshot(path):
+    try:
+        return json.loads(path.read_text())
+    except (OSError, ValueError):
+        # the worker may be replacing its file right now
+        return None
+
+
+def write_snapshot(path, snapshot):
+    temporary_path = path.with_suffix(".tmp")
+    temporary_path.write_text(json.dumps(snapshot))
+    # readers see either the previous or the new file, never a part
+    os.replace(temporary_path, path)
+
+
+def collect_process_gauges():
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    gauges = [
+        ("process_max_resident_memory_bytes", {}, usage.ru_maxrss * 1024),
+    ]
+    try:
+        pages = int(Path("/proc/self/statm").read_text().split()[1])
+        gauges.append(
+            (
+                "process_resident_memory_bytes",
+                {},
+                pages * os.sysconf("SC_PAGE_SIZE"),
+            )
+        )
+    except (OSError, ValueError, IndexError):
+        pass
+    for generation, stats in enumerate(gc.get_stats()):
+        labels = {"generation": str(generation)}
+        gauges += [
+            ("python_gc_collections", labels, stats["collections"]),
+            ("python_gc_objects_collected", labels, stats["collected"]),
+            (
+                "python_gc_objects_uncollectable",
+                labels,
+                stats["uncollectable"],
+            ),
+        ]
+    return gauges
+
+
+def is_running(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+def merge_snapshots(snapshots):
+    """Sums counters and histograms, labels gauges with their pid."""
+    counters = defaultdict(float)
+    histograms = {}
+    gauges = []
+    snapshots = list(snapshots)
+    archived = {
+        pid for snapshot in snapshots for pid in snapshot.get("archived", ())
+    }
+    for snapshot in snapshots:
+        if snapshot["pid"] in archived:
+            continue
+        for name, labels, value in snapshot["counters"]:
+            counters[(name, tuple(sorted(labels.items())))] += value
+        for name, labels, buckets, total, count in snapshot["histograms"]:
+            key = (name, tuple(sorted(labels.items())))
+            merged = histograms.setdefault(
+                key, {"buckets": defaultdict(int), "sum": 0.0, "count": 0}
+            )
+            for bound, bucket_count in buckets:
+                merged["buckets"][bound] += bucket_count
+            merged["sum"] += total
+            merged["count"] += count
+        if snapshot["pid"] is not None and is_running(snapshot["pid"]):
+            for name, labels, value in snapshot["gauges"]:
+                gauges.append(
+                    (name, {**labels, "pid": str(snapshot["pid"])}, value)
+                )
+    return counters, histograms, gauges
+
+
+def get_cache_hit_ratios(counters):
+    requests = defaultdict(lambda: [0.0, 0.0])
+    for (name, labels), value in counters.items():
+        if name == "foodgram_cache_requests_total":
+            labels = dict(labels)
+            requests[labels["cache"]][labels["result"] == "hit"] += value
+    return [
+        ("foodgram_cache_hit_ratio", {"cache": cache}, hits / (hits + misses))
+        for cache, (misses, hits) in requests.items()
+        if hits + misses
+    ]
+
+
+def format_labels(labels):
+    if not labels:
+        return ""
+    escaped = (
+        str(value).replace("\\", "\\\\").replace('"', '\\"')
+        for value in labels.values()
+    )
+    pairs = ",".join(
+        f'{name}="{value}"' for name, value in zip(labels, escaped)
+    )
+    return f"{{{pairs}}}"
+
+
+def render(counters, histograms, gauges):
+    """Renders merged metrics in the Prometheus text format."""
+    lines = []
+    for kind, samples in (
+        ("counter", sorted(counters.items())),
+        ("gauge", sorted(gauges, key=lambda gauge: gauge[0])),
+    ):
+        declared = None
+        for item in samples:
+            if kind == "counter":
+                (name, labels), value = item
+                labels = dict(labels)
+            else:
+                name, labels, value = item
+            if name != declared:
+                lines.append(f"# TYPE {name} {kind}")
+                declared = name
+            lines.append(f"{name}{format_labels(labels)} {value}")
+    declared = None
+    for (name, labels), histogram in sorted(histograms.items()):
+        labels = dict(labels)
+        if name != declared:
+            lines.append(f"# TYPE {name} histogram")
+            declared = name
+        for bound, count in sorted(histogram["buckets"].items()):
+            bucket_labels = format_labels({**labels, "le": str(bound)})
+            lines.append(f"{name}_bucket{bucket_labels} {count}")
+        inf_labels = format_labels({**labels, "le": "+Inf"})
+        lines.append(f"{name}_bucket{inf_labels} {histogram['count']}")
+        lines.append(f"{name}_sum{format_labels(labels)} {histogram['sum']}")
+        lines.append(
+            f"{name}_count{format_labels(labels)} {histogram['count']}"
+        )
+    return "\n".join(lines) + "\n"
+
+
+def collect():
+    """Returns the metrics of all worker processes as Prometheus text."""
+    registry.flush()
+    snapshots = map(read_snapshot, registry.directory.glob("*.json"))
+    counters, histograms, gauges = merge_snapshots(filter(None, snapshots))
+    return render(
+        counters, histograms, gauges + get_cache_hit_ratios(counters)
+    )
+
+
+registry = MetricsRegistry(
+    settings.METRICS_DIR,
+    settings.METRICS_FLUSH_INTERVAL,
+    enabled=settings.METRICS_ENABLED,
+)
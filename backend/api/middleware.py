@@ -0,0 +1,274 @@
+import json
+import logging
+import random
+from contextlib import ExitStack
+from time import perf_counter
+
+from asgiref.sync import (
+    iscoroutinefunction,
+    markcoroutinefunction,
+    sync_to_async,
+)
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from rest_framework.permissions import SAFE_METHODS
+
+from api.metrics import registry
+from api.replicas import amark_write, mark_write
+
+logger = logging.getLogger(__name__)
+
+
+class QueryRecorder:
+    """Database execute wrapper counting and timing queries."""
+
+    def __init__(self):
+        self.count = 0
+        self.duration = 0.0
+        self.slowest_sql = None
+        self.slowest_duration = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        started_at = perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            duration = perf_counter() - started_at
+            self.count += 1
+            self.duration += duration
+            if duration > self.slowest_duration:
+                self.slowest_duration = duration
+                self.slowest_sql = sql
+
+
+def wrap_connections(stack, wrapper):
+    """Installs the execute wrapper on the connections of this thread."""
+    for connection in connections.all():
+        stack.enter_context(connection.execute_wrapper(wrapper))
+
+
+async def awrap_connections(stack, wrapper):
+    """Installs the execute wrapper from async code.
+
+    The async ORM runs queries in the request's thread-sensitive worker
+    thread, whose connections are not the ones of the event loop.
+    """
+    await sync_to_async(wrap_connections)(stack, wrapper)
+
+
+class RequestInstrumentationMiddleware:
+    """Reports where the time of a sampled request goes.
+
+    A sampled request gets a Server-Timing header with the time spent in
+    the database, in the view (serialization included) and in rendering.
+    Requests slower than REQUEST_INSTRUMENTATION_LOG_MS are also logged
+    as a JSON line keyed by the resolved view name. Requests that are not
+    sampled are passed through untouched, so the overhead is bounded by
+    REQUEST_INSTRUMENTATION_SAMPLE_RATE.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if settings.REQUEST_INSTRUMENTATION_SAMPLE_RATE <= 0:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.sample_rate = settings.REQUEST_INSTRUMENTATION_SAMPLE_RATE
+        self.log_threshold = settings.REQUEST_INSTRUMENTATION_LOG_MS / 1000
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if random.random() >= self.sample_rate:
+            return self.get_response(request)
+        recorder = QueryRecorder()
+        request.rendering_started_at = None
+        started_at = perf_counter()
+        with ExitStack() as stack:
+            wrap_connections(stack, recorder)
+            response = self.get_response(request)
+        return self.process_timings(request, response, recorder, started_at)
+
+    async def __acall__(self, request):
+        if random.random() >= self.sample_rate:
+            return await self.get_response(request)
+        recorder = QueryRecorder()
+        request.rendering_started_at = None
+        started_at = perf_counter()
+        with ExitStack() as stack:
+            await awrap_connections(stack, recorder)
+            response = await self.get_response(request)
+        return self.process_timings(request, response, recorder, started_at)
+
+    def process_timings(self, request, response, recorder, started_at):
+        finished_at = perf_counter()
+        timings = self.get_timings(
+            recorder,
+            started_at,
+            request.rendering_started_at or finished_at,
+            finished_at,
+        )
+        response["Server-Timing"] = ", ".join(
+            [
+                f'db;dur={timings["db"]:.2f};desc="{recorder.count} queries"',
+                *(
+                    f"{name};dur={timings[name]:.2f}"
+                    for name in ("app", "render", "total")
+                ),
+            ]
+        )
+        if timings["total"] >= self.log_threshold * 1000:
+            self.log(request, response, recorder, timings)
+        return response
+
+    def process_template_response(self, request, response):
+        # called right before the response is rendered
+        request.rendering_started_at = perf_counter()
+        return response
+
+    def get_timings(self, recorder, started_at, rendering_at, finished_at):
+        """Returns the durations of the request parts in milliseconds."""
+        total = (finished_at - started_at) * 1000
+        render = (finished_at - rendering_at) * 1000
+        db = recorder.duration * 1000
+        return {
+            "db": db,
+            "app": max(total - render - db, 0.0),
+            "render": render,
+            "total": total,
+        }
+
+    def log(self, request, response, recorder, timings):
+        match = request.resolver_match
+        logger.info(
+            json.dumps(
+                {
+                    "view": match.view_name if match else None,
+                    "method": request.method,
+                    "status": response.status_code,
+                    "queries": recorder.count,
+                    **{
+                        f"{name}_ms": round(duration, 2)
+                        for name, duration in timings.items()
+                    },
+                    "slowest_query_ms": round(
+                        recorder.slowest_duration * 1000, 2
+                    ),
+                    "slowest_query": recorder.slowest_sql,
+                }
+            )
+        )
+
+
+class MetricsMiddleware:
+    """Records latency, status and database use of every request.
+
+    Views outside the api namespace are grouped under "other" to keep the
+    number of label values bounded.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not settings.METRICS_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        recorder = QueryRecorder()
+        started_at = perf_counter()
+        with ExitStack() as stack:
+            wrap_connections(stack, recorder)
+            response = self.get_response(request)
+        self.record(request, response, recorder, started_at)
+        return response
+
+    async def __acall__(self, request):
+        recorder = QueryRecorder()
+        started_at = perf_counter()
+        with ExitStack() as stack:
+            await awrap_connections(stack, recorder)
+            response = await self.get_response(request)
+        self.record(request, response, recorder, started_at)
+        return response
+
+    def record(self, request, response, recorder, started_at):
+        duration = perf_counter() - started_at
+        match = request.resolver_match
+        view = (
+            match.view_name
+            if match and match.view_name.startswith("api:")
+            else "other"
+        )
+        registry.observe(
+            "foodgram_http_request_duration_seconds",
+            {"view": view, "method": request.method},
+            duration,
+        )
+        registry.inc(
+            "foodgram_http_responses_total",
+            {"view": view, "status": str(response.status_code)},
+        )
+        registry.inc(
+            "foodgram_db_queries_total", {"view": view}, recorder.count
+        )
+        registry.inc(
+            "foodgram_db_query_seconds_total",
+            {"view": view},
+            recorder.duration,
+        )
+
+
+class ReadYourWritesMiddleware:
+    """Keeps users that have just written reading from the primary.
+
+    DRF sets request.user to the token user, so it is known here after
+    the view has run. Failed requests are assumed to have written
+    nothing.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not settings.DATABASE_REPLICAS:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        response = self.get_response(request)
+        user_id = self.get_writer_id(request, response)
+        if user_id is not None:
+            mark_write(user_id)
+        return response
+
+    async def __acall__(self, request):
+        response = await self.get_response(request)
+        user_id = self.get_writer_id(request, response)
+        if user_id is not None:
+            await amark_write(user_id)
+        return response
+
+    def get_writer_id(self, request, response):
+        user = getattr(request, "user", None)
+        if (
+            request.method in SAFE_METHODS
+            or response.status_code >= 400
+            or user is None
+            or not user.is_authenticated
+        ):
+            return None
+        return user.pk
@@ -1,4 +1,18 @@
+from contextlib import ExitStack
+
+from asgiref.sync import (
+    iscoroutinefunction,
+    markcoroutinefunction,
+    sync_to_async,
+)
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.exceptions import ObjectDoesNotExist, ValidationError
+from django.db.models import BooleanField, Exists, OuterRef, Prefetch, Value
+from django.http import Http404
 from django.shortcuts import get_object_or_404
+from django.utils.http import urlencode
+from rest_framework import serializers
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.status import (
@@ -7,7 +21,380 @@ from rest_framework.status import (
     HTTP_400_BAD_REQUEST,
 )
 
-from recipes.models import Recipe
+from api.fields import BulkPrimaryKeyRelatedField
+from api.middleware import awrap_connections, wrap_connections
+from api.replicas import choose_replica, read_database
+from api.slow_queries import SlowQueryRecorder
+from recipes.models import Recipe, RecipeIngredientAmount, Tag
+from recipes.reference import refresh_reference_data
+
+User = get_user_model()
+
+
+class FieldSelection:
+    """Fields chosen with ?fields= and relations chosen with ?expand=.
+
+    `available` are the names the serializer offers, without `fields`
+    every one of them is included and expanded.
+    """
+
+    def __init__(self, available=(), fields=None, expand=()):
+        self.available = frozenset(available)
+        self.expand = frozenset(expand)
+        self.fields = None
+        if fields is not None:
+            self.fields = frozenset(fields) | self.expand
+
+    def includes(self, name):
+        return self.fields is None or name in self.fields
+
+    def expands(self, name):
+        return self.fields is None or name in self.expand
+
+    def get_deferred_fields(self, model):
+        """Names of the model fields behind the fields left out."""
+        return [
+            field.name
+            for field in model._meta.concrete_fields
+            if field.name in self.available
+            and not field.primary_key
+            and not self.includes(field.name)
+        ]
+
+
+ALL_FIELDS = FieldSelection()
+
+
+class SparseFieldsMixin:
+    """Lets GET requests choose the fields of the response.
+
+    `?fields=` lists the fields to return. Relations among them are
+    given as primary keys unless `?expand=` lists them as well. The
+    selection is passed to the serializer as `field_selection`, views
+    use it to defer columns and skip prefetches.
+    """
+
+    sparse_methods = ("GET", "HEAD")
+
+    def get_field_selection(self):
+        if not hasattr(self, "_field_selection"):
+            self._field_selection = self.parse_field_selection()
+        return self._field_selection
+
+    def parse_field_selection(self):
+        params = self.request.query_params
+        if self.request.method not in self.sparse_methods or (
+            "fields" not in params and "expand" not in params
+        ):
+            return ALL_FIELDS
+        serializer_class = self.get_serializer_class()
+        available = set(serializer_class().fields)
+        fields = split_names(params.get("fields", ""))
+        expand = split_names(params.get("expand", ""))
+        errors = {}
+        if fields - available:
+            errors["fields"] = [
+                f"Unknown fields: {', '.join(sorted(fields - available))}"
+            ]
+        if expand - set(serializer_class.collapsed_fields):
+            errors["expand"] = [
+                "Only these fields can be expanded: "
+                + ", ".join(serializer_class.collapsed_fields)
+            ]
+        if errors:
+            raise serializers.ValidationError(errors)
+        return FieldSelection(
+            available, fields if "fields" in params else None, expand
+        )
+
+    def get_serializer_context(self):
+        context = super().get_serializer_context()
+        context["field_selection"] = self.get_field_selection()
+        return context
+
+
+def split_names(value):
+    return {name.strip() for name in value.split(",") if name.strip()}
+
+
+class RecipeQuerysetMixin:
+    """Provides recipes annotated with the flags of the current user."""
+
+    def get_recipe_queryset(self, selection=ALL_FIELDS):
+        user = self.request.user
+        if user.is_anonymous:
+            is_favorited = Value(False, output_field=BooleanField())
+            is_in_shopping_cart = Value(False, output_field=BooleanField())
+            is_subscribed = Value(False, output_field=BooleanField())
+        else:
+            is_favorited = Exists(user.favorites.filter(recipe=OuterRef("pk")))
+            is_in_shopping_cart = Exists(
+                user.shopping_cart.filter(recipe=OuterRef("pk"))
+            )
+            is_subscribed = Exists(
+                user.subscriptions.filter(author=OuterRef("pk"))
+            )
+        # names of tags and ingredients come from the reference data
+        lookups = []
+        if selection.includes("tags"):
+            lookups.append(Prefetch("tags", queryset=Tag.objects.only("pk")))
+        if selection.expands("ingredients"):
+            lookups.append("ingredients")
+        elif selection.includes("ingredients"):
+            lookups.append(
+                Prefetch(
+                    "ingredients",
+                    queryset=RecipeIngredientAmount.objects.only(
+                        "recipe_id", "ingredient_id"
+                    ),
+                )
+            )
+        if selection.expands("author"):
+            lookups.append(
+                Prefetch(
+                    "author",
+                    queryset=User.objects.annotate(
+                        is_subscribed=is_subscribed
+                    ),
+                )
+            )
+        return (
+            Recipe.objects.prefetch_related(*lookups)
+            .defer(*selection.get_deferred_fields(Recipe))
+            .annotate(
+                is_favorited=is_favorited,
+                is_in_shopping_cart=is_in_shopping_cart,
+            )
+        )
+
+
+class SlowQueryLogMixin:
+    """Records the slow queries of the view in the slow query log."""
+
+    def get_slow_query_recorder(self, request):
+        if not settings.SLOW_QUERY_THRESHOLD_MS:
+            return None
+        match = request.resolver_match
+        return SlowQueryRecorder(
+            view=match.view_name if match else type(self).__name__
+        )
+
+    def dispatch(self, request, *args, **kwargs):
+        recorder = self.get_slow_query_recorder(request)
+        if recorder is None:
+            return super().dispatch(request, *args, **kwargs)
+        with ExitStack() as stack:
+            wrap_connections(stack, recorder)
+            return super().dispatch(request, *args, **kwargs)
+
+
+class ReplicaReadMixin:
+    """Serves GET and HEAD requests from a read replica.
+
+    The replica is chosen once authentication has run on the primary,
+    users that have written recently keep reading from the primary.
+    """
+
+    replica_methods = ("GET", "HEAD")
+
+    def initial(self, request, *args, **kwargs):
+        read_database.set(None)
+        super().initial(request, *args, **kwargs)
+        if request.method in self.replica_methods:
+            read_database.set(choose_replica(request.user))
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        read_database.set(None)
+        return super().finalize_response(request, response, *args, **kwargs)
+
+
+class ResponseCacheMixin:
+    """Serves the list and retrieve actions of anonymous users from cache.
+
+    Anonymous responses carry no per-user flags, so a single entry per
+    URL serves every anonymous client.
+    """
+
+    response_cache = None
+
+    def use_response_cache(self, request):
+        return (
+            self.response_cache is not None
+            and self.response_cache.enabled
+            and request.user.is_anonymous
+        )
+
+    def get_response_cache_key(self, request):
+        # responses hold absolute image and pagination URLs
+        query = urlencode(sorted(request.query_params.lists()), doseq=True)
+        return f"{request.scheme}://{request.get_host()}{request.path}?{query}"
+
+    def cached(self, action, request, *args, **kwargs):
+        if not self.use_response_cache(request):
+            return action(request, *args, **kwargs)
+        data = self.response_cache.get(
+            self.get_response_cache_key(request),
+            lambda: action(request, *args, **kwargs).data,
+        )
+        return Response(data)
+
+    def list(self, request, *args, **kwargs):
+        return self.cached(super().list, request, *args, **kwargs)
+
+    def retrieve(self, request, *args, **kwargs):
+        return self.cached(super().retrieve, request, *args, **kwargs)
+
+
+class AsyncResponseCacheMixin:
+    """Async actions of a ResponseCacheMixin view.
+
+    Cached requests run the sync actions in a worker thread, so waiting
+    for a response computed by another request blocks no event loop.
+    """
+
+    async def list(self, request, *args, **kwargs):
+        if not self.use_response_cache(request):
+            return await super().list(request, *args, **kwargs)
+        return await sync_to_async(ResponseCacheMixin.list)(
+            self, request, *args, **kwargs
+        )
+
+    async def retrieve(self, request, *args, **kwargs):
+        if not self.use_response_cache(request):
+            return await super().retrieve(request, *args, **kwargs)
+        return await sync_to_async(ResponseCacheMixin.retrieve)(
+            self, request, *args, **kwargs
+        )
+
+
+class AsyncViewMixin(SlowQueryLogMixin):
+    """Serves the requests that have an async handler on the event loop.
+
+    DRF dispatches synchronously, so such requests skip
+    APIView.dispatch: authentication, permissions and throttling run in
+    a worker thread, then the handler awaits the async ORM. Requests
+    without an async handler, writes for example, go through the sync
+    dispatch in a worker thread.
+    """
+
+    @classmethod
+    def as_view(cls, *args, **initkwargs):
+        return markcoroutinefunction(super().as_view(*args, **initkwargs))
+
+    def get_async_handler(self, request):
+        handler = getattr(self, request.method.lower(), None)
+        return handler if iscoroutinefunction(handler) else None
+
+    async def dispatch(self, request, *args, **kwargs):
+        handler = self.get_async_handler(request)
+        if handler is None:
+            return await sync_to_async(super().dispatch)(
+                request, *args, **kwargs
+            )
+        self.args = args
+        self.kwargs = kwargs
+        request = self.initialize_request(request, *args, **kwargs)
+        self.request = request
+        self.headers = self.default_response_headers
+        with ExitStack() as stack:
+            recorder = self.get_slow_query_recorder(request)
+            if recorder is not None:
+                await awrap_connections(stack, recorder)
+            try:
+                await sync_to_async(self.initial)(request, *args, **kwargs)
+                response = await handler(request, *args, **kwargs)
+            except Exception as exc:
+                response = self.handle_exception(exc)
+        self.response = self.finalize_response(
+            request, response, *args, **kwargs
+        )
+        return self.response
+
+
+class AsyncReadOnlyModelMixin:
+    """Async list and retrieve actions of a generic view."""
+
+    async def arefresh_reference_data(self):
+        # serializers read tags and ingredients from the reference data,
+        # which must not be loaded on the event loop
+        await sync_to_async(refresh_reference_data)()
+
+    async def afilter_queryset(self):
+        # filtersets may query the database while validating parameters
+        return await sync_to_async(self.filter_queryset)(self.get_queryset())
+
+    async def aget_object(self):
+        queryset = await self.afilter_queryset()
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        try:
+            instance = await queryset.aget(
+                **{self.lookup_field: self.kwargs[lookup_url_kwarg]}
+            )
+        except (ObjectDoesNotExist, TypeError, ValueError, ValidationError):
+            raise Http404
+        self.check_object_permissions(self.request, instance)
+        return instance
+
+    async def list(self, request, *args, **kwargs):
+        queryset = await self.afilter_queryset()
+        await self.arefresh_reference_data()
+        if self.paginator is None:
+            instances = [instance async for instance in queryset]
+            return Response(self.get_serializer(instances, many=True).data)
+        page = await self.paginator.apaginate_queryset(
+            queryset, request, view=self
+        )
+        serializer = self.get_serializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
+
+    async def retrieve(self, request, *args, **kwargs):
+        instance = await self.aget_object()
+        await self.arefresh_reference_data()
+        return Response(self.get_serializer(instance).data)
+
+
+class ReferenceDataMixin:
+    """Serves the list and retrieve actions from the reference data.
+
+    `reference` is the ReferenceTable of the model, no query is made
+    while its snapshot is current.
+    """
+
+    reference = None
+
+    def filter_records(self, records):
+        return records
+
+    def get_records(self):
+        return self.filter_records(self.reference.get().records)
+
+    def get_record(self):
+        lookup_url_kwarg = self.lookup_url_kwarg or self.lookup_field
+        pk = BulkPrimaryKeyRelatedField.to_pk(self.kwargs[lookup_url_kwarg])
+        record = self.reference.get().by_id.get(pk)
+        if record is None:
+            raise Http404
+        self.check_object_permissions(self.request, record)
+        return record
+
+    def list(self, request, *args, **kwargs):
+        records = self.get_records()
+        return Response(self.get_serializer(records, many=True).data)
+
+    def retrieve(self, request, *args, **kwargs):
+        return Response(self.get_serializer(self.get_record()).data)
+
+
+class AsyncReferenceDataMixin:
+    """Async actions of a ReferenceDataMixin view."""
+
+    async def list(self, request, *args, **kwargs):
+        records = await sync_to_async(self.get_records)()
+        return Response(self.get_serializer(records, many=True).data)
+
+    async def retrieve(self, request, *args, **kwargs):
+        record = await sync_to_async(self.get_record)()
+        return Response(self.get_serializer(record).data)
 
 
 class UserCollectionsMixin:
@@ -1,5 +1,154 @@
-from rest_framework.pagination import PageNumberPagination
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+from datetime import datetime
+
+from django.core.paginator import InvalidPage
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import replace_query_param
+
+from recipes.changes import read_changes
+from recipes.feed import read_feed
 
 
 class CustomPageNumberPagination(PageNumberPagination):
     page_size_query_param = "limit"
+
+    async def apaginate_queryset(self, queryset, request, view=None):
+        """paginate_queryset reading the count and the page asynchronously."""
+        paginator = self.django_paginator_class(
+            queryset, self.get_page_size(request)
+        )
+        paginator.count = await queryset.acount()
+        page_number = self.get_page_number(request, paginator)
+        try:
+            self.page = paginator.page(page_number)
+        except InvalidPage as exc:
+            raise NotFound(
+                self.invalid_page_message.format(
+                    page_number=page_number, message=str(exc)
+                )
+            )
+        self.page.object_list = [item async for item in self.page.object_list]
+        self.request = request
+        return self.page.object_list
+
+
+class FeedPagination(BasePagination):
+    """Keyset pagination over a user's subscription feed.
+
+    The cursor encodes the (created_at, recipe id) key of the last recipe
+    on a page, so every page is read with a single index range scan
+    instead of an OFFSET.
+    """
+
+    cursor_query_param = "cursor"
+    page_size_query_param = "limit"
+    page_size = api_settings.PAGE_SIZE
+    max_page_size = 100
+    invalid_cursor_message = "Invalid cursor"
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        limit = self.get_page_size(request)
+        keys = read_feed(
+            request.user,
+            cursor=self.decode_cursor(request),
+            limit=limit + 1,
+        )
+        self.next_key = keys[limit - 1] if len(keys) > limit else None
+        recipes = queryset.in_bulk([pk for _, pk in keys[:limit]])
+        return [recipes[pk] for _, pk in keys[:limit] if pk in recipes]
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+        except (KeyError, ValueError):
+            return self.page_size
+        return min(max(page_size, 1), self.max_page_size)
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if encoded is None:
+            return None
+        try:
+            created_at, pk = (
+                urlsafe_b64decode(encoded.encode()).decode().split("|")
+            )
+            return datetime.fromisoformat(created_at), int(pk)
+        except ValueError:
+            raise NotFound(self.invalid_cursor_message)
+
+    def encode_cursor(self, key):
+        created_at, pk = key
+        cursor = f"{created_at.isoformat()}|{pk}"
+        return urlsafe_b64encode(cursor.encode()).decode()
+
+    def get_next_link(self):
+        if self.next_key is None:
+            return None
+        return replace_query_param(
+            self.request.build_absolute_uri(),
+            self.cursor_query_param,
+            self.encode_cursor(self.next_key),
+        )
+
+    def get_paginated_response(self, data):
+        return Response(
+            {
+                "next": self.get_next_link(),
+                "results": data,
+            }
+        )
+
+
+class ChangesPagination(FeedPagination):
+    """Keyset pagination over the recipe change log.
+
+    A page lists the saved and deleted recipes after the `since` cursor
+    in the order they changed. Its cursor is returned even when the page
+    is empty, so a client stores it and asks for the changes since then.
+    """
+
+    cursor_query_param = "since"
+    page_size = 100
+    max_page_size = 1000
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.cursor = self.decode_cursor(request)
+        limit = self.get_page_size(request)
+        changes = read_changes(cursor=self.cursor, limit=limit + 1)
+        self.has_more = len(changes) > limit
+        self.changes = changes[:limit]
+        recipes = queryset.in_bulk(
+            [pk for _, pk, deleted in self.changes if not deleted]
+        )
+        return [
+            recipes[pk]
+            for _, pk, deleted in self.changes
+            if not deleted and pk in recipes
+        ]
+
+    def get_paginated_response(self, data):
+        payloads = {recipe["id"]: recipe for recipe in data}
+        if self.changes:
+            changed_at, pk, _ = self.changes[-1]
+            cursor = self.encode_cursor((changed_at, pk))
+        else:
+            cursor = self.request.query_params.get(self.cursor_query_param)
+        return Response(
+            {
+                "cursor": cursor,
+                "has_more": self.has_more,
+                "results": [
+                    {
+                        "id": pk,
+                        "deleted": bool(deleted),
+                        "recipe": payloads.get(pk),
+                    }
+                    for _, pk, deleted in self.changes
+                ],
+            }
+        )
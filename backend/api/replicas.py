@@ -0,0 +1,70 @@
+"""Routing of safe requests to read replicas.
+
+Views with ReplicaReadMixin pick a replica for their GET and HEAD
+requests, every query of such a request then reads from it. Everything
+else, authentication included, uses the primary. After a successful
+write a user reads from the primary for READ_YOUR_WRITES_SECONDS, so
+they see their changes while the replicas catch up.
+"""
+
+import random
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.core.cache import cache
+
+DEFAULT_DB_ALIAS = "default"
+
+# copied into the worker threads of sync_to_async, so async views read
+# from the replica chosen in their initial()
+read_database = ContextVar("read_database", default=None)
+
+
+def get_write_marker_key(user_id):
+    return f"read_your_writes:{user_id}"
+
+
+def mark_write(user_id):
+    cache.set(
+        get_write_marker_key(user_id),
+        True,
+        timeout=settings.READ_YOUR_WRITES_SECONDS,
+    )
+
+
+async def amark_write(user_id):
+    await cache.aset(
+        get_write_marker_key(user_id),
+        True,
+        timeout=settings.READ_YOUR_WRITES_SECONDS,
+    )
+
+
+def has_recent_write(user):
+    if user.is_anonymous or not settings.READ_YOUR_WRITES_SECONDS:
+        return False
+    return cache.get(get_write_marker_key(user.pk), False)
+
+
+def choose_replica(user):
+    """Returns the alias the request of user reads from, or None."""
+    if not settings.DATABASE_REPLICAS or has_recent_write(user):
+        return None
+    return random.choice(settings.DATABASE_REPLICAS)
+
+
+class ReplicaRouter:
+    """Sends the reads of replica enabled requests to their replica."""
+
+    def db_for_read(self, model, **hints):
+        return read_database.get()
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # replicas hold the same rows as the primary
+        return True
+
+    def allow_migrate(self, db, app_label, **hints):
+        return db == DEFAULT_DB_ALIAS
@@ -0,0 +1,187 @@
+"""Shared cache of read responses with stampede protection.
+
+Entries are kept in the default cache as (fresh_until, versions, data),
+where versions are the invalidation bus versions of the models the
+response is built from. An entry is fresh for RESPONSE_CACHE_TTL
+seconds and as long as none of those models changes. A stale entry is
+still served for RESPONSE_CACHE_STALE_SECONDS while a single request
+per key refreshes it in the background.
+
+Without any entry only one request per key computes the response:
+requests of the same worker wait for its result, requests of other
+workers wait up to RESPONSE_CACHE_WAIT_SECONDS for the entry to appear.
+"""
+
+import hashlib
+import logging
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextvars import copy_context
+from threading import Lock
+from time import monotonic, sleep, time
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import close_old_connections
+from django.http import Http404
+
+from api.metrics import registry
+from invalidation.bus import get_model_key, invalidation_bus
+from recipes.models import Ingredient, Recipe, Tag
+
+logger = logging.getLogger(__name__)
+
+_executor = ThreadPoolExecutor(
+    max_workers=settings.RESPONSE_CACHE_REFRESH_WORKERS,
+    thread_name_prefix="response-cache",
+)
+
+MISSING = object()
+
+
+def is_outdated(versions, current_versions):
+    return any(
+        version < current
+        for version, current in zip(versions, current_versions)
+    )
+
+
+class ResponseCache:
+    def __init__(self, name, models, poll_interval=0.05):
+        self.name = name
+        self.keys = [get_model_key(model) for model in models]
+        self.poll_interval = poll_interval
+        self._lock = Lock()
+        self._flights = {}
+
+    @property
+    def enabled(self):
+        return settings.RESPONSE_CACHE_TTL > 0
+
+    def get_cache_key(self, key):
+        digest = hashlib.sha256(key.encode()).hexdigest()
+        return f"{self.name}:{digest}"
+
+    def get_lock_key(self, key):
+        return f"{self.get_cache_key(key)}:lock"
+
+    def get_versions(self):
+        return tuple(invalidation_bus.version(key) for key in self.keys)
+
+    def get(self, key, compute):
+        """Returns the data cached under key.
+
+        compute() returns the data of a missing or stale entry, it is
+        called by one request per key at a time.
+        """
+        versions = self.get_versions()
+        entry = cache.get(self.get_cache_key(key))
+        if entry is None:
+            self.count("miss")
+            return self.compute_once(key, compute, versions)
+        fresh_until, entry_versions, data = entry
+        if time() < fresh_until and not is_outdated(entry_versions, versions):
+            self.count("hit")
+        else:
+            self.count("stale")
+            if self.acquire(key):
+                self.schedule_refresh(key, compute, versions)
+        return data
+
+    def compute_once(self, key, compute, versions):
+        with self._lock:
+            flight = self._flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._flights[key] = Future()
+        if not leader:
+            return flight.result()
+        try:
+            data = self.wait_or_compute(key, compute, versions)
+        except Exception as e:
+            flight.set_exception(e)
+            raise
+        else:
+            flight.set_result(data)
+            return data
+        finally:
+            with self._lock:
+                del self._flights[key]
+
+    def wait_or_compute(self, key, compute, versions):
+        acquired = self.acquire(key)
+        if not acquired:
+            data = self.wait_for(key)
+            if data is not MISSING:
+                return data
+        try:
+            return self.store(key, compute(), versions)
+        finally:
+            if acquired:
+                self.release(key)
+
+    def wait_for(self, key):
+        """Waits while another worker computes the entry of key."""
+        deadline = monotonic() + settings.RESPONSE_CACHE_WAIT_SECONDS
+        while monotonic() < deadline:
+            sleep(self.poll_interval)
+            entry = cache.get(self.get_cache_key(key))
+            if entry is not None:
+                return entry[2]
+            if cache.get(self.get_lock_key(key)) is None:
+                break
+        return MISSING
+
+    def schedule_refresh(self, key, compute, versions):
+        _executor.submit(
+            copy_context().run,
+            self.refresh_in_background,
+            key,
+            compute,
+            versions,
+        )
+
+    def refresh_in_background(self, key, compute, versions):
+        close_old_connections()
+        try:
+            self.refresh(key, compute, versions)
+        finally:
+            close_old_connections()
+
+    def refresh(self, key, compute, versions):
+        try:
+            self.store(key, compute(), versions)
+        except Http404:
+            cache.delete(self.get_cache_key(key))
+        except Exception:
+            logger.exception("Failed to refresh the response of %s", key)
+        finally:
+            self.release(key)
+
+    def store(self, key, data, versions):
+        cache.set(
+            self.get_cache_key(key),
+            (time() + settings.RESPONSE_CACHE_TTL, versions, data),
+            settings.RESPONSE_CACHE_TTL
+            + settings.RESPONSE_CACHE_STALE_SECONDS,
+        )
+        return data
+
+    def acquire(self, key):
+        # expires on its own if the holder dies
+        return cache.add(
+            self.get_lock_key(key), True, settings.RESPONSE_CACHE_WAIT_SECONDS
+        )
+
+    def release(self, key):
+        cache.delete(self.get_lock_key(key))
+
+    def count(self, result):
+        registry.inc(
+            "foodgram_cache_requests_total",
+            {"cache": self.name, "result": result},
+        )
+
+
+# anonymous recipe responses, favorites and carts only change the flags
+# of their users
+recipe_responses = ResponseCache("recipe_responses", [Recipe, Tag, Ingredient])
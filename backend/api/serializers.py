@@ -1,33 +1,49 @@
-from django.contrib.auth import get_user_model
+from functools import partial
+
+from django.conf import settings
+from django.contrib.auth import authenticate, get_user_model
 from django.contrib.auth.password_validation import validate_password
-from django.db.models import BooleanField, Count, Value
+from django.db.models import (
+    BooleanField,
+    Count,
+    Prefetch,
+    Value,
+    prefetch_related_objects,
+)
 from django.db.transaction import atomic
-from drf_extra_fields.fields import Base64ImageField
+from django.utils import timezone
+from djoser.conf import settings as djoser_settings
+from djoser.serializers import (
+    TokenCreateSerializer as DjoserTokenCreateSerializer,
+)
 from rest_framework import exceptions, serializers, validators
 
+from api.fields import (
+    ImageVariantsField,
+    RecipeImageField,
+    ReferenceAttributeField,
+    ReferencePrimaryKeyRelatedField,
+)
+from api.hashing import set_password
 from api.utils import extract_and_assign_tags_ingredients
 from api.validators import NotEmptyValueValidator
 from foodgram_backend.constants import MIN_INGREDIENT_AMOUNT
 from recipes.models import (
     Favorite,
+    ImageUpload,
     Ingredient,
     Recipe,
     RecipeIngredientAmount,
     ShoppingCart,
     Tag,
 )
+from recipes.reference import reference_ingredients, reference_tags
 from users.models import Subscription
 
 User = get_user_model()
 
 
-class RecipeListSerializer(serializers.ListSerializer):
-    def to_representation(self, data):
-        recipes_limit = self.get_recipes_limit_from_context()
-        if recipes_limit:
-            data = data.all()[:recipes_limit]
-        return super().to_representation(data)
-
+class RecipesLimitMixin:
     def get_recipes_limit_from_context(self):
         query_params = getattr(
             self.context.get("request", None), "query_params", {}
@@ -46,7 +62,61 @@ class RecipeListSerializer(serializers.ListSerializer):
             )
 
 
+class RecipeListSerializer(RecipesLimitMixin, serializers.ListSerializer):
+    def to_representation(self, data):
+        recipes_limit = self.get_recipes_limit_from_context()
+        if recipes_limit:
+            data = data.all()[:recipes_limit]
+        return super().to_representation(data)
+
+
+class RecipeIdsField(RecipesLimitMixin, serializers.ManyRelatedField):
+    """Primary keys of recipes, as many as recipes_limit allows."""
+
+    def __init__(self, **kwargs):
+        kwargs["child_relation"] = serializers.PrimaryKeyRelatedField(
+            read_only=True
+        )
+        kwargs["read_only"] = True
+        super().__init__(**kwargs)
+
+    def get_attribute(self, instance):
+        recipes = super().get_attribute(instance)
+        recipes_limit = self.get_recipes_limit_from_context()
+        if recipes_limit:
+            return recipes[:recipes_limit]
+        return recipes
+
+
+class SparseFieldsetMixin:
+    """Keeps the fields chosen by the `field_selection` of the context.
+
+    Relations in `collapsed_fields` that are chosen but not expanded are
+    replaced by the field it maps them to, usually their primary keys.
+    """
+
+    collapsed_fields = {}
+
+    def get_fields(self):
+        fields = super().get_fields()
+        selection = self.context.get("field_selection")
+        if selection is None:
+            return fields
+        return {
+            name: (
+                self.collapsed_fields[name]()
+                if name in self.collapsed_fields
+                and not selection.expands(name)
+                else field
+            )
+            for name, field in fields.items()
+            if selection.includes(name)
+        }
+
+
 class RecipeBasicSerializer(serializers.ModelSerializer):
+    image_variants = ImageVariantsField()
+
     class Meta:
         list_serializer_class = RecipeListSerializer
         model = Recipe
@@ -55,6 +125,7 @@ class RecipeBasicSerializer(serializers.ModelSerializer):
             "name",
             "cooking_time",
             "image",
+            "image_variants",
         )
 
 
@@ -63,6 +134,11 @@ class TagSerializer(serializers.ModelSerializer):
         model = Tag
         fields = ("id", "name", "color", "slug")
 
+    def to_representation(self, instance):
+        # recipes prefetch only the ids of their tags
+        record = reference_tags.get().by_id.get(instance.pk, instance)
+        return super().to_representation(record)
+
 
 class IngredientSerializer(serializers.ModelSerializer):
     class Meta:
@@ -96,11 +172,30 @@ class SignupSerializer(UserBaseSerializer):
     def create(self, validated_data):
         password = validated_data.pop("password")
         user = User(**validated_data)
-        user.set_password(password)
+        set_password(user, password)
         user.save()
         return user
 
 
+class TokenCreateSerializer(DjoserTokenCreateSerializer):
+    """Token login that checks the password only once.
+
+    djoser re-checks the password on the request thread when
+    authentication fails, this version relies on the pooled backend.
+    """
+
+    def validate(self, attrs):
+        login_field = djoser_settings.LOGIN_FIELD
+        self.user = authenticate(
+            request=self.context.get("request"),
+            password=attrs.get("password"),
+            **{login_field: attrs.get(login_field)},
+        )
+        if self.user is None:
+            self.fail("invalid_credentials")
+        return attrs
+
+
 class UserSerializer(UserBaseSerializer):
     is_subscribed = serializers.BooleanField(default=False)
 
@@ -109,10 +204,12 @@ class UserSerializer(UserBaseSerializer):
         fields = UserBaseSerializer.Meta.fields + ("is_subscribed",)
 
 
-class UserDetailSerializer(UserSerializer):
+class UserDetailSerializer(SparseFieldsetMixin, UserSerializer):
     recipes_count = serializers.IntegerField(required=False)
     recipes = RecipeBasicSerializer(many=True, required=False)
 
+    collapsed_fields = {"recipes": RecipeIdsField}
+
     class Meta:
         model = User
         fields = UserSerializer.Meta.fields + (
@@ -121,6 +218,15 @@ class UserDetailSerializer(UserSerializer):
         )
 
 
+class RecipeIngredientListSerializer(serializers.ListSerializer):
+    def to_internal_value(self, data):
+        if isinstance(data, list):
+            self.child.fields["id"].prefetch(
+                item.get("id") for item in data if isinstance(item, dict)
+            )
+        return super().to_internal_value(data)
+
+
 class RecipeIngredientsSerializer(serializers.ModelSerializer):
     """
     Serializer for representaion of recipe ingredients as a nested field
@@ -132,17 +238,20 @@ class RecipeIngredientsSerializer(serializers.ModelSerializer):
     name and measurement_unit are for read-only purposes.
     """
 
-    id = serializers.PrimaryKeyRelatedField(
-        queryset=Ingredient.objects.all(),
+    id = ReferencePrimaryKeyRelatedField(
+        reference_ingredients,
         source="ingredient",
     )
     amount = serializers.IntegerField(min_value=MIN_INGREDIENT_AMOUNT)
-    name = serializers.CharField(source="ingredient.name", read_only=True)
-    measurement_unit = serializers.CharField(
-        source="ingredient.measurement_unit", read_only=True
+    name = ReferenceAttributeField(
+        reference_ingredients, "name", source="ingredient_id"
+    )
+    measurement_unit = ReferenceAttributeField(
+        reference_ingredients, "measurement_unit", source="ingredient_id"
     )
 
     class Meta:
+        list_serializer_class = RecipeIngredientListSerializer
         model = RecipeIngredientAmount
         fields = (
             "id",
@@ -171,15 +280,30 @@ class RecipeBaseSerializer(serializers.ModelSerializer):
         )
 
 
-class RecipeSerializer(RecipeBaseSerializer):
+class RecipeSerializer(SparseFieldsetMixin, RecipeBaseSerializer):
     is_favorited = serializers.BooleanField(read_only=True, default=False)
     is_in_shopping_cart = serializers.BooleanField(
         read_only=True, default=False
     )
+    image_variants = ImageVariantsField()
+
+    collapsed_fields = {
+        "author": partial(serializers.PrimaryKeyRelatedField, read_only=True),
+        "tags": partial(
+            serializers.PrimaryKeyRelatedField, many=True, read_only=True
+        ),
+        "ingredients": partial(
+            serializers.SlugRelatedField,
+            slug_field="ingredient_id",
+            many=True,
+            read_only=True,
+        ),
+    }
 
     class Meta:
         model = Recipe
         fields = RecipeBaseSerializer.Meta.fields + (
+            "image_variants",
             "is_favorited",
             "is_in_shopping_cart",
         )
@@ -187,11 +311,8 @@ class RecipeSerializer(RecipeBaseSerializer):
 
 class RecipeWriteSerializer(RecipeBaseSerializer):
     author = UserSerializer(default=serializers.CurrentUserDefault())
-    image = Base64ImageField()
-    tags = serializers.PrimaryKeyRelatedField(
-        queryset=Tag.objects.all(),
-        many=True,
-    )
+    image = RecipeImageField()
+    tags = ReferencePrimaryKeyRelatedField(reference_tags, many=True)
 
     class Meta:
         model = Recipe
@@ -226,6 +347,16 @@ class RecipeWriteSerializer(RecipeBaseSerializer):
         self._verify_unique_values(selected_ingredients)
         return ingredients
 
+    def save(self, **kwargs):
+        image = self.validated_data.get("image")
+        instance = super().save(**kwargs)
+        # a chunked upload is consumed once its file is moved to storage
+        upload = getattr(image, "upload", None)
+        if upload is not None:
+            image.close()
+            upload.delete()
+        return instance
+
     @atomic
     @extract_and_assign_tags_ingredients
     def create(self, validated_data):
@@ -237,9 +368,39 @@ class RecipeWriteSerializer(RecipeBaseSerializer):
         return super().update(instance, validated_data)
 
     def to_representation(self, instance):
+        prefetch_related_objects(
+            [instance],
+            Prefetch("tags", queryset=Tag.objects.only("pk")),
+            "ingredients",
+        )
         return RecipeSerializer(instance).data
 
 
+class ImageUploadSerializer(serializers.ModelSerializer):
+    size = serializers.IntegerField(
+        min_value=1, max_value=settings.CHUNKED_UPLOAD_MAX_SIZE
+    )
+
+    class Meta:
+        model = ImageUpload
+        fields = ("token", "size", "offset", "completed")
+        read_only_fields = ("token", "offset", "completed")
+
+    def validate(self, attrs):
+        user = self.context["request"].user
+        open_uploads = user.image_uploads.filter(expires_at__gt=timezone.now())
+        if open_uploads.count() >= settings.CHUNKED_UPLOAD_MAX_PER_USER:
+            raise serializers.ValidationError(
+                "Too many unfinished uploads, finish or wait for them "
+                "to expire."
+            )
+        return attrs
+
+    def create(self, validated_data):
+        validated_data["user"] = self.context["request"].user
+        return super().create(validated_data)
+
+
 class UserCollectionsSerializer(serializers.ModelSerializer):
     user = serializers.HiddenField(default=serializers.CurrentUserDefault())
 
@@ -0,0 +1,180 @@
+"""Slow query log with sampled EXPLAIN capture.
+
+Statements slower than SLOW_QUERY_THRESHOLD_MS are normalized and
+grouped by fingerprint. Every worker keeps the SLOW_QUERY_LOG_SIZE
+fingerprints with the largest total time and writes them to
+`<SLOW_QUERY_DIR>/<pid>.json`, where the slow_queries command reads
+them. A sample of slow SELECT statements is re-run under EXPLAIN
+(ANALYZE, BUFFERS on PostgreSQL) and the plan is kept with the stats.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import random
+import re
+from pathlib import Path
+from threading import Lock
+from time import perf_counter
+
+from django.conf import settings
+from django.db import transaction
+
+logger = logging.getLogger(__name__)
+
+STRING_LITERAL = re.compile(r"'(?:[^']|'')*'")
+NUMBER_LITERAL = re.compile(r"\b\d+(?:\.\d+)?\b")
+VALUES_LIST = re.compile(r"\((?:\s*(?:%s|\?)\s*,)+\s*(?:%s|\?)\s*\)")
+WHITESPACE = re.compile(r"\s+")
+
+
+def normalize(sql):
+    """Replaces literals and placeholder lists, so similar queries match."""
+    sql = STRING_LITERAL.sub("?", sql)
+    sql = NUMBER_LITERAL.sub("?", sql)
+    sql = sql.replace("%s", "?")
+    sql = VALUES_LIST.sub("(...)", sql)
+    return WHITESPACE.sub(" ", sql).strip()
+
+
+def fingerprint(normalized_sql):
+    return hashlib.sha1(normalized_sql.encode()).hexdigest()[:16]
+
+
+class SlowQueryLog:
+    def __init__(self, directory, max_size):
+        self.directory = Path(directory)
+        self.max_size = max_size
+        self.entries = {}
+        self._lock = Lock()
+
+    def record(self, sql, duration, view, plan=None):
+        normalized = normalize(sql)
+        key = fingerprint(normalized)
+        with self._lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                entry = self.entries[key] = {
+                    "fingerprint": key,
+                    "sql": normalized,
+                    "count": 0,
+                    "total": 0.0,
+                    "max": 0.0,
+                    "views": [],
+                    "plan": None,
+                }
+            entry["count"] += 1
+            entry["total"] += duration
+            entry["max"] = max(entry["max"], duration)
+            if view and view not in entry["views"]:
+                entry["views"].append(view)
+            if plan is not None:
+                entry["plan"] = plan
+            if len(self.entries) > self.max_size:
+                cheapest = min(
+                    self.entries.values(), key=lambda entry: entry["total"]
+                )
+                del self.entries[cheapest["fingerprint"]]
+        # slow queries are rare, writing the file is cheap next to them
+        self.flush()
+
+    def has_plan(self, sql):
+        entry = self.entries.get(fingerprint(normalize(sql)))
+        return entry is not None and entry["plan"] is not None
+
+    def flush(self):
+        with self._lock:
+            data = json.dumps(list(self.entries.values()))
+        self.directory.mkdir(parents=True, exist_ok=True)
+        path = self.directory / f"{os.getpid()}.json"
+        temporary_path = path.with_suffix(".tmp")
+        temporary_path.write_text(data)
+        os.replace(temporary_path, path)
+
+    def clear(self):
+        with self._lock:
+            self.entries.clear()
+
+
+def read_entries(directory):
+    """Merges the entries written by all processes by fingerprint."""
+    merged = {}
+    for path in Path(directory).glob("*.json"):
+        try:
+            entries = json.loads(path.read_text())
+        except (OSError, ValueError):
+            continue
+        for entry in entries:
+            known = merged.get(entry["fingerprint"])
+            if known is None:
+                merged[entry["fingerprint"]] = entry
+                continue
+            known["count"] += entry["count"]
+            known["total"] += entry["total"]
+            known["max"] = max(known["max"], entry["max"])
+            known["views"] += [
+                view for view in entry["views"] if view not in known["views"]
+            ]
+            known["plan"] = known["plan"] or entry["plan"]
+    return list(merged.values())
+
+
+class SlowQueryRecorder:
+    """Execute wrapper logging the statements slower than the threshold."""
+
+    def __init__(self, view=None):
+        self.view = view
+        self.threshold = settings.SLOW_QUERY_THRESHOLD_MS / 1000
+        self.explaining = False
+
+    def __call__(self, execute, sql, params, many, context):
+        if self.explaining:
+            return execute(sql, params, many, context)
+        started_at = perf_counter()
+        result = execute(sql, params, many, context)
+        duration = perf_counter() - started_at
+        if duration >= self.threshold:
+            plan = None
+            if self.should_explain(sql, many):
+                plan = self.explain(context["connection"], sql, params)
+            slow_query_log.record(sql, duration, self.view, plan)
+        return result
+
+    def should_explain(self, sql, many):
+        return (
+            not many
+            and sql.lstrip()[:6].upper() == "SELECT"
+            and random.random() < settings.SLOW_QUERY_EXPLAIN_SAMPLE_RATE
+            and not slow_query_log.has_plan(sql)
+        )
+
+    def explain(self, connection, sql, params):
+        # EXPLAIN ANALYZE runs the statement again, so only SELECTs are
+        # explained and only on a sample
+        options = (
+            {"analyze": True, "buffers": True}
+            if connection.vendor == "postgresql"
+            else {}
+        )
+        self.explaining = True
+        try:
+            # a failed EXPLAIN must not break the request's transaction
+            with transaction.atomic(
+                using=connection.alias
+            ), connection.cursor() as cursor:
+                cursor.execute(
+                    f"{connection.ops.explain_query_prefix(**options)} {sql}",
+                    params,
+                )
+                return "\n".join(str(row[-1]) for row in cursor.fetchall())
+        except Exception:
+            logger.exception("Failed to explain a slow query")
+            return None
+        finally:
+            self.explaining = False
+
+
+slow_query_log = SlowQueryLog(
+    settings.SLOW_QUERY_DIR, settings.SLOW_QUERY_LOG_SIZE
+)
@@ -50,6 +50,14 @@ TAG_SCHEMA = {
     "additionalProperties": False,
 }
 
+IMAGE_VARIANTS_SCHEMA = {
+    "type": "object",
+    "additionalProperties": {
+        "type": "object",
+        "additionalProperties": {"type": "string"},
+    },
+}
+
 RECIPE_SCHEMA = {
     "type": "object",
     "properties": {
@@ -67,6 +75,7 @@ RECIPE_SCHEMA = {
         "is_in_shopping_cart": {"type": "boolean"},
         "name": {"type": "string"},
         "image": {"type": "string"},
+        "image_variants": IMAGE_VARIANTS_SCHEMA,
         "text": {"type": "string"},
         "cooking_time": {"type": "number"},
     },
@@ -79,6 +88,7 @@ RECIPE_SCHEMA = {
         "is_in_shopping_cart",
         "name",
         "image",
+        "image_variants",
         "text",
         "cooking_time",
     ],
@@ -91,9 +101,10 @@ SIMPLE_RECIPE_SCHEMA = {
         "id": {"type": "number"},
         "name": {"type": "string"},
         "image": {"type": "string"},
+        "image_variants": IMAGE_VARIANTS_SCHEMA,
         "cooking_time": {"type": "number"},
     },
-    "required": ["id", "name", "image", "cooking_time"],
+    "required": ["id", "name", "image", "image_variants", "cooking_time"],
     "additionalProperties": False,
 }
 
@@ -146,6 +157,22 @@ def get_paginated_response_schema(item_schema: dict) -> dict:
     }
 
 
+def get_cursor_paginated_response_schema(item_schema: dict) -> dict:
+    return {
+        "type": "object",
+        "properties": {
+            "next": {
+                "anyOf": [{"type": "string"}, {"type": "null"}],
+            },
+            "results": {
+                "type": "array",
+                "items": item_schema,
+            },
+        },
+        "required": ["next", "results"],
+    }
+
+
 def get_list_response_schema(item_schema: dict) -> dict:
     return {
         "type": "array",
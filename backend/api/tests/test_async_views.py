@@ -0,0 +1,172 @@
+from importlib import reload
+from io import StringIO
+
+import pytest
+from asgiref.sync import async_to_sync, iscoroutinefunction
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import AsyncClient
+from django.urls import clear_url_caches, reverse
+from djoser.conf import settings as djoser_settings
+
+import api.urls
+import foodgram_backend.urls
+from recipes.models import Recipe, Tag
+
+User = get_user_model()
+
+DATASET = {
+    "users": 6,
+    "recipes_per_author": 3,
+    "authors_share": 0.5,
+    "ingredients_per_recipe": 3,
+    "favorites": 12,
+    "cart_items": 12,
+    "subscriptions": 4,
+}
+
+
+def reload_urls():
+    reload(api.urls)
+    reload(foodgram_backend.urls)
+    clear_url_caches()
+
+
+@pytest.fixture
+def dataset(db, settings, tmp_path):
+    settings.MEDIA_ROOT = tmp_path
+    call_command("generate_dataset", stdout=StringIO(), **DATASET)
+
+
+@pytest.fixture
+def async_views(settings):
+    settings.ASYNC_VIEWS = True
+    reload_urls()
+    yield
+    settings.ASYNC_VIEWS = False
+    reload_urls()
+
+
+@pytest.fixture
+def auth(dataset):
+    user = User.objects.get(username="dataset0_0")
+    token = djoser_settings.TOKEN_MODEL.objects.create(user=user)
+    return {"HTTP_AUTHORIZATION": f"Token {token}"}
+
+
+@pytest.fixture
+def read_requests(auth):
+    recipe = Recipe.objects.order_by("pk").first()
+    tag = Tag.objects.order_by("pk").first()
+    return {
+        "tags-list": (reverse("api:tags-list"), {}, {}),
+        "tags-detail": (reverse("api:tags-detail", args=[tag.pk]), {}, {}),
+        "ingredients-search": (
+            reverse("api:ingredients-list"),
+            {"name": "са"},
+            {},
+        ),
+        "recipes-list-anonymous": (reverse("api:recipes-list"), {}, {}),
+        "recipes-list": (reverse("api:recipes-list"), {"page": 2}, auth),
+        "recipes-list-tag": (
+            reverse("api:recipes-list"),
+            {"tags": tag.slug, "is_favorited": 1},
+            auth,
+        ),
+        "recipes-detail": (
+            reverse("api:recipes-detail", args=[recipe.pk]),
+            {},
+            auth,
+        ),
+        "recipes-detail-missing": (
+            reverse("api:recipes-detail", args=[0]),
+            {},
+            auth,
+        ),
+        "recipes-list-invalid-page": (
+            reverse("api:recipes-list"),
+            {"page": 100},
+            {},
+        ),
+        "download-shopping-cart-anonymous": (
+            reverse("api:download_shopping_cart"),
+            {},
+            {},
+        ),
+        "download-shopping-cart": (
+            reverse("api:download_shopping_cart"),
+            {},
+            auth,
+        ),
+    }
+
+
+def read(client, url, params, headers):
+    response = client.get(url, params, **headers)
+    content = response.getvalue() if response.streaming else response.content
+    return response.status_code, content
+
+
+@pytest.mark.parametrize(
+    "endpoint",
+    [
+        "tags-list",
+        "tags-detail",
+        "ingredients-search",
+        "recipes-list-anonymous",
+        "recipes-list",
+        "recipes-list-tag",
+        "recipes-detail",
+        "recipes-detail-missing",
+        "recipes-list-invalid-page",
+        "download-shopping-cart-anonymous",
+        "download-shopping-cart",
+    ],
+)
+def test_async_views_match_sync_views(
+    client, settings, read_requests, endpoint
+):
+    url, params, headers = read_requests[endpoint]
+    expected = read(client, url, params, headers)
+    settings.ASYNC_VIEWS = True
+    reload_urls()
+    try:
+        assert read(client, url, params, headers) == expected
+    finally:
+        settings.ASYNC_VIEWS = False
+        reload_urls()
+
+
+@pytest.mark.usefixtures("async_views")
+def test_writes_fall_back_to_sync_views(client, auth):
+    recipe = User.objects.get(username="dataset0_0").recipes.first()
+    response = client.delete(
+        reverse("api:recipes-detail", args=[recipe.pk]), **auth
+    )
+    assert response.status_code == 204, response.content
+    assert not Recipe.objects.filter(pk=recipe.pk).exists()
+
+
+@pytest.mark.usefixtures("async_views")
+def test_read_only_views_reject_writes(client, auth):
+    response = client.post(reverse("api:tags-list"), {}, **auth)
+    assert response.status_code == 405
+
+
+@pytest.mark.usefixtures("async_views")
+def test_asgi_request(auth):
+    client = AsyncClient()
+    response = async_to_sync(client.get)(reverse("api:recipes-list"), **auth)
+    assert response.status_code == 200
+    assert iscoroutinefunction(response.resolver_match.func)
+    assert response.json()["count"] == Recipe.objects.count()
+
+
+@pytest.mark.usefixtures("async_views")
+def test_asgi_request_is_instrumented(settings, auth):
+    settings.REQUEST_INSTRUMENTATION_SAMPLE_RATE = 1.0
+    settings.REQUEST_INSTRUMENTATION_LOG_MS = 60000
+    client = AsyncClient()
+    response = async_to_sync(client.get)(reverse("api:recipes-list"), **auth)
+    # queries run in a worker thread and are still counted
+    assert 'desc="0 queries"' not in response["Server-Timing"]
@@ -0,0 +1,69 @@
+import pytest
+from django.urls import reverse
+from rest_framework import status
+
+from api.hashing import hashing_pool
+
+
+class TestLoginFloodProtection:
+    login_url = reverse("api:login")
+
+    def test_email_flood_is_throttled(
+        self, client, test_user, test_user_email, monkeypatch
+    ):
+        hashed = []
+        monkeypatch.setattr(
+            hashing_pool,
+            "run",
+            lambda func, *args: hashed.append(func) or (False, False),
+        )
+        credentials = {"email": test_user_email, "password": "wrong"}
+        statuses = [
+            client.post(self.login_url, data=credentials).status_code
+            for _ in range(11)
+        ]
+        assert statuses[:10] == [status.HTTP_400_BAD_REQUEST] * 10
+        assert statuses[10] == status.HTTP_429_TOO_MANY_REQUESTS
+        assert len(hashed) == 10
+
+    @pytest.mark.usefixtures("test_user")
+    def test_login_goes_through_hashing_pool(
+        self, client, user_login_credentials
+    ):
+        completed = hashing_pool.stats()["completed"]
+        response = client.post(self.login_url, data=user_login_credentials)
+        assert response.status_code == status.HTTP_200_OK
+        assert hashing_pool.stats()["completed"] == completed + 1
+        assert hashing_pool.stats()["queue_depth"] == 0
+
+    @pytest.mark.usefixtures("test_user")
+    def test_overloaded_pool(self, client, user_login_credentials):
+        max_pending = hashing_pool.max_pending
+        hashing_pool.max_pending = 0
+        try:
+            response = client.post(self.login_url, data=user_login_credentials)
+        finally:
+            hashing_pool.max_pending = max_pending
+        assert response.status_code == status.HTTP_503_SERVICE_UNAVAILABLE
+
+    def test_password_change_runs_validator_hooks(
+        self, authorized_client, test_user, test_user_password, monkeypatch
+    ):
+        changed = []
+        monkeypatch.setattr(
+            "django.contrib.auth.password_validation.password_changed",
+            lambda password, user=None, **kwargs: changed.append(password),
+        )
+        completed = hashing_pool.stats()["completed"]
+        response = authorized_client.post(
+            reverse("api:users-set-password"),
+            data={
+                "new_password": "new_password",
+                "current_password": test_user_password,
+            },
+        )
+        assert response.status_code == status.HTTP_204_NO_CONTENT
+        assert changed == ["new_password"]
+        assert hashing_pool.stats()["completed"] == completed + 1
+        test_user.refresh_from_db()
+        assert test_user.check_password("new_password")
@@ -0,0 +1,91 @@
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+from django.urls import reverse
+
+from api.benchmarks import BenchmarkError, find_regressions, measure
+from api.management.commands.benchmark_servers import (
+    Command as BenchmarkServersCommand,
+)
+
+BASELINE = {
+    "recipes-list": {
+        "p50_ms": 10.0,
+        "p95_ms": 20.0,
+        "p99_ms": 30.0,
+        "queries": 7,
+        "peak_kib": 100.0,
+    }
+}
+
+
+def test_within_threshold_passes():
+    results = {
+        "recipes-list": {
+            **BASELINE["recipes-list"],
+            "p50_ms": 12.0,
+            "p99_ms": 90.0,
+        }
+    }
+    assert not list(find_regressions(results, BASELINE, 0.25))
+
+
+def test_slack_covers_jitter_of_timings():
+    results = {
+        "recipes-list": {
+            **BASELINE["recipes-list"],
+            "p50_ms": 20.0,
+            "peak_kib": 130.0,
+        }
+    }
+    regressions = list(find_regressions(results, BASELINE, 0.25, 10))
+    assert regressions == [
+        "recipes-list: peak_kib 130.0 > 125.000 (baseline 100.0)"
+    ]
+
+
+def test_slowdown_and_extra_queries_fail():
+    results = {
+        "recipes-list": {
+            **BASELINE["recipes-list"],
+            "p95_ms": 26.0,
+            "queries": 8,
+        },
+        "new-scenario": BASELINE["recipes-list"],
+    }
+    regressions = list(find_regressions(results, BASELINE, 0.25))
+    assert len(regressions) == 2
+    assert regressions[0].startswith("recipes-list: p95_ms")
+    assert regressions[1].startswith("recipes-list: queries")
+
+
+@pytest.mark.django_db
+def test_measure(client, user_recipe):
+    url = reverse("api:recipes-detail", args=[user_recipe.pk])
+    result = measure(lambda: client.get(url), 5)
+    # the recipe, its tags, ingredients and author
+    assert result["queries"] == 4
+    assert result["p50_ms"] <= result["p95_ms"] <= result["p99_ms"]
+    assert result["peak_kib"] > 0
+
+
+@pytest.mark.django_db
+def test_measure_fails_on_error_status(client):
+    with pytest.raises(BenchmarkError):
+        measure(lambda: client.get(reverse("api:recipes-detail", args=[1])), 5)
+
+
+@pytest.mark.django_db
+def test_server_benchmark_paths_are_ascii():
+    call_command(
+        "generate_dataset",
+        stdout=StringIO(),
+        users=4,
+        recipes_per_author=1,
+        favorites=0,
+        cart_items=0,
+        subscriptions=0,
+    )
+    for path, _ in BenchmarkServersCommand().get_requests():
+        assert path.isascii(), path
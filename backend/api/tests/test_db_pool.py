@@ -0,0 +1,123 @@
+import os
+from itertools import count
+from threading import Thread
+from time import sleep
+
+import pytest
+
+from foodgram_backend.db_pool.pool import ConnectionPool, PoolTimeout
+
+
+class FakeConnection:
+    def __init__(self, number):
+        self.number = number
+        self.closed = False
+        self.healthy = True
+
+
+@pytest.fixture
+def connect():
+    numbers = count()
+    return lambda: FakeConnection(next(numbers))
+
+
+def get_pool(**kwargs):
+    options = {
+        "close": lambda connection: setattr(connection, "closed", True),
+        "check": lambda connection: connection.healthy,
+        "min_size": 1,
+        "max_size": 2,
+        "timeout": 0.05,
+        "idle_timeout": 300,
+        **kwargs,
+    }
+    return ConnectionPool(**options)
+
+
+def test_connections_are_reused(connect):
+    pool = get_pool()
+    connection = pool.getconn(connect)
+    pool.putconn(connection)
+    assert pool.getconn(connect) is connection
+    assert pool.size == 1
+
+
+def test_checkout_times_out_when_saturated(connect):
+    pool = get_pool()
+    pool.getconn(connect)
+    pool.getconn(connect)
+    with pytest.raises(PoolTimeout):
+        pool.getconn(connect)
+    gauges = {
+        (name, labels.get("state")): value
+        for name, labels, value in pool.collect()
+    }
+    assert gauges[("foodgram_db_pool_saturation", None)] == 1.0
+    assert gauges[("foodgram_db_pool_connections", "in_use")] == 2
+
+
+def test_checkout_waits_for_a_returned_connection(connect):
+    pool = get_pool(max_size=1, timeout=5)
+    connection = pool.getconn(connect)
+    borrowed = []
+    waiter = Thread(target=lambda: borrowed.append(pool.getconn(connect)))
+    waiter.start()
+    sleep(0.05)
+    assert pool.waiting == 1
+    pool.putconn(connection)
+    waiter.join()
+    assert borrowed == [connection]
+
+
+def test_unhealthy_connections_are_replaced(connect):
+    pool = get_pool()
+    connection = pool.getconn(connect)
+    pool.putconn(connection)
+    connection.healthy = False
+    replacement = pool.getconn(connect)
+    assert replacement is not connection
+    assert connection.closed
+    assert pool.size == 1
+
+
+def test_failed_connect_releases_its_slot():
+    pool = get_pool(max_size=1)
+
+    def refuse():
+        raise ConnectionError
+
+    with pytest.raises(ConnectionError):
+        pool.getconn(refuse)
+    assert pool.size == 0
+
+
+def test_idle_connections_expire_down_to_min_size(connect):
+    pool = get_pool(idle_timeout=0)
+    first, second = pool.getconn(connect), pool.getconn(connect)
+    pool.putconn(first)
+    pool.putconn(second)
+    assert pool.size == 1
+    assert first.closed
+    assert not second.closed
+
+
+def test_discarded_connections_are_closed(connect):
+    pool = get_pool()
+    connection = pool.getconn(connect)
+    pool.putconn(connection, discard=True)
+    assert connection.closed
+    assert pool.size == 0
+
+
+def test_forked_process_starts_with_an_empty_pool(connect, monkeypatch):
+    pool = get_pool()
+    inherited = pool.getconn(connect)
+    idle = pool.getconn(connect)
+    pool.putconn(idle)
+    monkeypatch.setattr(os, "getpid", lambda: -1)
+    pool.putconn(inherited)
+    connection = pool.getconn(connect)
+    assert connection not in (inherited, idle)
+    assert pool.size == pool.in_use == 1
+    # the parent's sockets are left alone
+    assert not inherited.closed and not idle.closed
@@ -0,0 +1,170 @@
+from importlib import reload
+
+import pytest
+from asgiref.sync import async_to_sync
+from django.core.cache import cache
+from django.db import connections
+from django.test import AsyncClient
+from django.urls import clear_url_caches, reverse
+
+import api.urls
+import foodgram_backend.urls
+from api.checks import check_read_your_writes_cache
+from api.replicas import ReplicaRouter, has_recent_write, read_database
+from recipes.models import Recipe
+
+
+@pytest.fixture
+def replica(settings):
+    # the replica shares the connection of the primary, so it sees the
+    # rows of the test transaction
+    settings.DATABASE_REPLICAS = ["replica"]
+    connections["replica"] = connections["default"]
+    cache.clear()
+    yield "replica"
+    del connections["replica"]
+    cache.clear()
+
+
+@pytest.fixture
+def reads(monkeypatch):
+    """Collects the model and the alias of every routed read."""
+    routed = []
+    db_for_read = ReplicaRouter.db_for_read
+
+    def record(self, model, **hints):
+        alias = db_for_read(self, model, **hints)
+        routed.append((model._meta.model_name, alias))
+        return alias
+
+    monkeypatch.setattr(ReplicaRouter, "db_for_read", record)
+    return routed
+
+
+def aliases(reads, model_name):
+    return {alias for name, alias in reads if name == model_name}
+
+
+def test_router_writes_and_migrates_on_primary():
+    router = ReplicaRouter()
+    assert router.db_for_read(None) is None
+    assert router.db_for_write(None) == "default"
+    assert router.allow_migrate("default", "recipes")
+    assert not router.allow_migrate("replica_0", "recipes")
+
+
+def test_reads_use_primary_without_replicas(
+    client, recipes_bulk_create, reads
+):
+    response = client.get(reverse("api:recipes-list"))
+    assert response.status_code == 200
+    assert aliases(reads, "recipe") == {None}
+
+
+def test_safe_requests_read_from_replica(
+    replica, authorized_client, recipes_bulk_create, reads
+):
+    response = authorized_client.get(reverse("api:recipes-list"))
+    assert response.status_code == 200
+    # the token is looked up before the view picks the replica
+    assert aliases(reads, "token") == {None}
+    assert aliases(reads, "recipe") == {replica}
+    assert aliases(reads, "tag") == {replica}
+    assert read_database.get() is None
+
+
+@pytest.mark.parametrize(
+    "url_name",
+    ["api:tags-list", "api:ingredients-list", "api:subscriptions"],
+)
+def test_reference_and_subscription_lists_read_from_replica(
+    replica, authorized_client, tags_bulk_create, reads, url_name
+):
+    assert authorized_client.get(reverse(url_name)).status_code == 200
+    assert aliases(reads, "token") <= {None}
+    assert {alias for _, alias in reads if alias} == {replica}
+
+
+def test_shopping_list_reads_from_replica(
+    replica, authorized_client, recipes_bulk_create, reads
+):
+    url = reverse("api:download_shopping_cart")
+    assert authorized_client.get(url).status_code == 200
+    assert aliases(reads, "shoppingcart") == {replica}
+
+
+def test_writer_reads_own_writes_from_primary(
+    replica, authorized_client, test_user, recipes_bulk_create, reads
+):
+    recipe = Recipe.objects.first()
+    response = authorized_client.post(
+        reverse("api:favorites", args=[recipe.pk])
+    )
+    assert response.status_code == 201
+    assert has_recent_write(test_user)
+    reads.clear()
+    response = authorized_client.get(
+        reverse("api:recipes-detail", args=[recipe.pk])
+    )
+    assert response.json()["is_favorited"]
+    assert aliases(reads, "recipe") == {None}
+
+
+def test_failed_writes_do_not_stick_to_primary(
+    replica, authorized_client, test_user
+):
+    response = authorized_client.post(reverse("api:favorites", args=[0]))
+    assert response.status_code >= 400
+    assert not has_recent_write(test_user)
+
+
+def test_stickiness_can_be_disabled(
+    replica, settings, authorized_client, test_user, recipes_bulk_create
+):
+    settings.READ_YOUR_WRITES_SECONDS = 0
+    recipe = Recipe.objects.first()
+    authorized_client.post(reverse("api:favorites", args=[recipe.pk]))
+    assert not has_recent_write(test_user)
+
+
+@pytest.fixture
+def async_views(settings):
+    settings.ASYNC_VIEWS = True
+    reload(api.urls)
+    reload(foodgram_backend.urls)
+    clear_url_caches()
+    yield
+    settings.ASYNC_VIEWS = False
+    reload(api.urls)
+    reload(foodgram_backend.urls)
+    clear_url_caches()
+
+
+def test_async_views_read_from_replica(
+    replica, async_views, recipes_bulk_create, reads
+):
+    response = async_to_sync(AsyncClient().get)(reverse("api:recipes-list"))
+    assert response.status_code == 200
+    assert aliases(reads, "recipe") == {replica}
+
+
+def test_replicas_require_shared_cache(settings):
+    settings.DATABASE_REPLICAS = ["replica"]
+    settings.CACHES = {
+        "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}
+    }
+    assert [error.id for error in check_read_your_writes_cache(None)] == [
+        "api.E001"
+    ]
+    settings.CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+            "LOCATION": "/tmp/foodgram-cache",
+        }
+    }
+    assert check_read_your_writes_cache(None) == []
+    settings.DATABASE_REPLICAS = []
+    settings.CACHES = {
+        "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"}
+    }
+    assert check_read_your_writes_cache(None) == []
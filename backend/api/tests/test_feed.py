@@ -0,0 +1,107 @@
+import pytest
+from django.urls import reverse
+from rest_framework import status
+
+from api.tests.helpers.schemas import (
+    RECIPE_SCHEMA,
+    get_cursor_paginated_response_schema,
+)
+from api.tests.helpers.utils import validate_response_schema
+from recipes import feed
+from recipes.models import FeedEntry, Recipe
+from users.models import Subscription
+
+
+class TestFeed:
+    url = "api:feed"
+    subscribe_url_path = "api:subscribe"
+    list_schema = get_cursor_paginated_response_schema(RECIPE_SCHEMA)
+
+    def test_anonymous_feed(self, client):
+        response = client.get(reverse(self.url))
+        assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+    @pytest.mark.usefixtures("user_subscription")
+    def test_feed_retrieval(self, authorized_client, prominent_author):
+        response = authorized_client.get(reverse(self.url), {"limit": 20})
+        assert response.status_code == status.HTTP_200_OK
+        validate_response_schema(response, self.list_schema)
+        expected_ids = list(
+            prominent_author.recipes.values_list("id", flat=True)
+        )
+        assert [
+            recipe["id"] for recipe in response.json()["results"]
+        ] == expected_ids
+
+    @pytest.mark.usefixtures("user_subscription")
+    def test_feed_cursor_pagination(self, authorized_client, prominent_author):
+        ids = []
+        url = reverse(self.url) + "?limit=3"
+        while url:
+            response = authorized_client.get(url)
+            assert response.status_code == status.HTTP_200_OK
+            validate_response_schema(response, self.list_schema)
+            ids += [recipe["id"] for recipe in response.json()["results"]]
+            url = response.json()["next"]
+        assert ids == list(
+            prominent_author.recipes.values_list("id", flat=True)
+        )
+
+    def test_bad_cursor(self, authorized_client):
+        response = authorized_client.get(reverse(self.url), {"cursor": "x"})
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+
+    @pytest.mark.usefixtures("user_subscription")
+    def test_new_recipe_fan_out(
+        self, test_user, prominent_author, recipe_data
+    ):
+        recipe = Recipe.objects.create(
+            author=prominent_author,
+            name="fresh",
+            text="fresh",
+            cooking_time=1,
+            image="path_to_image.png",
+        )
+        assert FeedEntry.objects.filter(user=test_user, recipe=recipe).exists()
+
+    def test_subscribe_backfills_and_unsubscribe_prunes(
+        self, authorized_client, test_user, prominent_author
+    ):
+        url = reverse(self.subscribe_url_path, args=[prominent_author.id])
+        authorized_client.post(url)
+        assert (
+            FeedEntry.objects.filter(user=test_user).count()
+            == prominent_author.recipes.count()
+        )
+        authorized_client.delete(url)
+        assert not FeedEntry.objects.filter(user=test_user).exists()
+
+    def test_fan_out_on_read(
+        self, monkeypatch, authorized_client, test_user, prominent_author
+    ):
+        monkeypatch.setattr(feed, "FEED_FANOUT_MAX_SUBSCRIBERS", 0)
+        Subscription.objects.create(user=test_user, author=prominent_author)
+        assert not FeedEntry.objects.filter(user=test_user).exists()
+        response = authorized_client.get(reverse(self.url), {"limit": 20})
+        assert response.status_code == status.HTTP_200_OK
+        assert len(response.json()["results"]) == (
+            prominent_author.recipes.count()
+        )
+
+    def test_fan_out_on_read_outlives_threshold(
+        self, monkeypatch, authorized_client, test_user, prominent_author
+    ):
+        monkeypatch.setattr(feed, "FEED_FANOUT_MAX_SUBSCRIBERS", 0)
+        Subscription.objects.create(user=test_user, author=prominent_author)
+        monkeypatch.undo()
+        recipe = Recipe.objects.create(
+            author=prominent_author,
+            name="fresh",
+            text="fresh",
+            cooking_time=1,
+            image="path_to_image.png",
+        )
+        assert not FeedEntry.objects.filter(recipe=recipe).exists()
+        response = authorized_client.get(reverse(self.url), {"limit": 1})
+        assert response.status_code == status.HTTP_200_OK
+        assert response.json()["results"][0]["id"] == recipe.id
@@ -0,0 +1,51 @@
+from io import StringIO
+
+import pytest
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db.models import F
+
+from recipes.models import Favorite, Recipe, ShoppingCart
+from users.models import Subscription
+
+User = get_user_model()
+
+
+@pytest.mark.django_db
+class TestGenerateDataset:
+    options = {
+        "users": 20,
+        "recipes_per_author": 3,
+        "authors_share": 0.5,
+        "favorites": 60,
+        "cart_items": 30,
+        "subscriptions": 40,
+        "ingredients_per_recipe": 2,
+    }
+
+    def generate(self, **options):
+        call_command(
+            "generate_dataset", stdout=StringIO(), **self.options, **options
+        )
+
+    def test_counts(self):
+        self.generate()
+        assert User.objects.count() == 20
+        assert Recipe.objects.count() == 30
+        assert Favorite.objects.count() == 60
+        assert ShoppingCart.objects.count() == 30
+        assert Subscription.objects.count() == 40
+        assert not Subscription.objects.filter(user_id=F("author_id")).exists()
+
+    def test_same_seed_gives_same_dataset(self):
+        def snapshot():
+            return sorted(
+                Favorite.objects.values_list("user__username", "recipe__name")
+            )
+
+        self.generate(seed=7)
+        first = snapshot()
+        Recipe.objects.all().delete()
+        User.objects.all().delete()
+        self.generate(seed=7)
+        assert snapshot() == first
@@ -0,0 +1,59 @@
+import json
+import os
+import re
+
+import pytest
+from django.core.files.base import ContentFile
+from django.core.management import call_command
+from django.urls import reverse
+from rest_framework import status
+
+from recipes.models import Recipe
+from recipes.storage import recipe_image_storage
+
+
+class TestContentAddressedStorage:
+    @pytest.fixture
+    def storage(self, settings, tmp_path):
+        settings.MEDIA_ROOT = tmp_path
+        return recipe_image_storage()
+
+    def create_recipe(self, client, recipe_data):
+        response = client.post(
+            reverse("api:recipes-list"),
+            data=json.dumps(recipe_data),
+            content_type="application/json",
+        )
+        assert response.status_code == status.HTTP_201_CREATED
+        return Recipe.objects.get(pk=response.json()["id"])
+
+    def test_identical_uploads_are_deduplicated(
+        self, storage, authorized_client, recipe_data
+    ):
+        first = self.create_recipe(authorized_client, recipe_data)
+        second = self.create_recipe(authorized_client, recipe_data)
+        assert first.image.name == second.image.name
+        assert re.fullmatch(
+            r"recipes/([0-9a-f]{2})/([0-9a-f]{2})/\1\2[0-9a-f]{60}\.png",
+            first.image.name,
+        )
+
+    def test_garbage_collection(self, storage, user_recipe):
+        user_recipe.image.save("kept.txt", ContentFile(b"kept"))
+        orphan = storage.save("recipes/orphan.txt", ContentFile(b"orphan"))
+        fresh = storage.save("recipes/fresh.txt", ContentFile(b"fresh"))
+        os.utime(storage.path(orphan), (0, 0))
+        call_command("collect_image_garbage")
+        assert storage.exists(user_recipe.image.name)
+        assert not storage.exists(orphan)
+        assert storage.exists(fresh)
+
+    def test_referenced_again_orphan_is_kept(self, storage, db):
+        orphan = storage.save("recipes/orphan.txt", ContentFile(b"orphan"))
+        os.utime(storage.path(orphan), (0, 0))
+        # a recipe being saved uploads the same content again
+        assert storage.save("recipes/new.txt", ContentFile(b"orphan")) == (
+            orphan
+        )
+        call_command("collect_image_garbage")
+        assert storage.exists(orphan)
@@ -0,0 +1,199 @@
+import base64
+import json
+from datetime import timedelta
+
+import pytest
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework import status
+
+from recipes.models import ImageUpload, Recipe
+
+
+@pytest.fixture
+def image_bytes(base64_image):
+    return base64.b64decode(base64_image.split(";base64,")[1])
+
+
+@pytest.fixture
+def chunked_upload_root(settings, tmp_path):
+    settings.CHUNKED_UPLOAD_ROOT = tmp_path
+    return tmp_path
+
+
+@pytest.fixture
+def multipart_recipe_data(recipe_data, image_bytes):
+    data = {
+        key: value
+        for key, value in recipe_data.items()
+        if key not in ("ingredients", "image")
+    }
+    for i, ingredient in enumerate(recipe_data["ingredients"]):
+        data[f"ingredients[{i}]id"] = ingredient["id"]
+        data[f"ingredients[{i}]amount"] = ingredient["amount"]
+    data["image"] = SimpleUploadedFile("image.png", image_bytes)
+    return data
+
+
+class TestMultipartRecipeUpload:
+    list_url_path = "api:recipes-list"
+
+    def test_multipart_recipe_creation(
+        self, authorized_client, multipart_recipe_data
+    ):
+        response = authorized_client.post(
+            reverse(self.list_url_path), data=multipart_recipe_data
+        )
+        assert response.status_code == status.HTTP_201_CREATED
+        recipe = Recipe.objects.get(pk=response.json()["id"])
+        assert recipe.ingredients.count() == 2
+        assert recipe.tags.count() == 2
+
+    def test_multipart_invalid_image(
+        self, authorized_client, multipart_recipe_data
+    ):
+        multipart_recipe_data["image"] = SimpleUploadedFile(
+            "image.png", b"not an image"
+        )
+        response = authorized_client.post(
+            reverse(self.list_url_path), data=multipart_recipe_data
+        )
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+
+@pytest.mark.usefixtures("chunked_upload_root")
+class TestChunkedUpload:
+    uploads_url = reverse("api:uploads")
+
+    def create_upload(self, client, size):
+        response = client.post(self.uploads_url, data={"size": size})
+        assert response.status_code == status.HTTP_201_CREATED
+        return reverse("api:upload", args=[response.json()["token"]])
+
+    def put_chunk(self, client, url, chunk, start, total):
+        end = start + len(chunk) - 1
+        return client.put(
+            url,
+            data=chunk,
+            content_type="application/octet-stream",
+            HTTP_CONTENT_RANGE=f"bytes {start}-{end}/{total}",
+        )
+
+    def test_anonymous_upload(self, client):
+        response = client.post(self.uploads_url, data={"size": 10})
+        assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+    def test_resumable_upload(self, authorized_client, image_bytes):
+        size = len(image_bytes)
+        url = self.create_upload(authorized_client, size)
+        response = self.put_chunk(
+            authorized_client, url, image_bytes[:10], 0, size
+        )
+        assert response.status_code == status.HTTP_200_OK
+        assert response.json()["offset"] == 10
+        # a chunk that does not continue the upload is rejected
+        response = self.put_chunk(
+            authorized_client, url, image_bytes[20:], 20, size
+        )
+        assert response.status_code == status.HTTP_409_CONFLICT
+        assert response.json()["offset"] == 10
+        response = self.put_chunk(
+            authorized_client, url, image_bytes[10:], 10, size
+        )
+        assert response.status_code == status.HTTP_200_OK
+        assert response.json()["completed"]
+        assert authorized_client.get(url).json()["offset"] == size
+
+    def test_empty_chunk(self, authorized_client):
+        url = self.create_upload(authorized_client, 10)
+        response = authorized_client.put(
+            url,
+            content_type="application/octet-stream",
+            HTTP_CONTENT_RANGE="bytes 0-9/10",
+        )
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert authorized_client.get(url).json()["offset"] == 0
+
+    def test_recipe_with_upload_token(
+        self, authorized_client, recipe_data, image_bytes
+    ):
+        size = len(image_bytes)
+        url = self.create_upload(authorized_client, size)
+        self.put_chunk(authorized_client, url, image_bytes, 0, size)
+        token = ImageUpload.objects.get().token
+        recipe_data["image"] = f"upload:{token}"
+        response = authorized_client.post(
+            reverse("api:recipes-list"),
+            data=json.dumps(recipe_data),
+            content_type="application/json",
+        )
+        assert response.status_code == status.HTTP_201_CREATED
+        assert not ImageUpload.objects.exists()
+
+    def test_recipe_with_incomplete_upload(
+        self, authorized_client, recipe_data, image_bytes
+    ):
+        size = len(image_bytes)
+        url = self.create_upload(authorized_client, size)
+        self.put_chunk(authorized_client, url, image_bytes[:10], 0, size)
+        token = ImageUpload.objects.get().token
+        recipe_data["image"] = f"upload:{token}"
+        response = authorized_client.post(
+            reverse("api:recipes-list"),
+            data=json.dumps(recipe_data),
+            content_type="application/json",
+        )
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+    def test_unknown_file_type_is_rejected(
+        self, authorized_client, recipe_data
+    ):
+        content = b"\x00" * 32
+        url = self.create_upload(authorized_client, len(content))
+        self.put_chunk(authorized_client, url, content, 0, len(content))
+        recipe_data["image"] = f"upload:{ImageUpload.objects.get().token}"
+        response = authorized_client.post(
+            reverse("api:recipes-list"),
+            data=json.dumps(recipe_data),
+            content_type="application/json",
+        )
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        assert "image" in response.json()
+
+    def test_open_uploads_are_capped(self, settings, authorized_client):
+        settings.CHUNKED_UPLOAD_MAX_PER_USER = 2
+        self.create_upload(authorized_client, 10)
+        self.create_upload(authorized_client, 10)
+        response = authorized_client.post(self.uploads_url, data={"size": 10})
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+        ImageUpload.objects.update(expires_at=timezone.now())
+        self.create_upload(authorized_client, 10)
+
+    def test_expired_uploads_are_deleted(
+        self, authorized_client, chunked_upload_root
+    ):
+        url = self.create_upload(authorized_client, 10)
+        self.put_chunk(authorized_client, url, b"0123456789", 0, 10)
+        upload = ImageUpload.objects.get()
+        orphan = chunked_upload_root / "orphan.part"
+        orphan.write_bytes(b"orphan")
+        ImageUpload.objects.update(
+            expires_at=timezone.now() - timedelta(seconds=1)
+        )
+        assert authorized_client.get(url).status_code == (
+            status.HTTP_404_NOT_FOUND
+        )
+        call_command("delete_expired_uploads")
+        assert not ImageUpload.objects.exists()
+        assert not upload.path.exists()
+        # younger than the expiry of an upload
+        assert orphan.exists()
+
+    def test_cascade_delete_removes_files(self, authorized_client, test_user):
+        url = self.create_upload(authorized_client, 10)
+        self.put_chunk(authorized_client, url, b"0123456789", 0, 10)
+        upload = ImageUpload.objects.get()
+        test_user.delete()
+        assert not upload.path.exists()
@@ -0,0 +1,87 @@
+from io import BytesIO, StringIO
+
+import pytest
+from django.core.files.base import ContentFile
+from django.core.management import call_command
+from django.urls import reverse
+from PIL import Image
+
+from recipes.images import (
+    VARIANT_SIZES,
+    InvalidImage,
+    generate_variants,
+    render_variants,
+)
+from recipes.models import Recipe
+
+
+@pytest.fixture
+def jpeg_with_exif():
+    exif = Image.Exif()
+    exif[0x010F] = "Camera maker"
+    buffer = BytesIO()
+    Image.new("RGB", (2000, 1000), "red").save(buffer, "JPEG", exif=exif)
+    return buffer.getvalue()
+
+
+@pytest.fixture
+def recipe_with_image(user_recipe, jpeg_with_exif):
+    user_recipe.image.save("photo.jpg", ContentFile(jpeg_with_exif))
+    return user_recipe
+
+
+class TestImageVariants:
+    def test_render_variants(self, jpeg_with_exif):
+        rendered = render_variants(jpeg_with_exif)
+        assert rendered.keys() == VARIANT_SIZES.keys()
+        for variant, formats in rendered.items():
+            assert formats.keys() == {"webp", "jpeg"}
+            for content in formats.values():
+                image = Image.open(BytesIO(content))
+                assert max(image.size) == max(VARIANT_SIZES[variant])
+                assert not image.getexif()
+
+    def test_render_invalid_image(self):
+        with pytest.raises(InvalidImage):
+            render_variants(b"not an image")
+
+    def test_generated_variants_are_exposed(self, client, recipe_with_image):
+        generate_variants(recipe_with_image)
+        response = client.get(
+            reverse("api:recipes-detail", args=[recipe_with_image.id])
+        )
+        variants = response.json()["image_variants"]
+        assert variants.keys() == VARIANT_SIZES.keys()
+        assert variants["card"]["webp"].endswith(".webp")
+
+    def test_backfill_command(self, recipe_with_image):
+        call_command("generate_image_variants", workers=1)
+        recipe_with_image.refresh_from_db()
+        assert (
+            recipe_with_image.image_variants["source"]
+            == recipe_with_image.image.name
+        )
+        assert not Recipe.objects.filter(image_variants={}).exists()
+
+    def test_backfill_continues_after_failures(self, recipe_with_image):
+        broken = [
+            Recipe.objects.create(
+                author=recipe_with_image.author,
+                name=name,
+                text=name,
+                cooking_time=1,
+                image=image,
+            )
+            for name, image in (
+                ("missing", "recipes/missing.jpg"),
+                ("corrupt", recipe_with_image.image.name),
+            )
+        ]
+        broken[1].image.save("corrupt.jpg", ContentFile(b"not an image"))
+        output = StringIO()
+        call_command("generate_image_variants", workers=1, stdout=output)
+        assert "Rendered variants for 1 recipes, 2 failed" in (
+            output.getvalue()
+        )
+        recipe_with_image.refresh_from_db()
+        assert recipe_with_image.image_variants
@@ -0,0 +1,94 @@
+import pytest
+from django.db import connection
+from django.urls import reverse
+
+from api.index_audit import (
+    SelectRecorder,
+    explain,
+    find_problems,
+    get_aliases,
+    parse_sqlite_plan,
+    walk_postgresql_plan,
+)
+
+
+def test_parse_sqlite_plan():
+    details = [
+        "SCAN recipes_recipe",
+        "CORRELATED SCALAR SUBQUERY 1",
+        "SEARCH U0 USING INDEX favorite_user_created_idx (user_id=?)",
+        "SCAN U1",
+        "USE TEMP B-TREE FOR ORDER BY",
+    ]
+    assert parse_sqlite_plan(details, {"U1": "recipes_favorite"}) == [
+        ("sequential scan", "recipes_recipe", None),
+        ("sequential scan", "recipes_favorite", None),
+        ("sort", "recipes_recipe", None),
+    ]
+
+
+def test_indexed_sqlite_plan_has_no_problems():
+    assert not parse_sqlite_plan(
+        [
+            "SCAN recipes_recipe USING INDEX recipe_created_idx",
+            "SEARCH recipes_tag USING INTEGER PRIMARY KEY (rowid=?)",
+            "USE TEMP B-TREE FOR ORDER BY",
+        ]
+    )
+
+
+def test_get_aliases():
+    sql = (
+        'SELECT 1 FROM "recipes_favorite" U0 '
+        'INNER JOIN "recipes_recipe" U1 ON (U0."recipe_id" = U1."id")'
+    )
+    assert get_aliases(sql) == {
+        "U0": "recipes_favorite",
+        "U1": "recipes_recipe",
+    }
+
+
+def test_walk_postgresql_plan():
+    plan = {
+        "Node Type": "Limit",
+        "Plans": [
+            {
+                "Node Type": "Sort",
+                "Plan Rows": 4000,
+                "Plans": [
+                    {
+                        "Node Type": "Seq Scan",
+                        "Relation Name": "recipes_recipe",
+                        "Plan Rows": 4000,
+                    }
+                ],
+            }
+        ],
+    }
+    assert list(walk_postgresql_plan(plan)) == [
+        ("sort", "recipes_recipe", 4000),
+        ("sequential scan", "recipes_recipe", None),
+    ]
+
+
+def test_small_tables_are_not_reported():
+    problems = [
+        ("sequential scan", "recipes_tag", None),
+        ("sequential scan", "recipes_recipe", None),
+        ("sort", "recipes_recipe", 10),
+    ]
+    sizes = {"recipes_tag": 20, "recipes_recipe": 4000}
+    assert list(find_problems(problems, sizes, min_rows=1000)) == [
+        ("sequential scan", "recipes_recipe", 4000),
+    ]
+
+
+@pytest.mark.usefixtures("recipes_bulk_create")
+def test_recipe_list_is_read_by_index(client):
+    recorder = SelectRecorder()
+    with connection.execute_wrapper(recorder):
+        client.get(reverse("api:recipes-list"))
+    assert recorder.statements
+    for sql, params in recorder.statements:
+        tables = {table for _, table, _ in explain(connection, sql, params)}
+        assert "recipes_recipe" not in tables, sql
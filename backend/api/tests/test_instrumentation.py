@@ -0,0 +1,51 @@
+import json
+import logging
+import re
+
+import pytest
+from django.urls import reverse
+
+SERVER_TIMING = re.compile(
+    r'^db;dur=[\d.]+;desc="(\d+) queries", app;dur=[\d.]+, '
+    r"render;dur=[\d.]+, total;dur=[\d.]+$"
+)
+
+
+@pytest.mark.usefixtures("recipes_bulk_create")
+class TestRequestInstrumentation:
+    url = "api:recipes-list"
+
+    @pytest.fixture
+    def instrumented(self, settings):
+        settings.REQUEST_INSTRUMENTATION_SAMPLE_RATE = 1.0
+        settings.REQUEST_INSTRUMENTATION_LOG_MS = 0
+
+    def test_disabled_by_default(self, client):
+        response = client.get(reverse(self.url))
+        assert "Server-Timing" not in response
+
+    @pytest.mark.usefixtures("instrumented")
+    def test_server_timing_header(self, client, django_assert_num_queries):
+        with django_assert_num_queries(8) as queries:
+            response = client.get(reverse(self.url))
+        match = SERVER_TIMING.match(response["Server-Timing"])
+        assert match, response["Server-Timing"]
+        assert int(match.group(1)) == len(queries)
+
+    @pytest.mark.usefixtures("instrumented")
+    def test_log_line(self, client, caplog):
+        with caplog.at_level(logging.INFO, logger="api.middleware"):
+            client.get(reverse(self.url))
+        line = json.loads(caplog.records[-1].getMessage())
+        assert line["view"] == "api:recipes-list"
+        assert line["status"] == 200
+        assert line["queries"] == 8
+        assert line["slowest_query"].startswith("SELECT")
+
+    @pytest.mark.usefixtures("instrumented")
+    def test_fast_requests_are_not_logged(self, client, settings, caplog):
+        settings.REQUEST_INSTRUMENTATION_LOG_MS = 60000
+        with caplog.at_level(logging.INFO, logger="api.middleware"):
+            response = client.get(reverse(self.url))
+        assert "Server-Timing" in response
+        assert not caplog.records
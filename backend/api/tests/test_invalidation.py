@@ -0,0 +1,117 @@
+import multiprocessing
+
+import pytest
+from django.db import connection, connections, transaction
+from rest_framework.authtoken.models import Token
+
+from api.authentication import local_token_cache
+from invalidation.bus import (
+    InvalidationBus,
+    PendingKeys,
+    bump_versions,
+    get_model_key,
+    invalidation_bus,
+)
+from invalidation.models import CacheVersion
+from recipes.models import Tag
+from recipes.reference import reference_tags
+
+
+@pytest.fixture
+def bus(settings):
+    settings.CACHE_BUS_CHECK_SECONDS = 60
+    return InvalidationBus()
+
+
+@pytest.mark.django_db
+def test_versions_are_created_and_incremented():
+    bump_versions(["recipes.tag"])
+    bump_versions(["recipes.tag", "recipes.recipe"])
+    assert dict(CacheVersion.objects.values_list("key", "version")) == {
+        "recipes.tag": 2,
+        "recipes.recipe": 1,
+    }
+
+
+@pytest.mark.django_db
+def test_keys_of_a_transaction_are_published_once(
+    django_capture_on_commit_callbacks,
+):
+    with django_capture_on_commit_callbacks(execute=True) as callbacks:
+        with transaction.atomic():
+            Tag.objects.create(name="First", color="#000001", slug="first")
+            Tag.objects.create(name="Second", color="#000002", slug="second")
+            invalidation_bus.publish("recipes.recipe")
+    assert len(callbacks) == 1
+    assert callbacks[0].keys == {"recipes.tag", "recipes.recipe"}
+    assert isinstance(callbacks[0], PendingKeys)
+    assert CacheVersion.objects.get(key="recipes.tag").version == 1
+
+
+@pytest.mark.django_db
+def test_subscribers_of_changed_keys_are_called(bus):
+    called = []
+    bus.subscribe("recipes.tag", lambda: called.append("tag"))
+    bus.subscribe("recipes.recipe", lambda: called.append("recipe"))
+    bus.poll()
+    bump_versions(["recipes.tag"])
+    bus.poll()
+    # not before the check interval is over
+    assert called == []
+    bus.expire()
+    bus.poll()
+    assert called == ["tag"]
+    assert bus.version("recipes.tag") == 1
+
+
+@pytest.mark.django_db
+def test_token_change_in_other_process_clears_the_local_token_cache(
+    settings, authorized_client
+):
+    settings.CACHE_BUS_CHECK_SECONDS = 60
+    authorized_client.get("/api/users/me/")
+    assert len(local_token_cache)
+    bump_versions([get_model_key(Token)])
+    invalidation_bus.expire()
+    invalidation_bus.poll()
+    assert not len(local_token_cache)
+
+
+def read_tag_name_in_other_process(pk, pipe):
+    connections.close_all()
+    invalidation_bus.reset()
+    reference_tags.clear()
+    pipe.send(reference_tags.get().by_id[pk].name)
+    pipe.recv()
+    for _ in range(100):
+        name = reference_tags.get().by_id[pk].name
+        if name != "Before":
+            break
+        pipe.poll(0.05)
+    pipe.send(name)
+    connections.close_all()
+
+
+@pytest.mark.django_db(transaction=True)
+def test_other_processes_drop_their_snapshots(settings):
+    if connection.vendor == "sqlite" and connection.is_in_memory_db():
+        pytest.skip("processes do not share an in-memory database")
+    settings.CACHE_BUS_CHECK_SECONDS = 0.1
+    tag = Tag.objects.create(name="Before", color="#000001", slug="before")
+    connections.close_all()
+    pipe, child_pipe = multiprocessing.Pipe()
+    process = multiprocessing.get_context("fork").Process(
+        target=read_tag_name_in_other_process, args=(tag.pk, child_pipe)
+    )
+    process.start()
+    assert pipe.poll(10)
+    assert pipe.recv() == "Before"
+    tag.name = "After"
+    tag.save()
+    pipe.send("go")
+    assert pipe.poll(10)
+    assert pipe.recv() == "After"
+    process.join()
+    assert get_model_key(Tag) in dict(
+        CacheVersion.objects.values_list("key", "version")
+    )
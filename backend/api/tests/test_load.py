@@ -0,0 +1,57 @@
+import asyncio
+
+from api.load import fetch, run_load
+
+
+async def serve(handler, coroutine):
+    server = await asyncio.start_server(handler, "127.0.0.1", 0)
+    port = server.sockets[0].getsockname()[1]
+    async with server:
+        return await coroutine(port)
+
+
+async def respond(reader, writer, received=None):
+    request = await reader.readuntil(b"\r\n\r\n")
+    if received is not None:
+        received.append(request)
+    status = b"404 Not Found" if b"/missing" in request else b"200 OK"
+    writer.write(b"HTTP/1.1 " + status + b"\r\nContent-Length: 0\r\n\r\n")
+    await writer.drain()
+    writer.close()
+
+
+def test_fetch_sends_headers_slowly():
+    received = []
+    status, seconds = asyncio.run(
+        serve(
+            lambda reader, writer: respond(reader, writer, received),
+            lambda port: fetch(
+                "127.0.0.1", port, "/api/", {"X-Test": "1"}, send_delay=0.01
+            ),
+        )
+    )
+    assert status == 200
+    assert seconds >= 0.04
+    assert b"GET /api/ HTTP/1.1\r\n" in received[0]
+    assert b"X-Test: 1\r\n" in received[0]
+
+
+def test_run_load_counts_fast_clients_only():
+    result = asyncio.run(
+        serve(
+            respond,
+            lambda port: run_load(
+                "127.0.0.1",
+                port,
+                [("/api/", {}), ("/missing/", {})],
+                concurrency=2,
+                duration=0.3,
+                slow_clients=2,
+                slow_delay=0.05,
+            ),
+        )
+    )
+    assert result["requests"] > 0
+    # every second request of a client gets a 404
+    assert abs(result["requests"] - result["failures"]) <= 2
+    assert result["p50_ms"] is not None
@@ -0,0 +1,41 @@
+from io import StringIO
+
+import pytest
+from django.conf import settings
+from django.core.management import call_command
+
+from recipes.management.readers import iter_json_array
+from recipes.models import Ingredient
+
+DATA_DIR = settings.BASE_DIR.parent / "data"
+
+
+@pytest.mark.django_db
+class TestLoadIngredients:
+    def test_stream_json_array(self):
+        file = StringIO('[{"a": 1}, {"a": "]"},\n {"a": [3]}]')
+        items = list(iter_json_array(file, chunk_size=4))
+        assert items == [{"a": 1}, {"a": "]"}, {"a": [3]}]
+
+    @pytest.mark.parametrize(
+        "file_name", ("ingredients.json", "ingredients.csv")
+    )
+    def test_load_is_idempotent(self, file_name):
+        call_command("load_ingredients", DATA_DIR / file_name, batch_size=500)
+        count = Ingredient.objects.count()
+        assert count > 2000
+        call_command("load_ingredients", DATA_DIR / file_name)
+        assert Ingredient.objects.count() == count
+
+    def test_dry_run(self):
+        Ingredient.objects.create(name="абрикосы", measurement_unit="г")
+        out = StringIO()
+        call_command(
+            "load_ingredients",
+            DATA_DIR / "ingredients.csv",
+            dry_run=True,
+            stdout=out,
+        )
+        assert Ingredient.objects.count() == 1
+        assert "+ абрикосовое варенье (г)" in out.getvalue()
+        assert "+ абрикосы (г)" not in out.getvalue()
@@ -0,0 +1,135 @@
+import multiprocessing
+import runpy
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+from django.urls import reverse
+from rest_framework import status
+
+from api.metrics import merge_snapshots, registry
+
+GUNICORN_CONFIG = Path(__file__).resolve().parents[2] / "gunicorn.conf.py"
+
+
+def record_in_other_process():
+    registry.inc("foodgram_test_total", {"source": "worker"}, 2)
+    registry.flush()
+
+
+@pytest.fixture
+def metrics_enabled(settings, monkeypatch, tmp_path):
+    settings.METRICS_ENABLED = True
+    settings.METRICS_TOKEN = "secret"
+    monkeypatch.setattr(registry, "enabled", True)
+    monkeypatch.setattr(registry, "directory", tmp_path)
+    registry._reset()
+    yield
+    registry._reset()
+
+
+@pytest.mark.usefixtures("metrics_enabled", "recipes_bulk_create")
+class TestMetrics:
+    url = "api:metrics"
+
+    def scrape(self, client):
+        response = client.get(
+            reverse(self.url), HTTP_AUTHORIZATION="Bearer secret"
+        )
+        assert response.status_code == status.HTTP_200_OK
+        assert response["Content-Type"].startswith("text/plain")
+        return response.content.decode().splitlines()
+
+    def test_request_metrics(self, client):
+        client.get(reverse("api:recipes-list"))
+        lines = self.scrape(client)
+        assert (
+            'foodgram_http_responses_total{status="200",'
+            'view="api:recipes-list"} 1.0'
+        ) in lines
+        assert (
+            'foodgram_http_request_duration_seconds_count{method="GET",'
+            'view="api:recipes-list"} 1'
+        ) in lines
+        assert (
+            'foodgram_db_queries_total{view="api:recipes-list"} 8.0' in lines
+        )
+        assert "# TYPE foodgram_http_request_duration_seconds histogram" in (
+            lines
+        )
+        assert any(
+            line.startswith("process_resident_memory_bytes{pid=")
+            for line in lines
+        )
+        assert any(line.startswith("python_gc_collections{") for line in lines)
+
+    def test_cache_hit_ratio(self, client, authorized_client):
+        for _ in range(4):
+            authorized_client.get(reverse("api:recipes-list"))
+        lines = self.scrape(client)
+        assert 'foodgram_cache_hit_ratio{cache="token_local"} 0.75' in lines
+
+    def test_counters_are_merged_across_processes(self, client):
+        registry.inc("foodgram_test_total", {"source": "worker"}, 1)
+        process = multiprocessing.get_context("fork").Process(
+            target=record_in_other_process
+        )
+        process.start()
+        process.join()
+        lines = self.scrape(client)
+        assert 'foodgram_test_total{source="worker"} 3.0' in lines
+        # gauges of exited processes are not reported
+        assert (
+            sum(
+                line.startswith("process_max_resident_memory_bytes")
+                for line in lines
+            )
+            == 1
+        )
+
+    def test_exited_workers_counters_are_archived(self, client):
+        registry.inc("foodgram_test_total", {"source": "worker"}, 1)
+        child_exit = runpy.run_path(str(GUNICORN_CONFIG))["child_exit"]
+        for _ in range(2):
+            process = multiprocessing.get_context("fork").Process(
+                target=record_in_other_process
+            )
+            process.start()
+            process.join()
+            child_exit(None, SimpleNamespace(pid=process.pid))
+            assert not (registry.directory / f"{process.pid}.json").exists()
+        lines = self.scrape(client)
+        assert 'foodgram_test_total{source="worker"} 5.0' in lines
+        assert (
+            sum(
+                line.startswith("process_max_resident_memory_bytes")
+                for line in lines
+            )
+            == 1
+        )
+
+    def test_worker_being_archived_is_counted_once(self):
+        snapshot = {
+            "pid": 1,
+            "counters": [["foodgram_test_total", {}, 2]],
+            "histograms": [],
+            "gauges": [],
+        }
+        archive = {**snapshot, "pid": None, "archived": [1]}
+        counters, _, _ = merge_snapshots([archive, snapshot])
+        assert counters[("foodgram_test_total", ())] == 2
+
+    def test_token(self, client, settings):
+        response = client.get(reverse(self.url))
+        assert response.status_code == status.HTTP_403_FORBIDDEN
+        response = client.get(
+            reverse(self.url), HTTP_AUTHORIZATION="Bearer secret"
+        )
+        assert response.status_code == status.HTTP_200_OK
+
+    def test_no_token_configured(self, client, settings):
+        settings.METRICS_TOKEN = None
+        response = client.get(reverse(self.url))
+        assert response.status_code == status.HTTP_403_FORBIDDEN
+        response = client.get(reverse(self.url), HTTP_AUTHORIZATION="Bearer ")
+        assert response.status_code == status.HTTP_403_FORBIDDEN
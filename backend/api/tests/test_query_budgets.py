@@ -0,0 +1,195 @@
+from io import StringIO
+
+import pytest
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from djoser.conf import settings as djoser_settings
+
+from recipes.models import Ingredient, Recipe, Tag
+from recipes.reference import refresh_reference_data
+
+User = get_user_model()
+
+# Maximum number of queries per request, authentication included. Every
+# endpoint is requested at both dataset sizes and has to run the same
+# number of queries at both, so a count growing with the number of rows
+# fails even when it is below the budget.
+QUERY_BUDGETS = {
+    "tags-list": 0,
+    "tags-detail": 0,
+    "ingredients-list": 0,
+    "ingredients-search": 0,
+    "recipes-list-anonymous": 5,
+    "recipes-list-cards": 3,
+    "recipes-list": 6,
+    "recipes-list-tag": 6,
+    "recipes-list-favorited": 6,
+    "recipes-list-shopping-cart": 6,
+    "recipes-detail": 5,
+    "recipes-batch": 5,
+    "recipes-create": 13,
+    "recipes-update": 14,
+    "recipes-delete": 12,
+    "feed": 3,
+    "users-list": 3,
+    "users-detail": 2,
+    "users-me": 1,
+    "subscriptions": 4,
+    "subscribe": 10,
+    "favorite": 4,
+    "shopping-cart": 4,
+    "download-shopping-cart": 2,
+}
+
+DATASET_SIZES = {
+    "small": {
+        "users": 6,
+        "recipes_per_author": 2,
+        "authors_share": 0.5,
+        "ingredients_per_recipe": 2,
+        "favorites": 12,
+        "cart_items": 12,
+        "subscriptions": 6,
+    },
+    "large": {
+        "users": 30,
+        "recipes_per_author": 6,
+        "authors_share": 0.5,
+        "ingredients_per_recipe": 6,
+        "favorites": 150,
+        "cart_items": 150,
+        "subscriptions": 150,
+    },
+}
+
+
+def get_endpoint_requests(client, dataset_size, base64_image):
+    call_command("generate_dataset", stdout=StringIO(), **dataset_size)
+    dataset_user = User.objects.get(username="dataset0_0")
+    token = djoser_settings.TOKEN_MODEL.objects.create(user=dataset_user)
+    auth = {"HTTP_AUTHORIZATION": f"Token {token}"}
+    recipe = dataset_user.recipes.order_by("pk").first()
+    other_recipe = (
+        Recipe.objects.exclude(favorites__user=dataset_user)
+        .exclude(shopping_cart__user=dataset_user)
+        .order_by("pk")
+        .first()
+    )
+    author = (
+        User.objects.filter(recipes__isnull=False)
+        .exclude(pk=dataset_user.pk)
+        .exclude(subscribers__user=dataset_user)
+        .first()
+    )
+    tag = Tag.objects.order_by("pk").first()
+    # written recipes grow with the dataset as well
+    per_recipe = dataset_size["ingredients_per_recipe"]
+    payload = {
+        "name": "Budget recipe",
+        "text": "Mix everything",
+        "cooking_time": 10,
+        "image": base64_image,
+        "tags": list(
+            Tag.objects.order_by("pk").values_list("pk", flat=True)[
+                :per_recipe
+            ]
+        ),
+        "ingredients": [
+            {"id": pk, "amount": 10}
+            for pk in Ingredient.objects.order_by("pk").values_list(
+                "pk", flat=True
+            )[:per_recipe]
+        ],
+    }
+    # workers keep the tags and ingredients loaded between requests
+    refresh_reference_data()
+    recipes_url = reverse("api:recipes-list")
+    recipe_url = reverse("api:recipes-detail", args=[recipe.pk])
+    batch_ids = ",".join(
+        map(
+            str,
+            Recipe.objects.order_by("-pk").values_list("pk", flat=True)[:10],
+        )
+    )
+    return {
+        "tags-list": lambda: client.get(reverse("api:tags-list")),
+        "tags-detail": lambda: client.get(
+            reverse("api:tags-detail", args=[tag.pk])
+        ),
+        "ingredients-list": lambda: client.get(
+            reverse("api:ingredients-list")
+        ),
+        "ingredients-search": lambda: client.get(
+            reverse("api:ingredients-list"), {"name": "са"}
+        ),
+        "recipes-list-anonymous": lambda: client.get(recipes_url),
+        "recipes-list-cards": lambda: client.get(
+            recipes_url, {"fields": "id,name,image,cooking_time,tags"}
+        ),
+        "recipes-list": lambda: client.get(recipes_url, **auth),
+        "recipes-list-tag": lambda: client.get(
+            recipes_url, {"tags": tag.slug}, **auth
+        ),
+        "recipes-list-favorited": lambda: client.get(
+            recipes_url, {"is_favorited": 1}, **auth
+        ),
+        "recipes-list-shopping-cart": lambda: client.get(
+            recipes_url, {"is_in_shopping_cart": 1}, **auth
+        ),
+        "recipes-detail": lambda: client.get(recipe_url, **auth),
+        "recipes-batch": lambda: client.get(
+            recipes_url,
+            {"ids": batch_ids},
+            **auth,
+        ),
+        "recipes-create": lambda: client.post(
+            recipes_url, payload, content_type="application/json", **auth
+        ),
+        "recipes-update": lambda: client.patch(
+            recipe_url, payload, content_type="application/json", **auth
+        ),
+        "recipes-delete": lambda: client.delete(recipe_url, **auth),
+        "feed": lambda: client.get(reverse("api:feed"), **auth),
+        "users-list": lambda: client.get(reverse("api:users-list"), **auth),
+        "users-detail": lambda: client.get(
+            reverse("api:users-detail", args=[author.pk]), **auth
+        ),
+        "users-me": lambda: client.get(reverse("api:users-me"), **auth),
+        "subscriptions": lambda: client.get(
+            reverse("api:subscriptions"), {"recipes_limit": 3}, **auth
+        ),
+        "subscribe": lambda: client.post(
+            reverse("api:subscribe", args=[author.pk]), **auth
+        ),
+        "favorite": lambda: client.post(
+            reverse("api:favorites", args=[other_recipe.pk]), **auth
+        ),
+        "shopping-cart": lambda: client.post(
+            reverse("api:shopping_cart", args=[other_recipe.pk]), **auth
+        ),
+        "download-shopping-cart": lambda: client.get(
+            reverse("api:download_shopping_cart"), **auth
+        ),
+    }
+
+
+@pytest.mark.parametrize("endpoint", QUERY_BUDGETS.keys())
+def test_query_budget(endpoint, db, settings, tmp_path, client, base64_image):
+    settings.MEDIA_ROOT = tmp_path
+    query_counts = {}
+    for size, dataset_size in DATASET_SIZES.items():
+        # every dataset is rolled back before the next one is generated
+        with transaction.atomic():
+            request = get_endpoint_requests(
+                client, dataset_size, base64_image
+            )[endpoint]
+            with CaptureQueriesContext(connection) as queries:
+                response = request()
+            transaction.set_rollback(True)
+        assert response.status_code < 400, response.content
+        query_counts[size] = len(queries)
+    assert max(query_counts.values()) <= QUERY_BUDGETS[endpoint], query_counts
+    assert len(set(query_counts.values())) == 1, query_counts
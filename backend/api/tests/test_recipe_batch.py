@@ -0,0 +1,73 @@
+import pytest
+from django.urls import reverse
+
+from recipes.models import Favorite, Recipe, ShoppingCart
+
+
+@pytest.fixture
+def batch_ids(recipes_bulk_create):
+    ids = list(Recipe.objects.values_list("pk", flat=True)[:5])
+    return [ids[3], ids[0], ids[4], ids[1]]
+
+
+def get_batch(client, ids):
+    return client.get(
+        reverse("api:recipes-list"), {"ids": ",".join(map(str, ids))}
+    )
+
+
+def test_recipes_are_returned_in_requested_order(client, batch_ids):
+    response = get_batch(client, batch_ids)
+    assert response.status_code == 200
+    assert [recipe["id"] for recipe in response.json()] == batch_ids
+
+
+def test_repeated_and_missing_ids_are_skipped(client, batch_ids):
+    missing = Recipe.objects.order_by("-pk").first().pk + 1
+    response = get_batch(client, [batch_ids[0], missing, *batch_ids])
+    assert [recipe["id"] for recipe in response.json()] == batch_ids
+
+
+def test_batch_has_the_user_flags(authorized_client, test_user, batch_ids):
+    Favorite.objects.create(user=test_user, recipe_id=batch_ids[1])
+    ShoppingCart.objects.create(user=test_user, recipe_id=batch_ids[2])
+    recipes = get_batch(authorized_client, batch_ids).json()
+    assert [recipe["is_favorited"] for recipe in recipes] == [
+        False,
+        True,
+        False,
+        False,
+    ]
+    assert [recipe["is_in_shopping_cart"] for recipe in recipes] == [
+        False,
+        False,
+        True,
+        False,
+    ]
+    detail = authorized_client.get(
+        reverse("api:recipes-detail", args=[batch_ids[1]])
+    )
+    assert recipes[1] == detail.json()
+
+
+def test_batch_is_combined_with_filters(
+    authorized_client, test_user, batch_ids
+):
+    Favorite.objects.create(user=test_user, recipe_id=batch_ids[1])
+    response = authorized_client.get(
+        reverse("api:recipes-list"),
+        {"ids": ",".join(map(str, batch_ids)), "is_favorited": 1},
+    )
+    assert [recipe["id"] for recipe in response.json()] == [batch_ids[1]]
+
+
+def test_batch_size_is_capped(settings, client, batch_ids):
+    settings.RECIPE_BATCH_MAX_SIZE = 3
+    response = get_batch(client, batch_ids)
+    assert response.status_code == 400
+    assert "ids" in response.json()
+
+
+def test_malformed_ids_are_rejected(client, recipes_bulk_create):
+    response = client.get(reverse("api:recipes-list"), {"ids": "1,two"})
+    assert response.status_code == 400
@@ -0,0 +1,95 @@
+import pytest
+from django.urls import reverse
+
+from recipes.models import Favorite, Recipe
+
+URL = reverse("api:changes")
+
+
+@pytest.fixture(autouse=True)
+def settled_immediately(settings):
+    settings.RECIPE_CHANGES_SETTLE_SECONDS = 0
+
+
+def sync(client, cursor=None, **params):
+    if cursor is not None:
+        params["since"] = cursor
+    response = client.get(URL, params)
+    assert response.status_code == 200
+    return response.json()
+
+
+def test_first_sync_lists_every_recipe(client, recipes_bulk_create):
+    page = sync(client, limit=1000)
+    assert not page["has_more"]
+    assert [change["id"] for change in page["results"]] == list(
+        Recipe.objects.order_by("updated_at", "pk").values_list(
+            "pk", flat=True
+        )
+    )
+    change = page["results"][0]
+    assert not change["deleted"]
+    assert change["recipe"] == (
+        client.get(reverse("api:recipes-detail", args=[change["id"]])).json()
+    )
+
+
+def test_up_to_date_client_gets_no_changes(
+    client, recipes_bulk_create, django_assert_num_queries
+):
+    cursor = sync(client, limit=1000)["cursor"]
+    with django_assert_num_queries(1):
+        page = sync(client, cursor)
+    assert page == {"cursor": cursor, "has_more": False, "results": []}
+
+
+def test_saved_and_deleted_recipes_are_synced_in_order(
+    client, recipes_bulk_create
+):
+    cursor = sync(client, limit=1000)["cursor"]
+    updated, deleted = Recipe.objects.all()[:2]
+    updated.name = "Renamed"
+    updated.save()
+    deleted_id = deleted.pk
+    deleted.delete()
+    page = sync(client, cursor)
+    assert page["results"][0]["recipe"]["name"] == "Renamed"
+    assert page["results"][1:] == [
+        {"id": deleted_id, "deleted": True, "recipe": None}
+    ]
+    assert sync(client, page["cursor"])["results"] == []
+
+
+def test_sync_resumes_from_every_cursor(client, recipes_bulk_create):
+    ids = []
+    page = sync(client, limit=3)
+    ids += [change["id"] for change in page["results"]]
+    while page["has_more"]:
+        page = sync(client, page["cursor"], limit=3)
+        ids += [change["id"] for change in page["results"]]
+    assert sorted(ids) == sorted(Recipe.objects.values_list("pk", flat=True))
+
+
+def test_unsettled_changes_are_synced_later(
+    settings, client, recipes_bulk_create
+):
+    settings.RECIPE_CHANGES_SETTLE_SECONDS = 60
+    assert sync(client) == {"cursor": None, "has_more": False, "results": []}
+
+
+def test_payloads_have_the_user_flags(
+    authorized_client, test_user, recipes_bulk_create
+):
+    recipe = Recipe.objects.first()
+    Favorite.objects.create(user=test_user, recipe=recipe)
+    page = sync(authorized_client, limit=1000)
+    favorited = [
+        change["id"]
+        for change in page["results"]
+        if change["recipe"]["is_favorited"]
+    ]
+    assert favorited == [recipe.pk]
+
+
+def test_bad_cursor(client, recipes_bulk_create):
+    assert client.get(URL, {"since": "x"}).status_code == 404
@@ -0,0 +1,91 @@
+import json
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+
+from recipes.models import Recipe
+
+
+@pytest.mark.usefixtures("recipes_bulk_create")
+class TestRecipeTransfer:
+    def export(self):
+        out = StringIO()
+        call_command("export_recipes", stdout=out, stderr=StringIO())
+        return out.getvalue()
+
+    def test_export(self):
+        rows = [json.loads(line) for line in self.export().splitlines()]
+        assert len(rows) == Recipe.objects.count()
+        recipe = Recipe.objects.order_by("pk").first()
+        ingredient = recipe.ingredients.get()
+        assert rows[0] == {
+            "name": recipe.name,
+            "text": recipe.text,
+            "cooking_time": recipe.cooking_time,
+            "image": recipe.image.name,
+            "created_at": recipe.created_at.isoformat(),
+            "author": recipe.author.email,
+            "tags": [tag.slug for tag in recipe.tags.all()],
+            "ingredients": [
+                [
+                    ingredient.ingredient.name,
+                    ingredient.ingredient.measurement_unit,
+                    ingredient.amount,
+                ]
+            ],
+        }
+
+    def test_round_trip(self, tmp_path):
+        export_file = tmp_path / "recipes.jsonl"
+        export_file.write_text(self.export())
+        exported = export_file.read_text()
+        Recipe.objects.all().delete()
+        call_command(
+            "import_recipes",
+            export_file,
+            batch_size=3,
+            stdout=StringIO(),
+            stderr=StringIO(),
+        )
+        assert self.export() == exported
+
+    def test_unknown_author_is_skipped(self, tmp_path):
+        rows = [json.loads(line) for line in self.export().splitlines()]
+        rows[0]["author"] = "nobody@nowhere.com"
+        import_file = tmp_path / "recipes.jsonl"
+        import_file.write_text("\n".join(json.dumps(row) for row in rows))
+        count = Recipe.objects.count()
+        call_command(
+            "import_recipes", import_file, stdout=StringIO(), stderr=StringIO()
+        )
+        assert Recipe.objects.count() == 2 * count - 1
+
+    def test_malformed_lines_are_skipped(self, tmp_path):
+        lines = self.export().splitlines()
+        rows = [json.loads(line) for line in lines]
+        missing_author = {**rows[0]}
+        del missing_author["author"]
+        malformed = [
+            "{not json",
+            json.dumps(missing_author),
+            json.dumps({**rows[0], "created_at": "yesterday"}),
+            json.dumps({**rows[0], "created_at": None}),
+            json.dumps(["not", "a", "recipe"]),
+        ]
+        middle = len(lines) // 2
+        import_file = tmp_path / "recipes.jsonl"
+        import_file.write_text(
+            "\n".join(lines[:middle] + malformed + lines[middle:])
+        )
+        count = Recipe.objects.count()
+        out = StringIO()
+        call_command(
+            "import_recipes",
+            import_file,
+            batch_size=2,
+            stdout=out,
+            stderr=StringIO(),
+        )
+        assert Recipe.objects.count() == 2 * count
+        assert f"skipped {len(malformed)}" in out.getvalue()
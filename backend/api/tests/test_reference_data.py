@@ -0,0 +1,118 @@
+import pytest
+from django.urls import reverse
+
+from invalidation.bus import bump_versions, invalidation_bus
+from recipes.models import Ingredient, Recipe, Tag
+from recipes.reference import TagRecord, reference_ingredients, reference_tags
+
+
+@pytest.mark.django_db
+def test_snapshot_is_indexed_by_id_and_slug(tags_bulk_create):
+    snapshot = reference_tags.get()
+    tag = Tag.objects.first()
+    record = snapshot.by_id[tag.pk]
+    assert snapshot.by_slug[tag.slug] is record
+    assert (record.name, record.color) == (tag.name, tag.color)
+    assert [r.id for r in snapshot.records] == list(
+        Tag.objects.values_list("pk", flat=True)
+    )
+
+
+def test_records_are_immutable():
+    record = TagRecord(1, "Breakfast", "#ffffff", "breakfast")
+    with pytest.raises(AttributeError):
+        record.name = "Lunch"
+    with pytest.raises(AttributeError):
+        record.extra = True
+    assert record.to_model().pk == 1
+
+
+@pytest.mark.django_db
+def test_snapshot_is_loaded_once(tags_bulk_create, django_assert_num_queries):
+    # the versions of the invalidation bus and the tags
+    with django_assert_num_queries(2):
+        reference_tags.get()
+        reference_tags.get()
+
+
+@pytest.mark.django_db
+def test_edit_reloads_the_snapshot_on_commit(
+    tags_bulk_create, django_capture_on_commit_callbacks
+):
+    reference_tags.get()
+    tag = Tag.objects.first()
+    tag.name = "Renamed"
+    with django_capture_on_commit_callbacks(execute=True):
+        tag.save()
+    assert reference_tags.get().by_id[tag.pk].name == "Renamed"
+
+
+@pytest.mark.django_db
+def test_other_workers_reload_after_the_check_interval(
+    settings, tags_bulk_create
+):
+    settings.CACHE_BUS_CHECK_SECONDS = 60
+    snapshot = reference_tags.get()
+    # another worker only changes the version in the table
+    bump_versions([reference_tags.key])
+    assert reference_tags.get() is snapshot
+    invalidation_bus.expire()
+    assert reference_tags.get() is not snapshot
+
+
+@pytest.mark.django_db
+def test_ingredients_are_resolved_without_joining(
+    client, user_recipe, django_assert_num_queries
+):
+    url = reverse("api:recipes-detail", args=[user_recipe.pk])
+    client.get(url)
+    with django_assert_num_queries(4):
+        response = client.get(url)
+    amount = user_recipe.ingredients.select_related("ingredient").first()
+    ingredient = next(
+        item
+        for item in response.json()["ingredients"]
+        if item["id"] == amount.ingredient_id
+    )
+    assert ingredient["name"] == amount.ingredient.name
+    assert ingredient["measurement_unit"] == (
+        amount.ingredient.measurement_unit
+    )
+    tag = user_recipe.tags.first()
+    assert {
+        "id": tag.pk,
+        "name": tag.name,
+        "color": tag.color,
+        "slug": tag.slug,
+    } in response.json()["tags"]
+
+
+@pytest.mark.django_db
+def test_ingredient_newer_than_the_snapshot_is_read_from_the_table(
+    ingredients_bulk_create,
+):
+    reference_ingredients.get()
+    ingredient = Ingredient.objects.create(name="fresh", measurement_unit="g")
+    assert reference_ingredients.lookup(ingredient.pk).name == "fresh"
+
+
+@pytest.mark.django_db
+def test_recipes_are_filtered_by_tag_slugs(client, recipes_bulk_create):
+    tag = Tag.objects.first()
+    response = client.get(reverse("api:recipes-list"), {"tags": tag.slug})
+    assert response.json()["count"] == Recipe.objects.filter(tags=tag).count()
+    response = client.get(reverse("api:recipes-list"), {"tags": "missing"})
+    assert response.status_code == 400
+
+
+def test_recipe_with_unknown_tag_is_rejected(
+    authorized_client, recipe_data, new_recipe_data
+):
+    new_recipe_data["tags"].append(0)
+    response = authorized_client.post(
+        reverse("api:recipes-list"),
+        new_recipe_data,
+        content_type="application/json",
+    )
+    assert response.status_code == 400
+    assert "tags" in response.json()
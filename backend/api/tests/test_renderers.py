@@ -0,0 +1,103 @@
+from datetime import date, datetime, time, timedelta, timezone
+from decimal import Decimal
+from io import BytesIO
+from uuid import UUID
+
+import msgpack
+import pytest
+from django.core.files.base import ContentFile
+from django.db.models.fields.files import ImageFieldFile
+from django.urls import reverse
+from django.utils.translation import gettext_lazy
+from rest_framework.exceptions import ParseError
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.serializer_helpers import ReturnDict
+
+from api.parsers import MessagePackParser, ORJSONParser
+from api.renderers import MessagePackRenderer, ORJSONRenderer
+from recipes.models import Recipe
+
+VALUES = {
+    "text": "Щи из капусты",
+    "decimal": Decimal("12.50"),
+    "aware": datetime(2024, 3, 1, 12, 30, tzinfo=timezone.utc),
+    "offset": datetime(
+        2024, 3, 1, 12, 30, 0, 1500, tzinfo=timezone(timedelta(hours=3))
+    ),
+    "naive": datetime(2024, 3, 1, 12, 30, 15),
+    "date": date(2024, 3, 1),
+    "time": time(7, 5, 30, 250),
+    "duration": timedelta(minutes=90),
+    "uuid": UUID("12345678-1234-5678-1234-567812345678"),
+    "lazy": gettext_lazy("Recipe"),
+    "bytes": b"raw",
+    "nested": ReturnDict({1: [1.5, None, True, (2, 3)]}, serializer=None),
+}
+
+
+def test_orjson_matches_the_stock_renderer():
+    assert ORJSONRenderer().render(VALUES) == JSONRenderer().render(VALUES)
+    # beyond what orjson serializes
+    huge = {"huge": 2**70}
+    assert ORJSONRenderer().render(huge) == JSONRenderer().render(huge)
+
+
+def test_image_files_are_rendered_like_the_stock_renderer(settings, tmp_path):
+    settings.MEDIA_ROOT = tmp_path
+    field = Recipe._meta.get_field("image")
+    name = field.storage.save("recipes/cake.png", ContentFile(b"pixels"))
+    data = {"image": ImageFieldFile(None, field, name)}
+    assert ORJSONRenderer().render(data) == JSONRenderer().render(data)
+
+
+def test_indented_json_is_rendered_by_the_stock_renderer():
+    media_type = "application/json; indent=4"
+    assert ORJSONRenderer().render(VALUES, media_type) == (
+        JSONRenderer().render(VALUES, media_type)
+    )
+
+
+def test_recipe_pages_are_byte_compatible(client, recipes_bulk_create):
+    data = client.get(reverse("api:recipes-list"), {"limit": 20}).data
+    assert ORJSONRenderer().render(data) == JSONRenderer().render(data)
+
+
+def test_recipes_are_negotiated_as_msgpack(client, recipes_bulk_create):
+    url = reverse("api:recipes-list")
+    response = client.get(url, HTTP_ACCEPT="application/msgpack")
+    assert response["Content-Type"] == "application/msgpack"
+    assert msgpack.unpackb(response.content) == client.get(url).json()
+
+
+def test_recipe_is_created_from_msgpack(
+    authorized_client, recipe_data, new_recipe_data
+):
+    response = authorized_client.post(
+        reverse("api:recipes-list"),
+        MessagePackRenderer().render(new_recipe_data),
+        content_type="application/msgpack",
+    )
+    assert response.status_code == 201
+    assert response.json()["name"] == new_recipe_data["name"]
+
+
+def test_json_body_is_parsed(authorized_client, recipe_data, new_recipe_data):
+    response = authorized_client.post(
+        reverse("api:recipes-list"),
+        new_recipe_data,
+        content_type="application/json",
+    )
+    assert response.status_code == 201
+
+
+@pytest.mark.parametrize(
+    "parser, content",
+    [
+        (ORJSONParser(), b'{"name": '),
+        (ORJSONParser(), b'{"amount": NaN}'),
+        (MessagePackParser(), b"\xc1"),
+    ],
+)
+def test_malformed_bodies_are_rejected(parser, content):
+    with pytest.raises(ParseError):
+        parser.parse(BytesIO(content))
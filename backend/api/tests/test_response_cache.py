@@ -0,0 +1,182 @@
+from concurrent.futures import ThreadPoolExecutor
+from importlib import reload
+from threading import Event, Timer
+from time import monotonic, sleep
+
+import pytest
+from asgiref.sync import async_to_sync
+from django.core.cache import cache
+from django.db import connection
+from django.test import AsyncClient
+from django.test.utils import CaptureQueriesContext
+from django.urls import clear_url_caches, reverse
+
+import api.urls
+import foodgram_backend.urls
+from api.response_cache import ResponseCache, recipe_responses
+from recipes.models import Recipe
+
+
+@pytest.fixture
+def response_cache(settings):
+    settings.RESPONSE_CACHE_TTL = 60
+    settings.RESPONSE_CACHE_STALE_SECONDS = 60
+    cache.clear()
+    yield
+    cache.clear()
+
+
+@pytest.fixture
+def inline_refresh(monkeypatch):
+    # the test transaction is not visible to other threads
+    monkeypatch.setattr(
+        recipe_responses, "schedule_refresh", recipe_responses.refresh
+    )
+
+
+@pytest.fixture
+def responses(response_cache):
+    return ResponseCache("test_responses", [])
+
+
+def wait_until(condition, timeout=5):
+    deadline = monotonic() + timeout
+    while not condition():
+        assert monotonic() < deadline
+        sleep(0.01)
+
+
+def test_anonymous_responses_are_cached(
+    response_cache, client, recipes_bulk_create, django_assert_num_queries
+):
+    url = reverse("api:recipes-list")
+    first = client.get(url, {"limit": 3, "page": 1})
+    with django_assert_num_queries(0):
+        second = client.get(url, {"page": 1, "limit": 3})
+    assert second.status_code == 200
+    assert second.json() == first.json()
+
+
+def test_authenticated_responses_are_not_cached(
+    response_cache, authorized_client, recipes_bulk_create
+):
+    url = reverse("api:recipes-list")
+    authorized_client.get(url)
+    with CaptureQueriesContext(connection) as queries:
+        authorized_client.get(url)
+    assert len(queries)
+
+
+def test_changed_recipe_is_served_stale_then_refreshed(
+    response_cache,
+    inline_refresh,
+    client,
+    recipes_bulk_create,
+    django_capture_on_commit_callbacks,
+):
+    # created without signals, so no keys are pending
+    recipe = Recipe.objects.first()
+    url = reverse("api:recipes-detail", args=[recipe.pk])
+    client.get(url)
+    recipe.name = "Renamed"
+    with django_capture_on_commit_callbacks(execute=True):
+        recipe.save()
+    assert client.get(url).json()["name"] != "Renamed"
+    assert client.get(url).json()["name"] == "Renamed"
+
+
+def test_deleted_recipe_is_dropped_on_refresh(
+    response_cache,
+    inline_refresh,
+    client,
+    recipes_bulk_create,
+    django_capture_on_commit_callbacks,
+):
+    recipe = Recipe.objects.first()
+    url = reverse("api:recipes-detail", args=[recipe.pk])
+    client.get(url)
+    with django_capture_on_commit_callbacks(execute=True):
+        recipe.delete()
+    assert client.get(url).status_code == 200
+    assert client.get(url).status_code == 404
+
+
+def test_concurrent_misses_compute_once(responses):
+    calls = []
+
+    def compute():
+        calls.append(1)
+        sleep(0.2)
+        return {"calls": len(calls)}
+
+    with ThreadPoolExecutor(8) as pool:
+        results = list(
+            pool.map(lambda _: responses.get("hot", compute), range(8))
+        )
+    assert len(calls) == 1
+    assert results == [{"calls": 1}] * 8
+
+
+def test_missing_entry_computed_by_other_worker_is_awaited(responses):
+    # another worker holds the lock and stores the entry a bit later
+    assert responses.acquire("hot")
+    Timer(0.1, responses.store, ["hot", {"from": "other"}, ()]).start()
+    assert responses.get("hot", lambda: {"from": "this"}) == {"from": "other"}
+
+
+def test_stale_entry_is_served_while_one_request_refreshes(
+    settings, responses
+):
+    settings.RESPONSE_CACHE_TTL = 0
+    responses.store("hot", {"version": 1}, ())
+    settings.RESPONSE_CACHE_TTL = 60
+    calls = []
+    computed = Event()
+
+    def compute():
+        calls.append(1)
+        computed.wait(5)
+        return {"version": 2}
+
+    with ThreadPoolExecutor(8) as pool:
+        results = list(
+            pool.map(lambda _: responses.get("hot", compute), range(8))
+        )
+    assert results == [{"version": 1}] * 8
+    computed.set()
+    wait_until(lambda: responses.get("hot", compute) == {"version": 2})
+    assert len(calls) == 1
+
+
+@pytest.fixture
+def async_views(settings):
+    settings.ASYNC_VIEWS = True
+    reload(api.urls)
+    reload(foodgram_backend.urls)
+    clear_url_caches()
+    yield
+    settings.ASYNC_VIEWS = False
+    reload(api.urls)
+    reload(foodgram_backend.urls)
+    clear_url_caches()
+
+
+def test_async_views_use_the_response_cache(
+    response_cache, async_views, recipes_bulk_create, django_assert_num_queries
+):
+    url = reverse("api:recipes-list")
+    client = AsyncClient()
+    first = async_to_sync(client.get)(url)
+    with django_assert_num_queries(0):
+        second = async_to_sync(client.get)(url)
+    assert second.json() == first.json()
+
+
+def test_responses_are_cached_per_host(
+    response_cache, settings, client, recipes_bulk_create
+):
+    settings.ALLOWED_HOSTS = ["one.example", "two.example"]
+    url = reverse("api:recipes-list")
+    client.get(url, {"limit": 1}, HTTP_HOST="one.example")
+    response = client.get(url, {"limit": 1}, HTTP_HOST="two.example")
+    assert response.json()["next"].startswith("http://two.example/")
@@ -0,0 +1,62 @@
+from io import StringIO
+
+import pytest
+from django.core.management import call_command
+from django.urls import reverse
+
+from api.slow_queries import normalize, read_entries, slow_query_log
+
+
+def test_normalize():
+    assert normalize(
+        "SELECT *  FROM t\n WHERE id IN (%s, %s, %s) AND name = 'it''s' "
+        "LIMIT 21"
+    ) == ("SELECT * FROM t WHERE id IN (...) AND name = ? LIMIT ?")
+
+
+@pytest.mark.usefixtures("recipes_bulk_create")
+class TestSlowQueryLog:
+    @pytest.fixture(autouse=True)
+    def slow_query_dir(self, settings, monkeypatch, tmp_path):
+        settings.SLOW_QUERY_THRESHOLD_MS = 1e-6
+        settings.SLOW_QUERY_EXPLAIN_SAMPLE_RATE = 1.0
+        settings.SLOW_QUERY_DIR = tmp_path
+        monkeypatch.setattr(slow_query_log, "directory", tmp_path)
+        slow_query_log.clear()
+        yield tmp_path
+        slow_query_log.clear()
+
+    def test_slow_queries_are_recorded(self, client, slow_query_dir):
+        client.get(reverse("api:recipes-list"))
+        client.get(reverse("api:recipes-list"), {"page": 2})
+        entries = read_entries(slow_query_dir)
+        assert entries
+        assert all(entry["views"] == ["api:recipes-list"] for entry in entries)
+        # both pages share the fingerprints of their queries
+        assert max(entry["count"] for entry in entries) == 2
+        assert all(
+            entry["plan"]
+            for entry in entries
+            if entry["sql"].startswith("SELECT")
+        )
+
+    def test_other_views_are_not_recorded(self, client, slow_query_dir):
+        client.get(reverse("api:tags-list"))
+        assert not read_entries(slow_query_dir)
+
+    def test_disabled(self, client, settings, slow_query_dir):
+        settings.SLOW_QUERY_THRESHOLD_MS = 0
+        client.get(reverse("api:recipes-list"))
+        assert not read_entries(slow_query_dir)
+
+    def test_command(self, client):
+        client.get(reverse("api:recipes-list"))
+        out = StringIO()
+        call_command("slow_queries", limit=1, stdout=out)
+        output = out.getvalue()
+        assert "views: api:recipes-list" in output
+        assert output.count("count=") == 1
+        call_command("slow_queries", clear=True, stdout=StringIO())
+        out = StringIO()
+        call_command("slow_queries", stdout=out)
+        assert "No slow queries recorded" in out.getvalue()
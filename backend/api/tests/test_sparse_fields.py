@@ -0,0 +1,100 @@
+import pytest
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from recipes.models import Recipe
+
+CARD_FIELDS = "id,name,image,cooking_time,author,tags,is_favorited"
+
+
+def test_card_list_reads_no_text_and_no_ingredients(
+    authorized_client, recipes_bulk_create
+):
+    with CaptureQueriesContext(connection) as queries:
+        response = authorized_client.get(
+            reverse("api:recipes-list"), {"fields": CARD_FIELDS}
+        )
+    assert response.status_code == 200
+    recipe = response.json()["results"][0]
+    assert set(recipe) == set(CARD_FIELDS.split(","))
+    # relations that are not expanded are given as primary keys
+    assert isinstance(recipe["author"], int)
+    assert all(isinstance(tag, int) for tag in recipe["tags"])
+    statements = [query["sql"] for query in queries]
+    assert not any("recipeingredientamount" in sql for sql in statements)
+    assert not any('"recipes_recipe"."text"' in sql for sql in statements)
+
+
+def test_expanded_relations_are_returned_in_full(client, user_recipe):
+    response = client.get(
+        reverse("api:recipes-detail", args=[user_recipe.pk]),
+        {"fields": "id,ingredients", "expand": "author,tags"},
+    )
+    recipe = response.json()
+    assert set(recipe) == {"id", "author", "tags", "ingredients"}
+    assert recipe["author"]["username"] == user_recipe.author.username
+    assert {tag["slug"] for tag in recipe["tags"]} == set(
+        user_recipe.tags.values_list("slug", flat=True)
+    )
+    assert sorted(recipe["ingredients"]) == sorted(
+        user_recipe.ingredients.values_list("ingredient_id", flat=True)
+    )
+
+
+def test_expand_alone_keeps_every_field(client, user_recipe):
+    url = reverse("api:recipes-detail", args=[user_recipe.pk])
+    assert client.get(url, {"expand": "author"}).json() == (
+        client.get(url).json()
+    )
+
+
+@pytest.mark.parametrize(
+    "params, error_field",
+    [
+        ({"fields": "id,password"}, "fields"),
+        ({"fields": "id", "expand": "name"}, "expand"),
+    ],
+)
+def test_unknown_fields_are_rejected(
+    client, recipes_bulk_create, params, error_field
+):
+    response = client.get(reverse("api:recipes-list"), params)
+    assert response.status_code == 400
+    assert error_field in response.json()
+
+
+def test_subscriptions_with_recipe_ids(
+    authorized_client, user_subscription, prominent_author
+):
+    with CaptureQueriesContext(connection) as queries:
+        response = authorized_client.get(
+            reverse("api:subscriptions"),
+            {"fields": "id,username,recipes", "recipes_limit": 2},
+        )
+    author = response.json()["results"][0]
+    assert author == {
+        "id": prominent_author.pk,
+        "username": prominent_author.username,
+        "recipes": list(
+            Recipe.objects.filter(author=prominent_author).values_list(
+                "pk", flat=True
+            )[:2]
+        ),
+    }
+    statements = [query["sql"] for query in queries]
+    # the page count is the only count
+    assert sum("COUNT(" in sql for sql in statements) == 1
+    assert not any('"recipes_recipe"."text"' in sql for sql in statements)
+
+
+def test_written_recipe_is_returned_in_full(
+    authorized_client, recipe_data, new_recipe_data
+):
+    response = authorized_client.post(
+        f"{reverse('api:recipes-list')}?fields=id",
+        new_recipe_data,
+        content_type="application/json",
+    )
+    assert response.status_code == 201
+    assert "ingredients" in response.json()
@@ -0,0 +1,79 @@
+import pytest
+from django.core.cache import cache
+from django.urls import reverse
+from rest_framework import status
+
+from api.authentication import get_token_cache_key, local_token_cache
+
+
+@pytest.fixture(autouse=True)
+def clear_token_cache():
+    local_token_cache.clear()
+    cache.clear()
+
+
+class TestCachedTokenAuthentication:
+    me_url = reverse("api:users-me")
+
+    def test_cached_token_skips_lookup(
+        self, authorized_client, django_assert_num_queries
+    ):
+        authorized_client.get(self.me_url)
+        # /me/ serializes request.user, so no query is left at all
+        with django_assert_num_queries(0):
+            response = authorized_client.get(self.me_url)
+        assert response.status_code == status.HTTP_200_OK
+
+    def test_snapshot_has_no_password_hash(self, authorized_client, test_user):
+        authorized_client.get(self.me_url)
+        token = test_user.auth_token
+        snapshot = cache.get(get_token_cache_key(token.key))
+        assert test_user.password not in repr(snapshot)
+        assert "password" not in snapshot[0]
+
+    def test_password_change_with_cached_user(
+        self, authorized_client, test_user, test_user_password
+    ):
+        authorized_client.get(self.me_url)
+        new_password = "vQ7pFm2sLx9wRt4k"
+        response = authorized_client.post(
+            reverse("api:users-set-password"),
+            data={
+                "new_password": new_password,
+                "current_password": test_user_password,
+            },
+        )
+        assert response.status_code == status.HTTP_204_NO_CONTENT
+        test_user.refresh_from_db()
+        assert test_user.check_password(new_password)
+        assert test_user.first_name
+
+    def test_logout_invalidates_token(self, authorized_client):
+        authorized_client.get(self.me_url)
+        response = authorized_client.post(reverse("api:logout"))
+        assert response.status_code == status.HTTP_204_NO_CONTENT
+        response = authorized_client.get(self.me_url)
+        assert response.status_code == status.HTTP_401_UNAUTHORIZED
+
+    def test_password_change_invalidates_snapshot(
+        self, authorized_client, test_user_password
+    ):
+        authorized_client.get(self.me_url)
+        response = authorized_client.post(
+            reverse("api:users-set-password"),
+            data={
+                "new_password": "vQ7pFm2sLx9wRt4k",
+                "current_password": test_user_password,
+            },
+        )
+        assert response.status_code == status.HTTP_204_NO_CONTENT
+        assert len(local_token_cache) == 0
+
+    def test_deactivation_invalidates_token(
+        self, authorized_client, test_user
+    ):
+        authorized_client.get(self.me_url)
+        test_user.is_active = False
+        test_user.save()
+        response = authorized_client.get(self.me_url)
+        assert response.status_code == status.HTTP_401_UNAUTHORIZED
@@ -0,0 +1,55 @@
+from django.conf import settings
+from rest_framework.throttling import SimpleRateThrottle
+
+from api.cache import LocalLRUCache
+
+
+class LocalHistoryCache(LocalLRUCache):
+    """Adapts LocalLRUCache to the cache interface used by throttles."""
+
+    def set(self, key, value, timeout=None):
+        super().set(key, value)
+
+
+class InMemoryRateThrottle(SimpleRateThrottle):
+    """Sliding-window throttle with per-process in-memory history.
+
+    Checked in APIView.initial(), so floods are rejected before the
+    serializer computes any password hash.
+    """
+
+    cache = None
+
+    def __init__(self):
+        super().__init__()
+        if type(self).cache is None:
+            _, duration = self.parse_rate(self.rate)
+            type(self).cache = LocalHistoryCache(
+                max_size=settings.AUTH_THROTTLE_MAX_KEYS, ttl=duration
+            )
+
+    def get_ident_value(self, request):
+        """Identifies the client by its address unless overridden."""
+        return self.get_ident(request)
+
+    def get_cache_key(self, request, view):
+        ident = self.get_ident_value(request)
+        if not ident:
+            return None
+        return self.cache_format % {"scope": self.scope, "ident": ident}
+
+
+class AuthIPRateThrottle(InMemoryRateThrottle):
+    scope = "auth_ip"
+
+
+class AuthEmailRateThrottle(InMemoryRateThrottle):
+    scope = "auth_email"
+
+    def get_ident_value(self, request):
+        if request.user.is_authenticated:
+            return request.user.email.lower()
+        email = request.data.get("email")
+        if isinstance(email, str):
+            return email.strip().lower()
+        return None
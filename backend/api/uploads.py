@@ -0,0 +1,65 @@
+import re
+
+import filetype
+from django.core.files.uploadedfile import UploadedFile
+from rest_framework.exceptions import ParseError
+
+CHUNK_SIZE = 64 * 1024
+content_range_regex = re.compile(r"^bytes (\d+)-(\d+)/(\d+)$")
+
+
+class UnknownFileType(ValueError):
+    pass
+
+
+class ChunkedUploadedFile(UploadedFile):
+    """A completed chunked upload, handed to storages as a local file.
+
+    Providing temporary_file_path() lets FileSystemStorage move the file
+    into place and lets Pillow validate it without reading it to memory.
+    """
+
+    def __init__(self, upload):
+        self.upload = upload
+        extension = filetype.guess_extension(str(upload.path))
+        if extension is None:
+            raise UnknownFileType(f"{upload.token} is not a known file type")
+        super().__init__(
+            file=open(upload.path, "rb"),
+            name=f"{upload.token}.{extension}",
+            size=upload.size,
+        )
+
+    def temporary_file_path(self):
+        return str(self.upload.path)
+
+
+def parse_content_range(header):
+    """Returns (start, end, total) of a `bytes start-end/total` header."""
+    match = content_range_regex.match(header or "")
+    if match is None:
+        raise ParseError("Content-Range header is missing or invalid.")
+    start, end, total = map(int, match.groups())
+    if end < start:
+        raise ParseError("Content-Range header is missing or invalid.")
+    return start, end, total
+
+
+def write_chunk(path, stream, start, length):
+    """Copies `length` bytes of a stream into a file at `start`.
+
+    Returns the number of bytes written, which is less than `length` if
+    the stream ended early.
+    """
+    path.parent.mkdir(parents=True, exist_ok=True)
+    written = 0
+    with open(path, "r+b" if path.exists() else "wb") as file:
+        file.seek(start)
+        while written < length:
+            chunk = stream.read(min(CHUNK_SIZE, length - written))
+            if not chunk:
+                break
+            file.write(chunk)
+            written += len(chunk)
+        file.truncate(start + written)
+    return written
@@ -1,27 +1,51 @@
+from django.conf import settings
 from django.urls import include, path, re_path
 from rest_framework.routers import DefaultRouter
 
 from api.views import (
+    AsyncDownloadShoppingCartAPIView,
+    AsyncIngredientsViewSet,
+    AsyncRecipeViewSet,
+    AsyncTagViewSet,
     DownloadShoppingCartAPIView,
     FavoritesAPIView,
     FoodgramUserViewSet,
+    ImageUploadAPIView,
+    ImageUploadDetailAPIView,
     IngredientsViewSet,
+    RecipeChangesAPIView,
     RecipeViewSet,
     ShoppingCartAPIView,
     SubscribeAPIView,
+    SubscriptionFeedAPIView,
     SubscriptionListViewSet,
     TagViewSet,
+    TokenCreateView,
+    metrics,
 )
 
 app_name = "api"
 
+# the read endpoints get async views when served by uvicorn workers
+if settings.ASYNC_VIEWS:
+    tag_viewset = AsyncTagViewSet
+    ingredients_viewset = AsyncIngredientsViewSet
+    recipe_viewset = AsyncRecipeViewSet
+    download_shopping_cart_view = AsyncDownloadShoppingCartAPIView
+else:
+    tag_viewset = TagViewSet
+    ingredients_viewset = IngredientsViewSet
+    recipe_viewset = RecipeViewSet
+    download_shopping_cart_view = DownloadShoppingCartAPIView
+
 auth_urlpatterns = [
+    re_path(r"^token/login/?$", TokenCreateView.as_view(), name="login"),
     path("", include("djoser.urls.authtoken")),
 ]
 
 router_v1 = DefaultRouter()
-router_v1.register("tags", TagViewSet, basename="tags")
-router_v1.register("ingredients", IngredientsViewSet, basename="ingredients")
+router_v1.register("tags", tag_viewset, basename="tags")
+router_v1.register("ingredients", ingredients_viewset, basename="ingredients")
 
 users_router_v1 = DefaultRouter()
 users_router_v1.register("", FoodgramUserViewSet, basename="users")
@@ -40,7 +64,7 @@ users_urlpatterns = [
 ]
 
 recipes_router_v1 = DefaultRouter()
-recipes_router_v1.register("", RecipeViewSet, basename="recipes")
+recipes_router_v1.register("", recipe_viewset, basename="recipes")
 recipes_urlpatterns = [
     re_path(
         r"(?P<recipe_id>\d+)/shopping_cart/",
@@ -54,14 +78,23 @@ recipes_urlpatterns = [
     ),
     path(
         "download_shopping_cart/",
-        DownloadShoppingCartAPIView.as_view(),
+        download_shopping_cart_view.as_view(),
         name="download_shopping_cart",
     ),
+    path("feed/", SubscriptionFeedAPIView.as_view(), name="feed"),
+    path("changes/", RecipeChangesAPIView.as_view(), name="changes"),
+    path("uploads/", ImageUploadAPIView.as_view(), name="uploads"),
+    path(
+        "uploads/<uuid:token>/",
+        ImageUploadDetailAPIView.as_view(),
+        name="upload",
+    ),
     path("", include(recipes_router_v1.urls)),
 ]
 
 
 urlpatterns = [
+    path("metrics/", metrics, name="metrics"),
     path("", include(router_v1.urls)),
     path("recipes/", include(recipes_urlpatterns)),
     path("users/", include(users_urlpatterns)),
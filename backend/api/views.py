@@ -1,17 +1,11 @@
+from django.conf import settings
 from django.contrib.auth import get_user_model
-from django.db.models import (
-    BooleanField,
-    Count,
-    Exists,
-    F,
-    OuterRef,
-    Prefetch,
-    Sum,
-    Value,
-)
-from django.http import FileResponse
+from django.db.models import Count, Exists, F, OuterRef, Prefetch, Sum
+from django.http import FileResponse, HttpResponse, HttpResponseForbidden
 from django.shortcuts import get_object_or_404
-from django_filters.rest_framework import DjangoFilterBackend
+from django.utils import timezone
+from django.utils.crypto import constant_time_compare
+from djoser import views as djoser_views
 from djoser.serializers import SetPasswordSerializer
 from rest_framework import (
     decorators,
@@ -23,12 +17,32 @@ from rest_framework import (
     views,
     viewsets,
 )
-
-from api.filters import IngredientFilter, RecipeFilter
-from api.mixins import UserCollectionsMixin
+from rest_framework.exceptions import ParseError
+
+from api.authentication import invalidate_user_tokens
+from api.filters import RecipeFilter, filter_ingredients_by_name
+from api.hashing import set_password
+from api.metrics import collect
+from api.mixins import (
+    AsyncReadOnlyModelMixin,
+    AsyncReferenceDataMixin,
+    AsyncResponseCacheMixin,
+    AsyncViewMixin,
+    RecipeQuerysetMixin,
+    ReferenceDataMixin,
+    ReplicaReadMixin,
+    ResponseCacheMixin,
+    SlowQueryLogMixin,
+    SparseFieldsMixin,
+    UserCollectionsMixin,
+)
+from api.pagination import ChangesPagination, FeedPagination
+from api.parsers import ChunkParser
 from api.permissions import IsAuthorAdminOrReadOnly
+from api.response_cache import recipe_responses
 from api.serializers import (
     FavoriteSerializer,
+    ImageUploadSerializer,
     IngredientSerializer,
     RecipeSerializer,
     RecipeWriteSerializer,
@@ -39,7 +53,17 @@ from api.serializers import (
     UserDetailSerializer,
     UserSerializer,
 )
-from recipes.models import Favorite, Ingredient, Recipe, ShoppingCart, Tag
+from api.throttling import AuthEmailRateThrottle, AuthIPRateThrottle
+from api.uploads import parse_content_range, write_chunk
+from recipes.models import (
+    Favorite,
+    ImageUpload,
+    Ingredient,
+    Recipe,
+    ShoppingCart,
+    Tag,
+)
+from recipes.reference import reference_ingredients, reference_tags
 from users.models import Subscription
 
 User = get_user_model()
@@ -72,6 +96,11 @@ class FoodgramUserViewSet(
             return [permissions.IsAuthenticated()]
         return [permissions.AllowAny()]
 
+    def get_throttles(self):
+        if self.action in ("create", "set_password"):
+            return [AuthIPRateThrottle(), AuthEmailRateThrottle()]
+        return super().get_throttles()
+
     def get_instance(self):
         return self.request.user
 
@@ -84,49 +113,99 @@ class FoodgramUserViewSet(
     def set_password(self, request, *args, **kwargs):
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
-        self.request.user.set_password(serializer.data["new_password"])
+        set_password(self.request.user, serializer.data["new_password"])
         self.request.user.save()
+        invalidate_user_tokens(self.request.user)
         return response.Response(status=status.HTTP_204_NO_CONTENT)
 
 
-class SubscriptionListViewSet(generics.ListAPIView):
+class TokenCreateView(djoser_views.TokenCreateView):
+    throttle_classes = [AuthIPRateThrottle, AuthEmailRateThrottle]
+
+
+class SubscriptionListViewSet(
+    ReplicaReadMixin,
+    SlowQueryLogMixin,
+    SparseFieldsMixin,
+    generics.ListAPIView,
+):
     serializer_class = UserDetailSerializer
     permission_classes = [permissions.IsAuthenticated]
 
     def get_queryset(self):
+        selection = self.get_field_selection()
         subscriptions = self.request.user.subscriptions
-        return (
+        queryset = (
             User.objects.filter(subscribers__user=self.request.user)
-            .annotate(recipes_count=Count("recipes"))
-            .annotate(
+            .defer(*selection.get_deferred_fields(User))
+            .order_by("username")
+        )
+        if selection.includes("recipes_count"):
+            queryset = queryset.annotate(recipes_count=Count("recipes"))
+        if selection.includes("is_subscribed"):
+            queryset = queryset.annotate(
                 is_subscribed=Exists(
                     subscriptions.filter(author=OuterRef("pk"))
                 )
             )
-            .prefetch_related("recipes")
-            .order_by("username")
-        )
+        if selection.expands("recipes"):
+            queryset = queryset.prefetch_related("recipes")
+        elif selection.includes("recipes"):
+            queryset = queryset.prefetch_related(
+                Prefetch(
+                    "recipes", queryset=Recipe.objects.only("pk", "author_id")
+                )
+            )
+        return queryset
 
 
-class TagViewSet(viewsets.ReadOnlyModelViewSet):
+class TagViewSet(
+    ReplicaReadMixin, ReferenceDataMixin, viewsets.ReadOnlyModelViewSet
+):
     queryset = Tag.objects.all()
+    reference = reference_tags
     serializer_class = TagSerializer
     permission_classes = [permissions.AllowAny]
     pagination_class = None
 
 
-class IngredientsViewSet(viewsets.ReadOnlyModelViewSet):
+class AsyncTagViewSet(AsyncViewMixin, AsyncReferenceDataMixin, TagViewSet):
+    pass
+
+
+class IngredientsViewSet(
+    ReplicaReadMixin, ReferenceDataMixin, viewsets.ReadOnlyModelViewSet
+):
     queryset = Ingredient.objects.all()
+    reference = reference_ingredients
     serializer_class = IngredientSerializer
     permission_classes = [permissions.AllowAny]
-    filter_backends = [DjangoFilterBackend]
-    filterset_class = IngredientFilter
     pagination_class = None
 
+    def filter_records(self, records):
+        name = self.request.query_params.get("name")
+        if name:
+            return filter_ingredients_by_name(records, name)
+        return records
+
+
+class AsyncIngredientsViewSet(
+    AsyncViewMixin, AsyncReferenceDataMixin, IngredientsViewSet
+):
+    pass
 
-class RecipeViewSet(viewsets.ModelViewSet):
+
+class RecipeViewSet(
+    ReplicaReadMixin,
+    SlowQueryLogMixin,
+    RecipeQuerysetMixin,
+    ResponseCacheMixin,
+    SparseFieldsMixin,
+    viewsets.ModelViewSet,
+):
     permission_classes = [IsAuthorAdminOrReadOnly]
     filterset_class = RecipeFilter
+    response_cache = recipe_responses
 
     def get_serializer_class(self):
         if self.action in ["list", "retrieve"]:
@@ -136,46 +215,68 @@ class RecipeViewSet(viewsets.ModelViewSet):
     def get_queryset(self):
         if self.action == "destroy":
             return Recipe.objects.all()
-        if self.request.user.is_anonymous:
-            is_favorited = Value(False, output_field=BooleanField())
-            is_in_shopping_cart = Value(False, output_field=BooleanField())
-            is_subscribed = Value(False, output_field=BooleanField())
-        else:
-            is_favorited = Exists(
-                self.request.user.favorites.filter(recipe=OuterRef("pk"))
-            )
-            is_in_shopping_cart = Exists(
-                self.request.user.shopping_cart.filter(recipe=OuterRef("pk"))
-            )
-            is_subscribed = Exists(
-                self.request.user.subscriptions.filter(author=OuterRef("pk"))
-            )
-        return Recipe.objects.prefetch_related(
-            "tags",
-            "ingredients__ingredient",
-            Prefetch(
-                "author",
-                queryset=User.objects.annotate(is_subscribed=is_subscribed),
-            ),
-        ).annotate(
-            is_favorited=is_favorited,
-            is_in_shopping_cart=is_in_shopping_cart,
-        )
+        return self.get_recipe_queryset(self.get_field_selection())
 
+    @property
+    def paginator(self):
+        # a batch requested by ids is capped and returned whole
+        if self.action == "list" and self.request.query_params.get("ids"):
+            return None
+        return super().paginator
 
-class DownloadShoppingCartAPIView(views.APIView):
+
+class AsyncRecipeViewSet(
+    AsyncViewMixin,
+    AsyncResponseCacheMixin,
+    AsyncReadOnlyModelMixin,
+    RecipeViewSet,
+):
+    pass
+
+
+class SubscriptionFeedAPIView(RecipeQuerysetMixin, generics.ListAPIView):
+    serializer_class = RecipeSerializer
+    permission_classes = [permissions.IsAuthenticated]
+    pagination_class = FeedPagination
+
+    def get_queryset(self):
+        return self.get_recipe_queryset()
+
+
+class RecipeChangesAPIView(RecipeQuerysetMixin, generics.ListAPIView):
+    """Recipes saved and deleted since a cursor, for offline clients.
+
+    Read from the primary, as a lagging replica would let a cursor move
+    past changes it has not received yet.
+    """
+
+    serializer_class = RecipeSerializer
+    permission_classes = [permissions.AllowAny]
+    pagination_class = ChangesPagination
+
+    def get_queryset(self):
+        return self.get_recipe_queryset()
+
+
+class DownloadShoppingCartAPIView(
+    ReplicaReadMixin, SlowQueryLogMixin, views.APIView
+):
     permission_classes = [permissions.IsAuthenticated]
     item_template = "{name} ({unit}) - {amount}"
 
-    def get(self, request, *args, **kwargs):
-        Favorite.objects.all().values()
-        shopping_list = request.user.shopping_cart.values(
+    def get_shopping_list(self):
+        return self.request.user.shopping_cart.values(
             "recipe__ingredients__ingredient"
         ).annotate(
             name=F("recipe__ingredients__ingredient__name"),
             unit=F("recipe__ingredients__ingredient__measurement_unit"),
             amount=Sum("recipe__ingredients__amount"),
         )
+
+    def get(self, request, *args, **kwargs):
+        return self.get_file_response(self.get_shopping_list())
+
+    def get_file_response(self, shopping_list):
         shopping_list_text = "\n".join(
             [self.item_template.format(**item) for item in shopping_list]
         )
@@ -189,6 +290,80 @@ class DownloadShoppingCartAPIView(views.APIView):
         return response
 
 
+class AsyncDownloadShoppingCartAPIView(
+    AsyncViewMixin, DownloadShoppingCartAPIView
+):
+    async def get(self, request, *args, **kwargs):
+        shopping_list = [item async for item in self.get_shopping_list()]
+        return self.get_file_response(shopping_list)
+
+
+class ImageUploadAPIView(generics.CreateAPIView):
+    serializer_class = ImageUploadSerializer
+    permission_classes = [permissions.IsAuthenticated]
+
+
+class ImageUploadDetailAPIView(generics.RetrieveAPIView):
+    """Receives the chunks of a resumable upload.
+
+    Every PUT carries a `Content-Range: bytes start-end/total` header and
+    must start where the previous chunk ended, otherwise 409 is returned
+    together with the offset the client should resume from.
+    """
+
+    serializer_class = ImageUploadSerializer
+    permission_classes = [permissions.IsAuthenticated]
+    parser_classes = [ChunkParser]
+    lookup_field = "token"
+
+    def get_queryset(self):
+        return self.request.user.image_uploads.filter(
+            expires_at__gt=timezone.now()
+        )
+
+    def put(self, request, *args, **kwargs):
+        upload = self.get_object()
+        if not hasattr(request.data, "read"):
+            # DRF does not run the parser for an empty body
+            raise ParseError("The request has no chunk.")
+        start, end, total = parse_content_range(
+            request.headers.get("Content-Range")
+        )
+        if total != upload.size or end >= upload.size:
+            raise ParseError("Content-Range does not match the upload size.")
+        if start != upload.offset:
+            return self.conflict(upload)
+        written = write_chunk(
+            upload.path, request.data, start, end - start + 1
+        )
+        # compare-and-set instead of a row lock held during the transfer
+        updated = ImageUpload.objects.filter(
+            pk=upload.pk, offset=start
+        ).update(offset=F("offset") + written)
+        upload.refresh_from_db(fields=["offset"])
+        if not updated:
+            return self.conflict(upload)
+        return response.Response(self.get_serializer(upload).data)
+
+    def conflict(self, upload):
+        return response.Response(
+            self.get_serializer(upload).data,
+            status=status.HTTP_409_CONFLICT,
+        )
+
+
+def metrics(request):
+    """Prometheus scrape endpoint aggregating all worker processes."""
+    if not settings.METRICS_TOKEN or not constant_time_compare(
+        request.headers.get("Authorization", ""),
+        f"Bearer {settings.METRICS_TOKEN}",
+    ):
+        return HttpResponseForbidden()
+    return HttpResponse(
+        collect(), content_type="text/plain; version=0.0.4; charset=utf-8"
+    )
+
+
 class FavoritesAPIView(UserCollectionsMixin, views.APIView):
     model = Favorite
     serializer_class = FavoriteSerializer
@@ -1,7 +1,9 @@
 import pytest
 from djoser.conf import settings
 
+from api.throttling import AuthEmailRateThrottle, AuthIPRateThrottle
 from foodgram_backend.constants import DEFAULT_CHAR_FIELD_LENGTH
+from invalidation.bus import invalidation_bus
 from recipes.models import (
     Favorite,
     Ingredient,
@@ -10,9 +12,24 @@ from recipes.models import (
     ShoppingCart,
     Tag,
 )
+from recipes.reference import reference_ingredients, reference_tags
 from users.models import Subscription
 
 
+@pytest.fixture(autouse=True)
+def reset_auth_throttles():
+    for throttle in (AuthIPRateThrottle, AuthEmailRateThrottle):
+        if throttle.cache is not None:
+            throttle.cache.clear()
+
+
+@pytest.fixture(autouse=True)
+def reset_local_caches():
+    invalidation_bus.reset()
+    for table in (reference_tags, reference_ingredients):
+        table.clear()
+
+
 @pytest.fixture
 def test_user_email():
     return "sandwitch@royal.com"
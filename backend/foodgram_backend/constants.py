@@ -5,3 +5,6 @@ USER_LAST_NAME_MAX_LENGTH = 150
 USER_EMAIL_MAX_LENGTH = 254
 HEX_COLOR_LENGTH = 7
 MIN_INGREDIENT_AMOUNT = 1
+FEED_FANOUT_BATCH_SIZE = 1000
+FEED_FANOUT_MAX_SUBSCRIBERS = 5000
+FEED_BACKFILL_SIZE = 100
@@ -0,0 +1,97 @@
+"""PostgreSQL backend borrowing its connections from a process-wide pool.
+
+Configured by the POOL dict of a DATABASES entry:
+
+    "POOL": {
+        "MIN_SIZE": 2,
+        "MAX_SIZE": 10,
+        "TIMEOUT": 5,
+        "IDLE_TIMEOUT": 300,
+    }
+
+Django closes a connection at the end of every request when
+CONN_MAX_AGE is 0, which here returns it to the pool instead. Every
+thread keeps its own DatabaseWrapper, so sync, threaded and uvicorn
+workers all check connections out of the same pool of their process.
+"""
+
+from threading import Lock
+
+from django.db.backends.postgresql import base
+from psycopg2 import extensions
+
+from api.metrics import registry
+from foodgram_backend.db_pool.pool import ConnectionPool, PoolTimeout
+
+IDLE = extensions.TRANSACTION_STATUS_IDLE
+
+pools = {}
+pools_lock = Lock()
+
+
+def close_connection(connection):
+    connection.close()
+
+
+def check_connection(connection):
+    if connection.closed:
+        return False
+    try:
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT 1")
+        if connection.info.transaction_status != IDLE:
+            connection.rollback()
+    except base.Database.Error:
+        return False
+    return True
+
+
+def get_pool(alias, settings_dict):
+    # the test runner switches NAME to the test database
+    key = (alias, settings_dict["NAME"])
+    with pools_lock:
+        pool = pools.get(key)
+        if pool is None:
+            options = settings_dict.get("POOL", {})
+            pool = pools[key] = ConnectionPool(
+                close=close_connection,
+                check=check_connection,
+                min_size=options.get("MIN_SIZE", 2),
+                max_size=options.get("MAX_SIZE", 10),
+                timeout=options.get("TIMEOUT", 5),
+                idle_timeout=options.get("IDLE_TIMEOUT", 300),
+                labels={"alias": alias, "database": settings_dict["NAME"]},
+            )
+            registry.register_collector(pool.collect)
+        return pool
+
+
+class DatabaseWrapper(base.DatabaseWrapper):
+    @property
+    def pool(self):
+        return get_pool(self.alias, self.settings_dict)
+
+    def get_new_connection(self, conn_params):
+        parent = super()
+        try:
+            return self.pool.getconn(
+                lambda: parent.get_new_connection(conn_params)
+            )
+        except PoolTimeout as e:
+            raise base.Database.OperationalError(str(e)) from e
+
+    def _close(self):
+        if self.connection is None:
+            return
+        connection = self.connection
+        # closed inside atomic() the wrapper keeps its connection, so it
+        # must not be handed to another thread
+        discard = bool(connection.closed) or self.in_atomic_block
+        if not discard:
+            try:
+                # the next borrower must not inherit an open transaction
+                if connection.info.transaction_status != IDLE:
+                    connection.rollback()
+            except base.Database.Error:
+                discard = True
+        self.pool.putconn(connection, discard=discard)
@@ -0,0 +1,183 @@
+import os
+from collections import deque
+from threading import Condition
+from time import monotonic, perf_counter
+
+from api.metrics import registry
+
+
+class PoolTimeout(Exception):
+    pass
+
+
+class ConnectionPool:
+    """Thread-safe pool of database connections of one process.
+
+    At most `max_size` connections are open at once; a checkout waits up
+    to `timeout` seconds for one to be returned before PoolTimeout is
+    raised. Idle connections are reused newest first and checked with
+    `check` before they are handed out. Connections idle for longer than
+    `idle_timeout` are closed, but never below `min_size`. A forked
+    process starts with an empty pool and never touches the sockets
+    inherited from its parent.
+    """
+
+    def __init__(
+        self,
+        close,
+        check,
+        min_size,
+        max_size,
+        timeout,
+        idle_timeout,
+        labels=None,
+    ):
+        self.close = close
+        self.check = check
+        self.min_size = min_size
+        self.max_size = max_size
+        self.timeout = timeout
+        self.idle_timeout = idle_timeout
+        self.labels = labels or {}
+        self._condition = Condition()
+        self._pid = None
+        self._reset()
+
+    def _reset(self):
+        self._idle = deque()
+        self._borrowed = set()
+        self.size = 0
+        self.waiting = 0
+
+    def _ensure_process(self):
+        pid = os.getpid()
+        if pid != self._pid:
+            self._pid = pid
+            self._reset()
+
+    @property
+    def in_use(self):
+        return self.size - len(self._idle)
+
+    def _lend(self, connection):
+        with self._condition:
+            self._borrowed.add(connection)
+        return connection
+
+    def getconn(self, connect):
+        """Returns an idle connection or one opened by calling connect."""
+        started_at = perf_counter()
+        deadline = monotonic() + self.timeout
+        while True:
+            connection = self._checkout(deadline)
+            if connection is None:
+                break
+            if self.check(connection):
+                self._observe_wait(started_at)
+                return self._lend(connection)
+            self._discard(connection)
+        try:
+            connection = connect()
+        except BaseException:
+            with self._condition:
+                self.size -= 1
+                self._condition.notify()
+            raise
+        self._observe_wait(started_at)
+        return self._lend(connection)
+
+    def _checkout(self, deadline):
+        """Returns an idle connection or None after reserving a new one."""
+        with self._condition:
+            self._ensure_process()
+            self._close_expired()
+            while True:
+                if self._idle:
+                    connection, _ = self._idle.pop()
+                    return connection
+                if self.size < self.max_size:
+                    self.size += 1
+                    return None
+                remaining = deadline - monotonic()
+                if remaining <= 0:
+                    registry.inc(
+                        "foodgram_db_pool_timeouts_total", self.labels
+                    )
+                    raise PoolTimeout(
+                        f"No connection available in {self.timeout}s, "
+                        f"all {self.max_size} are in use"
+                    )
+                self.waiting += 1
+                try:
+                    self._condition.wait(remaining)
+                finally:
+                    self.waiting -= 1
+
+    def _close_expired(self):
+        # the oldest idle connections are at the left end
+        expires_before = monotonic() - self.idle_timeout
+        while (
+            self._idle
+            and self.size > self.min_size
+            and self._idle[0][1] < expires_before
+        ):
+            connection, _ = self._idle.popleft()
+            self.size -= 1
+            self._close_quietly(connection)
+
+    def _observe_wait(self, started_at):
+        registry.observe(
+            "foodgram_db_pool_wait_seconds",
+            self.labels,
+            perf_counter() - started_at,
+        )
+
+    def putconn(self, connection, discard=False):
+        with self._condition:
+            self._ensure_process()
+            if connection not in self._borrowed:
+                # checked out before a fork, the parent still owns it
+                return
+            self._borrowed.remove(connection)
+            if discard:
+                self.size -= 1
+            else:
+                self._idle.append((connection, monotonic()))
+                self._close_expired()
+            self._condition.notify()
+        if discard:
+            self._close_quietly(connection)
+
+    def _discard(self, connection):
+        with self._condition:
+            self.size -= 1
+            self._condition.notify()
+        self._close_quietly(connection)
+
+    def _close_quietly(self, connection):
+        try:
+            self.close(connection)
+        except Exception:
+            pass
+
+    def collect(self):
+        labels = self.labels
+        with self._condition:
+            self._ensure_process()
+            idle, in_use = len(self._idle), self.in_use
+            waiting = self.waiting
+        return [
+            (
+                "foodgram_db_pool_connections",
+                {**labels, "state": "idle"},
+                idle,
+            ),
+            (
+                "foodgram_db_pool_connections",
+                {**labels, "state": "in_use"},
+                in_use,
+            ),
+            ("foodgram_db_pool_max_connections", labels, self.max_size),
+            ("foodgram_db_pool_waiting", labels, waiting),
+            ("foodgram_db_pool_saturation", labels, in_use / self.max_size),
+        ]
@@ -35,14 +35,18 @@ INSTALLED_APPS = [
     "users",
     "recipes",
     "api",
+    "invalidation",
 ]
 
 MIDDLEWARE = [
+    "api.middleware.MetricsMiddleware",
+    "api.middleware.RequestInstrumentationMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
     "django.contrib.auth.middleware.AuthenticationMiddleware",
+    "api.middleware.ReadYourWritesMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
 ]
@@ -67,6 +71,11 @@ TEMPLATES = [
 
 WSGI_APPLICATION = "foodgram_backend.wsgi.application"
 
+# "asgi" runs uvicorn workers (see gunicorn.conf.py) and serves the read
+# endpoints of tags, ingredients, recipes and the shopping list with
+# async views
+ASYNC_VIEWS = os.getenv("SERVER_MODE") == "asgi"
+
 DATABASES = {
     "default": {
         "ENGINE": "django.db.backends.postgresql",
@@ -75,6 +84,53 @@ DATABASES = {
         "PASSWORD": os.getenv("POSTGRES_PASSWORD", ""),
         "HOST": os.getenv("DB_HOST", ""),
         "PORT": os.getenv("DB_PORT", 5432),
+        "CONN_MAX_AGE": int(os.getenv("DB_CONN_MAX_AGE", 0)),
+        "CONN_HEALTH_CHECKS": True,
+    }
+}
+
+if os.getenv("DB_POOL") == "True":
+    # connections return to the pool at the end of every request
+    DATABASES["default"].update(
+        ENGINE="foodgram_backend.db_pool",
+        CONN_MAX_AGE=0,
+        POOL={
+            "MIN_SIZE": int(os.getenv("DB_POOL_MIN_SIZE", 2)),
+            "MAX_SIZE": int(os.getenv("DB_POOL_MAX_SIZE", 10)),
+            "TIMEOUT": float(os.getenv("DB_POOL_TIMEOUT", 5)),
+            "IDLE_TIMEOUT": float(os.getenv("DB_POOL_IDLE_TIMEOUT", 300)),
+        },
+    )
+
+# comma separated host[:port] of read replicas of the default database,
+# DB_REPLICA_NAME points them at another database, e.g. a second local
+# one kept in sync with logical replication
+DATABASE_REPLICAS = []
+for number, address in enumerate(
+    filter(None, os.getenv("DB_REPLICA_HOSTS", "").split(","))
+):
+    host, _, port = address.strip().partition(":")
+    alias = f"replica_{number}"
+    DATABASES[alias] = {
+        **DATABASES["default"],
+        "HOST": host,
+        "PORT": port or DATABASES["default"]["PORT"],
+        "NAME": os.getenv("DB_REPLICA_NAME", DATABASES["default"]["NAME"]),
+        "TEST": {"MIRROR": "default"},
+    }
+    DATABASE_REPLICAS.append(alias)
+
+DATABASE_ROUTERS = ["api.replicas.ReplicaRouter"]
+# how long a user reads from the primary after a write
+READ_YOUR_WRITES_SECONDS = int(os.getenv("READ_YOUR_WRITES_SECONDS", 5))
+
+CACHES = {
+    "default": {
+        "BACKEND": os.getenv(
+            "DJANGO_CACHE_BACKEND",
+            "django.core.cache.backends.locmem.LocMemCache",
+        ),
+        "LOCATION": os.getenv("DJANGO_CACHE_LOCATION", ""),
     }
 }
 
@@ -103,12 +159,43 @@ USE_TZ = True
 
 AUTH_USER_MODEL = "users.FoodgramUser"
 
+AUTHENTICATION_BACKENDS = ["api.backends.PooledHashingModelBackend"]
+
 STATIC_URL = "backend_static/"
 STATIC_ROOT = BASE_DIR / "static/backend_static/"
 
 MEDIA_URL = "/media/"
 MEDIA_ROOT = BASE_DIR / "media/"
 
+STORAGES = {
+    "default": {
+        "BACKEND": "django.core.files.storage.FileSystemStorage",
+    },
+    "staticfiles": {
+        "BACKEND": "django.contrib.staticfiles.storage.StaticFilesStorage",
+    },
+    "recipe_images": {
+        "BACKEND": os.getenv(
+            "RECIPE_IMAGE_STORAGE",
+            "recipes.storage.ContentAddressedStorage",
+        ),
+    },
+}
+
+# uploaded files are always streamed to disk instead of memory
+FILE_UPLOAD_HANDLERS = [
+    "django.core.files.uploadhandler.TemporaryFileUploadHandler",
+]
+IMAGE_VARIANT_WORKERS = int(os.getenv("IMAGE_VARIANT_WORKERS", 1))
+CHUNKED_UPLOAD_ROOT = os.getenv("CHUNKED_UPLOAD_ROOT", BASE_DIR / "uploads/")
+CHUNKED_UPLOAD_MAX_SIZE = int(
+    os.getenv("CHUNKED_UPLOAD_MAX_SIZE", 20 * 1024 * 1024)
+)
+# unused uploads expire after CHUNKED_UPLOAD_TTL seconds and are removed
+# by the delete_expired_uploads command
+CHUNKED_UPLOAD_TTL = int(os.getenv("CHUNKED_UPLOAD_TTL", 24 * 60 * 60))
+CHUNKED_UPLOAD_MAX_PER_USER = int(os.getenv("CHUNKED_UPLOAD_MAX_PER_USER", 5))
+
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
 REST_FRAMEWORK = {
@@ -116,11 +203,100 @@ REST_FRAMEWORK = {
         "rest_framework.permissions.IsAuthenticated",
     ],
     "DEFAULT_AUTHENTICATION_CLASSES": [
-        "rest_framework.authentication.TokenAuthentication",
+        "api.authentication.CachedTokenAuthentication",
+    ],
+    "DEFAULT_RENDERER_CLASSES": [
+        "api.renderers.ORJSONRenderer",
+        "api.renderers.MessagePackRenderer",
+        "rest_framework.renderers.BrowsableAPIRenderer",
+    ],
+    "DEFAULT_PARSER_CLASSES": [
+        "api.parsers.ORJSONParser",
+        "api.parsers.MessagePackParser",
+        "rest_framework.parsers.FormParser",
+        "rest_framework.parsers.MultiPartParser",
     ],
     "DEFAULT_FILTER_BACKENDS": [
         "django_filters.rest_framework.DjangoFilterBackend"
     ],
     "DEFAULT_PAGINATION_CLASS": "api.pagination.CustomPageNumberPagination",
     "PAGE_SIZE": 10,
+    "DEFAULT_THROTTLE_RATES": {
+        "auth_ip": os.getenv("AUTH_IP_THROTTLE_RATE", "30/min"),
+        "auth_email": os.getenv("AUTH_EMAIL_THROTTLE_RATE", "10/min"),
+    },
+}
+
+DJOSER = {
+    "SERIALIZERS": {
+        "token_create": "api.serializers.TokenCreateSerializer",
+    },
+}
+
+# how often a worker checks whether its in-process caches are still
+# current, see invalidation.bus
+CACHE_BUS_CHECK_SECONDS = float(os.getenv("CACHE_BUS_CHECK_SECONDS", 1))
+
+# anonymous recipe responses are cached for RESPONSE_CACHE_TTL seconds,
+# 0 disables the cache, then served stale for RESPONSE_CACHE_STALE_SECONDS
+# more while they are refreshed in the background
+RESPONSE_CACHE_TTL = int(os.getenv("RESPONSE_CACHE_TTL", 0))
+RESPONSE_CACHE_STALE_SECONDS = int(
+    os.getenv("RESPONSE_CACHE_STALE_SECONDS", 30)
+)
+# how long a request waits for another worker computing the same response
+RESPONSE_CACHE_WAIT_SECONDS = float(
+    os.getenv("RESPONSE_CACHE_WAIT_SECONDS", 5)
+)
+RESPONSE_CACHE_REFRESH_WORKERS = int(
+    os.getenv("RESPONSE_CACHE_REFRESH_WORKERS", 2)
+)
+
+# most recipes a client may fetch at once with /api/recipes/?ids=
+RECIPE_BATCH_MAX_SIZE = int(os.getenv("RECIPE_BATCH_MAX_SIZE", 100))
+# recipe changes are synced once they are this old, which has to exceed
+# the longest transaction writing recipes
+RECIPE_CHANGES_SETTLE_SECONDS = int(
+    os.getenv("RECIPE_CHANGES_SETTLE_SECONDS", 5)
+)
+
+TOKEN_CACHE_MAX_SIZE = int(os.getenv("TOKEN_CACHE_MAX_SIZE", 10000))
+TOKEN_CACHE_LOCAL_TTL = int(os.getenv("TOKEN_CACHE_LOCAL_TTL", 10))
+TOKEN_CACHE_TTL = int(os.getenv("TOKEN_CACHE_TTL", 300))
+
+PASSWORD_HASHING_WORKERS = int(os.getenv("PASSWORD_HASHING_WORKERS", 2))
+PASSWORD_HASHING_MAX_PENDING = int(
+    os.getenv("PASSWORD_HASHING_MAX_PENDING", 32)
+)
+AUTH_THROTTLE_MAX_KEYS = int(os.getenv("AUTH_THROTTLE_MAX_KEYS", 100000))
+
+REQUEST_INSTRUMENTATION_SAMPLE_RATE = float(
+    os.getenv("REQUEST_INSTRUMENTATION_SAMPLE_RATE", 0)
+)
+REQUEST_INSTRUMENTATION_LOG_MS = int(
+    os.getenv("REQUEST_INSTRUMENTATION_LOG_MS", 200)
+)
+
+METRICS_ENABLED = os.getenv("METRICS_ENABLED") == "True"
+# shared by all workers of a deployment, should be emptied on start
+METRICS_DIR = os.getenv("METRICS_DIR", "/tmp/foodgram-metrics")
+METRICS_FLUSH_INTERVAL = int(os.getenv("METRICS_FLUSH_INTERVAL", 5))
+METRICS_TOKEN = os.getenv("METRICS_TOKEN")
+
+SLOW_QUERY_THRESHOLD_MS = int(os.getenv("SLOW_QUERY_THRESHOLD_MS", 500))
+SLOW_QUERY_EXPLAIN_SAMPLE_RATE = float(
+    os.getenv("SLOW_QUERY_EXPLAIN_SAMPLE_RATE", 0)
+)
+SLOW_QUERY_LOG_SIZE = int(os.getenv("SLOW_QUERY_LOG_SIZE", 100))
+SLOW_QUERY_DIR = os.getenv("SLOW_QUERY_DIR", "/tmp/foodgram-slow-queries")
+
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "handlers": {
+        "console": {"class": "logging.StreamHandler"},
+    },
+    "loggers": {
+        "api.middleware": {"handlers": ["console"], "level": "INFO"},
+    },
 }
@@ -0,0 +1,34 @@
+"""Gunicorn settings of the backend container.
+
+SERVER_MODE=asgi runs uvicorn workers on the ASGI application, where
+the read endpoints are served by async views, the default runs sync
+workers on the WSGI application. worker_exit flushes the metrics of an
+exiting worker and child_exit archives them (see api/metrics.py).
+"""
+
+import os
+
+bind = "0.0.0.0:8000"
+workers = int(os.getenv("GUNICORN_WORKERS", 1))
+
+if os.getenv("SERVER_MODE") == "asgi":
+    wsgi_app = "foodgram_backend.asgi:application"
+    worker_class = "uvicorn.workers.UvicornWorker"
+else:
+    wsgi_app = "foodgram_backend.wsgi:application"
+
+
+def worker_exit(server, worker):
+    from api.metrics import registry
+
+    if registry.enabled:
+        registry.flush()
+
+
+def child_exit(server, worker):
+    os.environ.setdefault(
+        "DJANGO_SETTINGS_MODULE", "foodgram_backend.settings"
+    )
+    from api.metrics import registry
+
+    registry.archive(worker.pid)
@@ -0,0 +1,9 @@
+from django.apps import AppConfig
+
+
+class InvalidationConfig(AppConfig):
+    default_auto_field = "django.db.models.BigAutoField"
+    name = "invalidation"
+
+    def ready(self):
+        from invalidation import signals  # noqa: F401
@@ -0,0 +1,114 @@
+"""Invalidation of per-process caches across workers.
+
+Writers publish keys, each key has a version counter in the CacheVersion
+table that is incremented once the writing transaction commits. Workers
+read the whole table, a handful of rows, at most every
+CACHE_BUS_CHECK_SECONDS and call the callbacks subscribed to the keys
+whose version changed. A cache that polls before it serves a value
+therefore never serves one older than the last poll.
+
+Keys are the labels of the models, e.g. "recipes.tag".
+"""
+
+from collections import defaultdict
+from threading import Lock
+from time import monotonic
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.db.models import F
+
+from invalidation.models import CacheVersion
+
+
+def get_model_key(model):
+    return model._meta.label_lower
+
+
+def bump_versions(keys):
+    for key in sorted(keys):
+        updated = CacheVersion.objects.filter(key=key).update(
+            version=F("version") + 1
+        )
+        if updated:
+            continue
+        try:
+            with transaction.atomic():
+                CacheVersion.objects.create(key=key, version=1)
+        except IntegrityError:
+            # created by a concurrent writer in the meantime
+            CacheVersion.objects.filter(key=key).update(
+                version=F("version") + 1
+            )
+
+
+class PendingKeys:
+    """on_commit callback publishing the keys of one transaction."""
+
+    def __init__(self, bus):
+        self.bus = bus
+        self.keys = set()
+
+    def __call__(self):
+        bump_versions(self.keys)
+        # the writer sees its own changes on its next read
+        self.bus.expire()
+
+
+class InvalidationBus:
+    def __init__(self):
+        self._lock = Lock()
+        self._subscribers = defaultdict(list)
+        self._versions = None
+        self._check_at = 0.0
+
+    def subscribe(self, key, callback):
+        self._subscribers[key].append(callback)
+
+    def publish(self, *keys):
+        """Bumps the versions of keys once the transaction commits.
+
+        Keys published in the same transaction are bumped once.
+        """
+        connection = transaction.get_connection()
+        if connection.in_atomic_block:
+            for _, callback, *_ in connection.run_on_commit:
+                if isinstance(callback, PendingKeys):
+                    callback.keys.update(keys)
+                    return
+        pending = PendingKeys(self)
+        pending.keys.update(keys)
+        transaction.on_commit(pending)
+
+    def poll(self):
+        """Runs the callbacks of the keys changed since the last poll."""
+        if monotonic() < self._check_at:
+            return
+        with self._lock:
+            if monotonic() < self._check_at:
+                return
+            versions = dict(CacheVersion.objects.values_list("key", "version"))
+            previous, self._versions = self._versions, versions
+            self._check_at = monotonic() + settings.CACHE_BUS_CHECK_SECONDS
+            if previous is None:
+                return
+            for key in previous.keys() | versions.keys():
+                if previous.get(key) != versions.get(key):
+                    for callback in self._subscribers[key]:
+                        callback()
+
+    def version(self, key):
+        self.poll()
+        return self._versions.get(key, 0)
+
+    def expire(self):
+        """Makes the next poll read the versions."""
+        self._check_at = 0.0
+
+    def reset(self):
+        with self._lock:
+            self._versions = None
+            self._check_at = 0.0
+
+
+invalidation_bus = InvalidationBus()
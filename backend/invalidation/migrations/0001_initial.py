@@ -0,0 +1,35 @@
+# Generated by Django 4.2.9 on 2026-10-19 09:47
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = []
+
+    operations = [
+        migrations.CreateModel(
+            name="CacheVersion",
+            fields=[
+                (
+                    "key",
+                    models.CharField(
+                        max_length=200,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="key",
+                    ),
+                ),
+                (
+                    "version",
+                    models.PositiveBigIntegerField(default=0, verbose_name="version"),
+                ),
+            ],
+            options={
+                "verbose_name": "Cache version",
+                "verbose_name_plural": "Cache versions",
+            },
+        ),
+    ]
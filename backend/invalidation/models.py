@@ -0,0 +1,19 @@
+from django.db import models
+
+from foodgram_backend.constants import DEFAULT_CHAR_FIELD_LENGTH
+
+
+class CacheVersion(models.Model):
+    key = models.CharField(
+        max_length=DEFAULT_CHAR_FIELD_LENGTH,
+        primary_key=True,
+        verbose_name="key",
+    )
+    version = models.PositiveBigIntegerField(default=0, verbose_name="version")
+
+    class Meta:
+        verbose_name = "Cache version"
+        verbose_name_plural = "Cache versions"
+
+    def __str__(self):
+        return f"{self.key} - {self.version}"
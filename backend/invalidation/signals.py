@@ -0,0 +1,20 @@
+from django.db.models.signals import post_delete, post_save
+
+from invalidation.bus import get_model_key, invalidation_bus
+from recipes.models import Ingredient, Recipe, Tag
+
+# only the models some cache depends on: the reference data and the
+# recipe response cache. Tags and ingredients of a recipe are only
+# changed along with the recipe itself, so they publish no keys of their
+# own. Favorites, carts and subscriptions are per-user and not cached,
+# publishing them would only add writes to the CacheVersion rows.
+PUBLISHED_MODELS = (Recipe, Tag, Ingredient)
+
+
+def publish_change(sender, **kwargs):
+    invalidation_bus.publish(get_model_key(sender))
+
+
+for model in PUBLISHED_MODELS:
+    post_save.connect(publish_change, sender=model)
+    post_delete.connect(publish_change, sender=model)
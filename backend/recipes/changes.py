@@ -0,0 +1,52 @@
+"""Change log of recipes for clients that keep an offline copy.
+
+Saved recipes carry their updated_at and deleted ones leave a
+RecipeTombstone, so every change has a (changed_at, recipe_id) key and
+the changes after a key are read with index range scans over both.
+"""
+
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import BooleanField, Q, Value
+from django.utils import timezone
+
+from recipes.models import Recipe, RecipeTombstone
+
+
+def _after_cursor(cursor, time_field, id_field):
+    if cursor is None:
+        return Q()
+    changed_at, pk = cursor
+    return Q(**{f"{time_field}__gte": changed_at}) & ~Q(
+        **{time_field: changed_at, f"{id_field}__lte": pk}
+    )
+
+
+def read_changes(cursor=None, limit=100):
+    """Returns up to `limit` (changed_at, recipe_id, deleted) changes.
+
+    Changes are ordered from the oldest to the newest and start strictly
+    after `cursor`, which is the key of a change returned before.
+    Changes younger than RECIPE_CHANGES_SETTLE_SECONDS are left for a
+    later call, as transactions still running may commit older ones.
+    """
+    settled = timezone.now() - timedelta(
+        seconds=settings.RECIPE_CHANGES_SETTLE_SECONDS
+    )
+    saved = (
+        Recipe.objects.filter(_after_cursor(cursor, "updated_at", "id"))
+        .filter(updated_at__lte=settled)
+        .annotate(deleted=Value(False, output_field=BooleanField()))
+        .values_list("updated_at", "id", "deleted")
+    )
+    deleted = (
+        RecipeTombstone.objects.filter(
+            _after_cursor(cursor, "deleted_at", "recipe_id")
+        )
+        .filter(deleted_at__lte=settled)
+        .annotate(deleted=Value(True, output_field=BooleanField()))
+        .values_list("deleted_at", "recipe_id", "deleted")
+    )
+    changes = saved.order_by().union(deleted.order_by(), all=True)
+    return list(changes.order_by("updated_at", "id")[:limit])
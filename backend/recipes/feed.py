@@ -0,0 +1,144 @@
+"""Subscription feed built from per-subscriber timelines.
+
+New recipes are pushed (fan-out-on-write) into the FeedEntry timeline
+of every subscriber of their author. Authors that once had more
+subscribers than FEED_FANOUT_MAX_SUBSCRIBERS are flagged fanout_on_read:
+their recipes are skipped on write and merged into the feed when it is
+read (fan-out-on-read).
+"""
+
+from itertools import islice
+
+from django.contrib.auth import get_user_model
+from django.db import connections
+from django.db.models import Q
+
+from foodgram_backend.constants import (
+    FEED_BACKFILL_SIZE,
+    FEED_FANOUT_BATCH_SIZE,
+    FEED_FANOUT_MAX_SUBSCRIBERS,
+)
+from recipes.models import FeedEntry, Recipe
+from users.models import Subscription
+
+User = get_user_model()
+
+
+def is_fanout_on_read(author_id):
+    """Returns True if the author's recipes are merged into feeds on read."""
+    return User.objects.filter(pk=author_id, fanout_on_read=True).exists()
+
+
+def update_fanout_on_read(author_id):
+    """Flags an author with too many subscribers to fan out.
+
+    Returns True if the author has been flagged. The flag is never
+    cleared, so the recipes an author published while flagged keep being
+    merged into feeds after the number of subscribers drops below the
+    threshold again.
+    """
+    if not Subscription.objects.filter(author_id=author_id)[
+        FEED_FANOUT_MAX_SUBSCRIBERS:
+    ].exists():
+        return False
+    User.objects.filter(pk=author_id).update(fanout_on_read=True)
+    return True
+
+
+def fan_out_recipe(recipe):
+    """Pushes a recipe into the timelines of its author's subscribers."""
+    if is_fanout_on_read(recipe.author_id):
+        return
+    subscriber_ids = (
+        Subscription.objects.filter(author_id=recipe.author_id)
+        .values_list("user_id", flat=True)
+        .iterator(chunk_size=FEED_FANOUT_BATCH_SIZE)
+    )
+    while batch := list(islice(subscriber_ids, FEED_FANOUT_BATCH_SIZE)):
+        FeedEntry.objects.bulk_create(
+            [
+                FeedEntry(
+                    user_id=user_id,
+                    recipe=recipe,
+                    created_at=recipe.created_at,
+                )
+                for user_id in batch
+            ],
+            ignore_conflicts=True,
+        )
+
+
+def backfill_timeline(user_id, author_id):
+    """Copies the latest recipes of a new subscription into a timeline."""
+    if is_fanout_on_read(author_id) or update_fanout_on_read(author_id):
+        return
+    recipes = Recipe.objects.filter(author_id=author_id).values_list(
+        "pk", "created_at"
+    )[:FEED_BACKFILL_SIZE]
+    FeedEntry.objects.bulk_create(
+        [
+            FeedEntry(user_id=user_id, recipe_id=pk, created_at=created_at)
+            for pk, created_at in recipes
+        ],
+        ignore_conflicts=True,
+    )
+
+
+def prune_timeline(user_id, author_id):
+    """Removes an author's recipes from a subscriber's timeline."""
+    FeedEntry.objects.filter(
+        user_id=user_id, recipe__author_id=author_id
+    ).delete()
+
+
+def _before_cursor(cursor, field):
+    if cursor is None:
+        return Q()
+    created_at, pk = cursor
+    return Q(created_at__lt=created_at) | Q(
+        created_at=created_at, **{f"{field}__lt": pk}
+    )
+
+
+def read_feed(user, cursor=None, limit=10):
+    """Returns up to `limit` (created_at, recipe_id) keys of a user feed.
+
+    Keys are ordered from the newest to the oldest and start strictly
+    after `cursor`, which is a key returned by a previous call. The
+    timeline and the recipes of the fan-out-on-read authors the user
+    follows are read in a single statement.
+    """
+    timeline = (
+        FeedEntry.objects.filter(_before_cursor(cursor, "recipe_id"))
+        .filter(user=user)
+        .order_by("-created_at", "-recipe_id")
+        .values_list("created_at", "recipe_id")
+    )
+    fanout_on_read = (
+        Recipe.objects.filter(_before_cursor(cursor, "pk"))
+        .filter(
+            author__in=user.subscriptions.filter(
+                author__fanout_on_read=True
+            ).values("author_id")
+        )
+        .order_by("-created_at", "-pk")
+        .values_list("created_at", "pk")
+    )
+    if connections[timeline.db].features.supports_slicing_ordering_in_compound:
+        # each side stops after `limit` rows of its index range scan
+        timeline = timeline[:limit]
+        fanout_on_read = fanout_on_read[:limit]
+    else:
+        timeline = timeline.order_by()
+        fanout_on_read = fanout_on_read.order_by()
+    merged = timeline.union(fanout_on_read).order_by(
+        "-created_at", "-recipe_id"
+    )[:limit]
+    keys = []
+    seen = set()
+    # a recipe pushed before its author was flagged is in both sources
+    for key in merged:
+        if key[1] not in seen:
+            seen.add(key[1])
+            keys.append(key)
+    return keys
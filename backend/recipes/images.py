@@ -0,0 +1,127 @@
+"""Resized WebP/JPEG variants of recipe images.
+
+Variants are rendered off the request path: after a recipe with a new
+image is committed, the work is handed to a small thread pool. The
+render step is a pure function of the image bytes, so the backfill
+command can run it in a process pool.
+"""
+
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+from pathlib import PurePosixPath
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.db import close_old_connections, transaction
+from django.utils import timezone
+from PIL import Image, ImageOps
+
+from recipes.models import Recipe
+from recipes.storage import recipe_image_storage
+
+logger = logging.getLogger(__name__)
+
+VARIANT_SIZES = {
+    "thumbnail": (160, 160),
+    "card": (480, 480),
+    "full": (1280, 1280),
+}
+VARIANT_FORMATS = {
+    "webp": ("WEBP", {"quality": 80, "method": 4}),
+    "jpeg": ("JPEG", {"quality": 85, "optimize": True, "progressive": True}),
+}
+VARIANTS_DIR = "recipes/variants"
+
+_executor = ThreadPoolExecutor(
+    max_workers=settings.IMAGE_VARIANT_WORKERS,
+    thread_name_prefix="image-variants",
+)
+
+
+class InvalidImage(Exception):
+    pass
+
+
+def render_variants(data):
+    """Returns {variant: {format: bytes}} for the bytes of an image.
+
+    The image is verified first. Variants are re-encoded from pixel data
+    only, so EXIF, ICC profiles and other metadata are not carried over.
+    """
+    try:
+        Image.open(BytesIO(data)).verify()
+        # verify() leaves the image unusable, so it is opened again
+        source = ImageOps.exif_transpose(Image.open(BytesIO(data)))
+    except (OSError, SyntaxError, Image.DecompressionBombError) as e:
+        raise InvalidImage(str(e)) from e
+    rendered = {}
+    for variant, size in VARIANT_SIZES.items():
+        image = source.copy()
+        image.thumbnail(size, Image.Resampling.LANCZOS)
+        rendered[variant] = {}
+        for extension, (image_format, options) in VARIANT_FORMATS.items():
+            converted = image.convert(
+                "RGBA"
+                if image_format == "WEBP" and "A" in image.getbands()
+                else "RGB"
+            )
+            buffer = BytesIO()
+            converted.save(buffer, image_format, **options)
+            rendered[variant][extension] = buffer.getvalue()
+    return rendered
+
+
+def save_variants(recipe_id, image_name, rendered):
+    """Stores rendered variants and records them on the recipe.
+
+    The recipe is only updated if its image has not been replaced in the
+    meantime.
+    """
+    storage = recipe_image_storage()
+    stem = PurePosixPath(image_name).stem
+    variants = {"source": image_name}
+    for variant, formats in rendered.items():
+        variants[variant] = {}
+        for extension, content in formats.items():
+            name = storage.save(
+                f"{VARIANTS_DIR}/{stem}_{variant}.{extension}",
+                ContentFile(content),
+            )
+            variants[variant][extension] = name
+    Recipe.objects.filter(pk=recipe_id, image=image_name).update(
+        image_variants=variants, updated_at=timezone.now()
+    )
+    return variants
+
+
+def generate_variants(recipe):
+    with recipe.image.open("rb") as file:
+        rendered = render_variants(file.read())
+    return save_variants(recipe.pk, recipe.image.name, rendered)
+
+
+def _generate_variants_task(recipe_id):
+    close_old_connections()
+    try:
+        recipe = Recipe.objects.get(pk=recipe_id)
+        generate_variants(recipe)
+    except Recipe.DoesNotExist:
+        pass
+    except Exception:
+        logger.exception("Failed to render variants of recipe %s", recipe_id)
+    finally:
+        close_old_connections()
+
+
+def needs_variants(recipe):
+    return bool(recipe.image) and (
+        recipe.image_variants.get("source") != recipe.image.name
+    )
+
+
+def schedule_variants(recipe):
+    """Renders the variants in the background once the save is committed."""
+    transaction.on_commit(
+        lambda: _executor.submit(_generate_variants_task, recipe.pk)
+    )
@@ -0,0 +1,36 @@
+import csv
+from io import StringIO
+from itertools import islice
+
+from django.db import connection
+
+
+def insert_rows(model, fields, rows, progress=None, batch_size=100000):
+    """Inserts tuples of field values into the table of a model.
+
+    On PostgreSQL the rows are streamed with COPY, other databases fall
+    back to bulk_create. Returns the number of inserted rows.
+    """
+    columns = [model._meta.get_field(field).column for field in fields]
+    count = 0
+    rows = iter(rows)
+    while batch := list(islice(rows, batch_size)):
+        if connection.vendor == "postgresql":
+            buffer = StringIO()
+            csv.writer(buffer).writerows(batch)
+            buffer.seek(0)
+            with connection.cursor() as cursor:
+                cursor.copy_expert(
+                    f"COPY {model._meta.db_table} ({', '.join(columns)}) "
+                    "FROM STDIN WITH (FORMAT csv)",
+                    buffer,
+                )
+        else:
+            model.objects.bulk_create(
+                [model(**dict(zip(fields, row))) for row in batch],
+                batch_size=1000,
+            )
+        count += len(batch)
+        if progress is not None:
+            progress.advance(len(batch))
+    return count
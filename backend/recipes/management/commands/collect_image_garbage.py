@@ -0,0 +1,66 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandParser
+from django.utils import timezone
+
+from recipes.models import Recipe
+from recipes.storage import recipe_image_storage
+
+
+class Command(BaseCommand):
+    help = "Delete stored recipe images that no recipe references"
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument(
+            "--grace-seconds",
+            type=int,
+            default=3600,
+            help="Keep unreferenced files younger than this, they may "
+            "belong to a recipe that is being saved",
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Only report the files that would be deleted",
+        )
+
+    def handle(self, *args, **options):
+        storage = recipe_image_storage()
+        referenced = self.get_referenced_names()
+        threshold = timezone.now() - timedelta(
+            seconds=options["grace_seconds"]
+        )
+        deleted_count = 0
+        for name in self.walk(storage, "recipes"):
+            if name in referenced:
+                continue
+            if storage.get_modified_time(name) > threshold:
+                continue
+            if options["dry_run"]:
+                self.stdout.write(name)
+            else:
+                storage.delete(name)
+            deleted_count += 1
+        verb = "Would delete" if options["dry_run"] else "Deleted"
+        self.stdout.write(
+            self.style.SUCCESS(f"{verb} {deleted_count} unreferenced files")
+        )
+
+    def get_referenced_names(self):
+        referenced = set()
+        recipes = Recipe.objects.values_list("image", "image_variants")
+        for image, variants in recipes.iterator(chunk_size=5000):
+            referenced.add(image)
+            for variant, formats in variants.items():
+                if variant != "source":
+                    referenced.update(formats.values())
+        return referenced
+
+    def walk(self, storage, path):
+        if not storage.exists(path):
+            return
+        directories, files = storage.listdir(path)
+        for file_name in files:
+            yield f"{path}/{file_name}"
+        for directory in directories:
+            yield from self.walk(storage, f"{path}/{directory}")
@@ -0,0 +1,43 @@
+from datetime import timedelta
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from recipes.models import ImageUpload
+
+
+class Command(BaseCommand):
+    help = "Delete expired chunked uploads and their files"
+
+    def handle(self, *args, **options):
+        """Deletes the expired uploads, their files go with them.
+
+        Part files that no upload references, like those of uploads
+        deleted before files were removed on delete, are deleted once
+        they are older than CHUNKED_UPLOAD_TTL.
+        """
+        now = timezone.now()
+        deleted_count, _ = ImageUpload.objects.filter(
+            expires_at__lte=now
+        ).delete()
+        tokens = {
+            str(token)
+            for token in ImageUpload.objects.values_list("token", flat=True)
+        }
+        threshold = (
+            now - timedelta(seconds=settings.CHUNKED_UPLOAD_TTL)
+        ).timestamp()
+        orphan_count = 0
+        for path in Path(settings.CHUNKED_UPLOAD_ROOT).glob("*.part"):
+            if path.stem in tokens or path.stat().st_mtime > threshold:
+                continue
+            path.unlink(missing_ok=True)
+            orphan_count += 1
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Deleted {deleted_count} expired uploads "
+                f"and {orphan_count} orphaned files"
+            )
+        )
@@ -0,0 +1,87 @@
+import json
+
+from django.core.management.base import BaseCommand, CommandParser
+from django.db.models import Prefetch
+
+from recipes.management.progress import ProgressReporter
+from recipes.models import Recipe, RecipeIngredientAmount
+
+
+class Command(BaseCommand):
+    help = "Export recipes as JSON Lines"
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument(
+            "output_file",
+            type=str,
+            nargs="?",
+            default="-",
+            help="Path to the output file, stdout by default",
+        )
+        parser.add_argument(
+            "--chunk-size",
+            type=int,
+            default=2000,
+            help="Number of recipes fetched from the cursor at once",
+        )
+
+    def handle(self, *args, **options):
+        # progress goes to stderr, so that stdout can carry the export
+        progress = ProgressReporter(self.stderr, "Exported")
+        output = options["output_file"]
+        file = self.stdout if output == "-" else open(output, "w")
+        try:
+            for recipe in self.get_recipes().iterator(
+                chunk_size=options["chunk_size"]
+            ):
+                file.write(json.dumps(self.serialize(recipe)) + "\n")
+                progress.advance()
+        finally:
+            if file is not self.stdout:
+                file.close()
+        progress.finish()
+
+    def get_recipes(self):
+        # iterator() reads through a server-side cursor on PostgreSQL
+        # and runs the prefetches once per chunk
+        return (
+            Recipe.objects.select_related("author")
+            .only(
+                "name",
+                "text",
+                "cooking_time",
+                "image",
+                "created_at",
+                "author__email",
+            )
+            .prefetch_related(
+                Prefetch("tags", to_attr="tag_list"),
+                Prefetch(
+                    "ingredients",
+                    queryset=RecipeIngredientAmount.objects.select_related(
+                        "ingredient"
+                    ),
+                    to_attr="ingredient_list",
+                ),
+            )
+            .order_by("pk")
+        )
+
+    def serialize(self, recipe):
+        return {
+            "name": recipe.name,
+            "text": recipe.text,
+            "cooking_time": recipe.cooking_time,
+            "image": recipe.image.name,
+            "created_at": recipe.created_at.isoformat(),
+            "author": recipe.author.email,
+            "tags": [tag.slug for tag in recipe.tag_list],
+            "ingredients": [
+                [
+                    amount.ingredient.name,
+                    amount.ingredient.measurement_unit,
+                    amount.amount,
+                ]
+                for amount in recipe.ingredient_list
+            ],
+        }
@@ -0,0 +1,229 @@
+import random
+from datetime import datetime, timedelta, timezone
+from io import BytesIO, StringIO
+from itertools import accumulate
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.contrib.auth.hashers import make_password
+from django.core.files.base import ContentFile
+from django.core.management import call_command
+from django.core.management.base import BaseCommand, CommandParser
+from django.db.transaction import atomic
+from PIL import Image
+
+from recipes.management.bulk import insert_rows
+from recipes.management.progress import ProgressReporter
+from recipes.models import (
+    Favorite,
+    Ingredient,
+    Recipe,
+    RecipeIngredientAmount,
+    ShoppingCart,
+    Tag,
+)
+from recipes.storage import recipe_image_storage
+from users.models import Subscription
+
+User = get_user_model()
+
+DATASET_START = datetime(2024, 1, 1, tzinfo=timezone.utc)
+DATASET_PERIOD_SECONDS = 365 * 24 * 60 * 60
+
+
+class Command(BaseCommand):
+    help = "Generate a synthetic dataset of production scale"
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument("--users", type=int, default=1000)
+        parser.add_argument("--recipes-per-author", type=int, default=10)
+        parser.add_argument(
+            "--authors-share",
+            type=float,
+            default=0.2,
+            help="Share of the users that publish recipes",
+        )
+        parser.add_argument("--ingredients-per-recipe", type=int, default=8)
+        parser.add_argument("--favorites", type=int, default=10000)
+        parser.add_argument("--cart-items", type=int, default=5000)
+        parser.add_argument("--subscriptions", type=int, default=5000)
+        parser.add_argument(
+            "--zipf-exponent",
+            type=float,
+            default=1.1,
+            help="Skew of recipe and author popularity",
+        )
+        parser.add_argument("--seed", type=int, default=0)
+        parser.add_argument(
+            "--data-dir",
+            type=str,
+            default=settings.BASE_DIR.parent / "data",
+            help="Directory with ingredients.csv and tags.json",
+        )
+
+    def handle(self, *args, **options):
+        self.options = options
+        self.rng = random.Random(options["seed"])
+        self.load_reference_data(options["data_dir"])
+        with atomic():
+            user_ids = self.create_users()
+            author_ids = user_ids[
+                : max(1, int(len(user_ids) * options["authors_share"]))
+            ]
+            recipe_ids = self.create_recipes(author_ids)
+            self.create_collection(Favorite, user_ids, recipe_ids, "favorites")
+            self.create_collection(
+                ShoppingCart, user_ids, recipe_ids, "cart_items"
+            )
+            self.create_subscriptions(user_ids, author_ids)
+        self.stdout.write(self.style.SUCCESS("Dataset generated"))
+
+    def load_reference_data(self, data_dir):
+        quiet = StringIO()
+        call_command(
+            "load_ingredients", f"{data_dir}/ingredients.csv", stdout=quiet
+        )
+        call_command("load_tags", f"{data_dir}/tags.json", stdout=quiet)
+        self.tag_ids = list(
+            Tag.objects.order_by("pk").values_list("pk", flat=True)
+        )
+        self.ingredient_ids = list(
+            Ingredient.objects.order_by("pk").values_list("pk", flat=True)
+        )
+
+    def zipf_sampler(self, population):
+        """Returns a function drawing k items with Zipf-like popularity.
+
+        Ranks are assigned in random order, so popularity does not
+        follow primary keys.
+        """
+        ranked = list(population)
+        self.rng.shuffle(ranked)
+        exponent = self.options["zipf_exponent"]
+        cum_weights = list(
+            accumulate(
+                1 / rank**exponent for rank in range(1, len(ranked) + 1)
+            )
+        )
+        return lambda k: self.rng.choices(ranked, cum_weights=cum_weights, k=k)
+
+    def create_users(self):
+        seed = self.options["seed"]
+        # one hash for all users keeps generation fast and deterministic
+        password = make_password(f"dataset-{seed}", salt=f"dataset{seed}")
+        users = [
+            User(
+                username=f"dataset{seed}_{i}",
+                email=f"dataset{seed}_{i}@example.com",
+                first_name=f"User{i}",
+                last_name=f"Dataset{seed}",
+                password=password,
+            )
+            for i in range(self.options["users"])
+        ]
+        User.objects.bulk_create(users, batch_size=5000)
+        self.stdout.write(f"Created {len(users)} users")
+        return [user.pk for user in users]
+
+    def get_image_name(self):
+        buffer = BytesIO()
+        Image.new("RGB", (640, 480), (200, 120, 40)).save(buffer, "PNG")
+        # content addressed storage stores the image only once
+        return recipe_image_storage().save(
+            "recipes/dataset.png", ContentFile(buffer.getvalue())
+        )
+
+    def create_recipes(self, author_ids):
+        image = self.get_image_name()
+        progress = ProgressReporter(self.stdout, "Recipes")
+        recipes = []
+        for author_index, author_id in enumerate(author_ids):
+            for i in range(self.options["recipes_per_author"]):
+                offset = self.rng.randrange(DATASET_PERIOD_SECONDS)
+                recipes.append(
+                    Recipe(
+                        author_id=author_id,
+                        name=f"Recipe {author_index}-{i}",
+                        text=" ".join(
+                            self.rng.choices(("salt", "stir", "bake"), k=50)
+                        ),
+                        cooking_time=self.rng.randint(5, 180),
+                        image=image,
+                        created_at=DATASET_START + timedelta(seconds=offset),
+                    )
+                )
+        Recipe.objects.bulk_create(recipes, batch_size=5000)
+        progress.advance(len(recipes))
+        progress.finish()
+        recipe_ids = [recipe.pk for recipe in recipes]
+        tags_count = insert_rows(
+            Recipe.tags.through,
+            ("recipe_id", "tag_id"),
+            (
+                (recipe_id, tag_id)
+                for recipe_id in recipe_ids
+                for tag_id in self.rng.sample(
+                    self.tag_ids,
+                    min(len(self.tag_ids), self.rng.randint(1, 3)),
+                )
+            ),
+        )
+        per_recipe = min(
+            self.options["ingredients_per_recipe"], len(self.ingredient_ids)
+        )
+        amounts_count = insert_rows(
+            RecipeIngredientAmount,
+            ("recipe_id", "ingredient_id", "amount"),
+            (
+                (recipe_id, ingredient_id, self.rng.randint(1, 500))
+                for recipe_id in recipe_ids
+                for ingredient_id in self.rng.sample(
+                    self.ingredient_ids, per_recipe
+                )
+            ),
+        )
+        self.stdout.write(
+            f"Linked {tags_count} tags and {amounts_count} ingredients"
+        )
+        return recipe_ids
+
+    def distribute(self, total, user_ids, limit):
+        """Yields (user_id, count) spreading `total` items over users."""
+        per_user, remainder = divmod(total, len(user_ids))
+        for i, user_id in enumerate(user_ids):
+            yield user_id, min(limit, per_user + (i < remainder))
+
+    def draw_distinct(self, sample, count, exclude=None):
+        drawn = set()
+        while len(drawn) < count:
+            drawn.update(sample(count - len(drawn)))
+            drawn.discard(exclude)
+        return drawn
+
+    def create_collection(self, model, user_ids, recipe_ids, option):
+        sample = self.zipf_sampler(recipe_ids)
+        progress = ProgressReporter(self.stdout, model._meta.verbose_name)
+        rows = (
+            (user_id, recipe_id, DATASET_START)
+            for user_id, count in self.distribute(
+                self.options[option], user_ids, len(recipe_ids)
+            )
+            for recipe_id in self.draw_distinct(sample, count)
+        )
+        insert_rows(
+            model, ("user_id", "recipe_id", "created_at"), rows, progress
+        )
+        progress.finish()
+
+    def create_subscriptions(self, user_ids, author_ids):
+        sample = self.zipf_sampler(author_ids)
+        progress = ProgressReporter(self.stdout, "Subscriptions")
+        rows = (
+            (user_id, author_id)
+            for user_id, count in self.distribute(
+                self.options["subscriptions"], user_ids, len(author_ids) - 1
+            )
+            for author_id in self.draw_distinct(sample, count, user_id)
+        )
+        insert_rows(Subscription, ("user_id", "author_id"), rows, progress)
+        progress.finish()
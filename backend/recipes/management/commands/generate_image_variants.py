@@ -0,0 +1,87 @@
+import os
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+
+from django.core.management.base import BaseCommand, CommandParser
+from django.db import connections
+
+from recipes.images import needs_variants, render_variants, save_variants
+from recipes.models import Recipe
+
+
+class Command(BaseCommand):
+    help = "Render resized image variants for existing recipes"
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=os.cpu_count(),
+            help="Number of rendering processes",
+        )
+        parser.add_argument(
+            "--all",
+            action="store_true",
+            help="Re-render variants that already exist",
+        )
+
+    def handle(self, *args, **options):
+        recipes = [
+            (recipe.pk, recipe.image.name)
+            for recipe in Recipe.objects.exclude(image="")
+            .only("pk", "image", "image_variants")
+            .iterator()
+            if options["all"] or needs_variants(recipe)
+        ]
+        # forked workers must not share the parent's connections
+        connections.close_all()
+        rendered_count = failed_count = 0
+        max_in_flight = options["workers"] * 2
+        with ProcessPoolExecutor(max_workers=options["workers"]) as pool:
+            in_flight = {}
+            for recipe_id, image_name in recipes:
+                if len(in_flight) >= max_in_flight:
+                    rendered, failed = self.collect(in_flight)
+                    rendered_count += rendered
+                    failed_count += failed
+                try:
+                    content = self.read(image_name)
+                except OSError as e:
+                    failed_count += 1
+                    self.report_failure(recipe_id, e)
+                    continue
+                future = pool.submit(render_variants, content)
+                in_flight[future] = (recipe_id, image_name)
+            while in_flight:
+                rendered, failed = self.collect(in_flight)
+                rendered_count += rendered
+                failed_count += failed
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Rendered variants for {rendered_count} recipes, "
+                f"{failed_count} failed"
+            )
+        )
+
+    def read(self, image_name):
+        recipe = Recipe(image=image_name)
+        with recipe.image.open("rb") as file:
+            return file.read()
+
+    def collect(self, in_flight):
+        """Saves the variants of finished renders and forgets them."""
+        done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+        rendered = failed = 0
+        for future in done:
+            recipe_id, image_name = in_flight.pop(future)
+            try:
+                save_variants(recipe_id, image_name, future.result())
+            except Exception as e:
+                # a single broken image must not abort the backfill
+                failed += 1
+                self.report_failure(recipe_id, e)
+            else:
+                rendered += 1
+        return rendered, failed
+
+    def report_failure(self, recipe_id, error):
+        self.stdout.write(self.style.ERROR(f"Recipe {recipe_id}: {error!r}"))
@@ -0,0 +1,145 @@
+import sys
+from datetime import datetime
+from itertools import islice
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandParser
+from django.db.transaction import atomic
+
+from recipes.management.progress import ProgressReporter
+from recipes.management.readers import iter_json_lines
+from recipes.models import Ingredient, Recipe, RecipeIngredientAmount, Tag
+
+User = get_user_model()
+
+
+class Command(BaseCommand):
+    help = "Import recipes from JSON Lines made by export_recipes"
+
+    def add_arguments(self, parser: CommandParser) -> None:
+        parser.add_argument(
+            "input_file",
+            type=str,
+            nargs="?",
+            default="-",
+            help="Path to the input file, stdin by default",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=1000,
+            help="Number of recipes inserted per transaction",
+        )
+
+    def handle(self, *args, **options):
+        """Inserts recipes in batches with bulk_create.
+
+        Memory use is bounded by the batch size. Malformed lines and
+        recipes of unknown authors or with unknown tags or ingredients
+        are skipped. As
+        bulk_create sends no signals, imported recipes are not pushed to
+        subscription feeds and get no image variants until
+        generate_image_variants is run.
+        """
+        self.tags = dict(Tag.objects.values_list("slug", "pk"))
+        self.ingredients = {
+            (name, unit): pk
+            for pk, name, unit in Ingredient.objects.values_list(
+                "pk", "name", "measurement_unit"
+            ).iterator()
+        }
+        self.skipped_count = 0
+        progress = ProgressReporter(self.stderr, "Imported")
+        input_path = options["input_file"]
+        file = sys.stdin if input_path == "-" else open(input_path, "r")
+        try:
+            rows = iter_json_lines(file, on_error=self.skip_line)
+            while batch := list(islice(rows, options["batch_size"])):
+                progress.advance(self.import_batch(batch))
+        finally:
+            if file is not sys.stdin:
+                file.close()
+        progress.finish()
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Imported {progress.count} recipes, "
+                f"skipped {self.skipped_count}"
+            )
+        )
+
+    def skip(self, name, reason):
+        self.skipped_count += 1
+        self.stderr.write(f"Skipped {name!r}: {reason}")
+
+    def skip_line(self, number, error):
+        self.skip(f"line {number}", error)
+
+    def skip_row(self, row, reason):
+        self.skip(row.get("name") if isinstance(row, dict) else row, reason)
+
+    def parse_row(self, row):
+        """Returns the author email, the recipe and its tags and amounts.
+
+        Raises KeyError, ValueError or TypeError if the row is malformed
+        or refers to an unknown tag or ingredient.
+        """
+        if not isinstance(row["author"], str):
+            raise TypeError("author is not an email")
+        tag_ids = [self.tags[slug] for slug in row["tags"]]
+        amounts = [
+            (self.ingredients[(name, unit)], amount)
+            for name, unit, amount in row["ingredients"]
+        ]
+        recipe = Recipe(
+            name=row["name"],
+            text=row["text"],
+            cooking_time=row["cooking_time"],
+            image=row["image"],
+            created_at=datetime.fromisoformat(row["created_at"]),
+        )
+        return row["author"], recipe, (tag_ids, amounts)
+
+    @atomic
+    def import_batch(self, batch):
+        parsed = []
+        for row in batch:
+            try:
+                parsed.append(self.parse_row(row))
+            except KeyError as e:
+                self.skip_row(row, f"{e} unknown")
+            except (ValueError, TypeError) as e:
+                self.skip_row(row, e)
+        authors = dict(
+            User.objects.filter(
+                email__in={author for author, _, _ in parsed}
+            ).values_list("email", "pk")
+        )
+        recipes, relations = [], []
+        for author, recipe, relation in parsed:
+            if author not in authors:
+                self.skip(recipe.name, f"{author!r} unknown")
+                continue
+            recipe.author_id = authors[author]
+            recipes.append(recipe)
+            relations.append(relation)
+        Recipe.objects.bulk_create(recipes)
+        RecipeTag = Recipe.tags.through
+        RecipeTag.objects.bulk_create(
+            [
+                RecipeTag(recipe_id=recipe.pk, tag_id=tag_id)
+                for recipe, (tag_ids, _) in zip(recipes, relations)
+                for tag_id in tag_ids
+            ]
+        )
+        RecipeIngredientAmount.objects.bulk_create(
+            [
+                RecipeIngredientAmount(
+                    recipe_id=recipe.pk,
+                    ingredient_id=ingredient_id,
+                    amount=amount,
+                )
+                for recipe, (_, amounts) in zip(recipes, relations)
+                for ingredient_id, amount in amounts
+            ]
+        )
+        return len(recipes)
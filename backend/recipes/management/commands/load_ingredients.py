@@ -1,51 +1,118 @@
-import json
+from itertools import islice
+from pathlib import Path
 
-from django.core.exceptions import ValidationError
 from django.core.management.base import BaseCommand, CommandParser
+from django.db.transaction import atomic
 
+from foodgram_backend.constants import DEFAULT_CHAR_FIELD_LENGTH
+from recipes.management.readers import iter_csv_rows, iter_json_array
 from recipes.models import Ingredient
+from recipes.reference import reference_ingredients
+
+FIELDS = ("name", "measurement_unit")
 
 
 class Command(BaseCommand):
-    help = "Load ingredients from ingredients.json"
+    help = "Load ingredients from a JSON or CSV file"
 
     def add_arguments(self, parser: CommandParser) -> None:
         parser.add_argument(
             "ingredients_file",
             type=str,
-            help="Path to ingredients.json",
+            help="Path to ingredients.json or ingredients.csv",
+        )
+        parser.add_argument(
+            "--format",
+            choices=("json", "csv"),
+            help="File format, guessed from the extension by default",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=5000,
+            help="Number of ingredients inserted per query",
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Report the ingredients that would be added",
         )
 
     def handle(self, *args, **options):
+        self.invalid_count = self.duplicate_count = 0
         try:
             with open(options["ingredients_file"], "r") as file:
-                ingredients = json.load(file)
-                db_ingredients = self.get_valid_ingrediends(ingredients)
-                Ingredient.objects.bulk_create(db_ingredients)
+                rows = self.read_rows(file, options)
+                ingredients = self.get_unique_ingredients(rows)
+                if options["dry_run"]:
+                    loaded_count = self.report_diff(ingredients)
+                else:
+                    loaded_count = self.upsert(
+                        ingredients, options["batch_size"]
+                    )
         except Exception as e:
             self.stdout.write(
                 self.style.ERROR(f"Failed to load ingredients. Error: {e}")
             )
         else:
+            verb = (
+                "Would load" if options["dry_run"] else "Successfully loaded"
+            )
             self.stdout.write(
                 self.style.SUCCESS(
-                    f"Successfully loaded {len(db_ingredients)} ingredients"
+                    f"{verb} {loaded_count} new ingredients, skipped "
+                    f"{self.duplicate_count} duplicates and "
+                    f"{self.invalid_count} invalid rows"
                 )
             )
 
-    def get_valid_ingrediends(self, ingredients):
-        db_ingredients = []
-        for ingredient in ingredients:
-            db_ingredient = Ingredient(**ingredient)
-            if self.validate_ingredient(db_ingredient):
-                db_ingredients.append(db_ingredient)
-        return db_ingredients
+    def read_rows(self, file, options):
+        file_format = options["format"] or Path(file.name).suffix[1:]
+        if file_format == "csv":
+            return iter_csv_rows(file, FIELDS)
+        if file_format == "json":
+            return iter_json_array(file)
+        raise ValueError(f"Unknown file format: {file_format}")
 
-    def validate_ingredient(self, ingredient):
-        try:
-            ingredient.validate_constraints()
-            ingredient.validate_unique()
-        except ValidationError:
-            pass
-        else:
-            return ingredient
+    def get_unique_ingredients(self, rows):
+        """Yields valid (name, measurement_unit) pairs once each."""
+        seen = set()
+        for row in rows:
+            key = tuple(str(row.get(field, "")).strip() for field in FIELDS)
+            if not all(key) or any(
+                len(value) > DEFAULT_CHAR_FIELD_LENGTH for value in key
+            ):
+                self.invalid_count += 1
+            elif key in seen:
+                self.duplicate_count += 1
+            else:
+                seen.add(key)
+                yield key
+
+    @atomic
+    def upsert(self, ingredients, batch_size):
+        # Ingredient has no columns besides the unique key, so an upsert
+        # is an insert that skips the rows already in the table
+        initial_count = Ingredient.objects.count()
+        while batch := list(islice(ingredients, batch_size)):
+            Ingredient.objects.bulk_create(
+                [
+                    Ingredient(name=name, measurement_unit=unit)
+                    for name, unit in batch
+                ],
+                ignore_conflicts=True,
+            )
+        # bulk_create() sends no signals
+        reference_ingredients.invalidate()
+        return Ingredient.objects.count() - initial_count
+
+    def report_diff(self, ingredients):
+        existing = set(Ingredient.objects.values_list(*FIELDS).iterator())
+        new_count = 0
+        for key in ingredients:
+            if key in existing:
+                self.duplicate_count += 1
+            else:
+                new_count += 1
+                self.stdout.write(f"+ {key[0]} ({key[1]})")
+        return new_count
@@ -4,6 +4,7 @@ from django.core.exceptions import ValidationError
 from django.core.management.base import BaseCommand, CommandParser
 
 from recipes.models import Tag
+from recipes.reference import reference_tags
 
 
 class Command(BaseCommand):
@@ -22,6 +23,7 @@ class Command(BaseCommand):
                 ingredients = json.load(file)
                 db_tags = self.get_valid_tags(ingredients)
                 Tag.objects.bulk_create(db_tags)
+                reference_tags.invalidate()
         except Exception as e:
             self.stdout.write(
                 self.style.ERROR(f"Failed to load tags. Error: {e}")
@@ -0,0 +1,33 @@
+from time import perf_counter
+
+
+class ProgressReporter:
+    """Writes the number of processed rows and the rate to a stream."""
+
+    def __init__(self, stream, label, every=10000):
+        self.stream = stream
+        self.label = label
+        self.every = every
+        self.count = 0
+        self.started_at = perf_counter()
+        self.reported_at = 0
+
+    @property
+    def rate(self):
+        elapsed = perf_counter() - self.started_at
+        return self.count / elapsed if elapsed else 0.0
+
+    def advance(self, count=1):
+        self.count += count
+        if self.count - self.reported_at >= self.every:
+            self.report()
+
+    def finish(self):
+        if self.count != self.reported_at:
+            self.report()
+
+    def report(self):
+        self.reported_at = self.count
+        self.stream.write(
+            f"{self.label}: {self.count} rows, {self.rate:.0f} rows/s"
+        )
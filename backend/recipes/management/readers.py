@@ -0,0 +1,66 @@
+import csv
+import json
+
+READ_CHUNK_SIZE = 64 * 1024
+
+
+def iter_json_array(file, chunk_size=READ_CHUNK_SIZE):
+    """Yields the items of a top-level JSON array without loading it.
+
+    The file is read in chunks and every item is decoded as soon as it
+    is complete, so memory use does not depend on the file size.
+    """
+    decoder = json.JSONDecoder()
+    buffer = ""
+    started = False
+    while True:
+        chunk = file.read(chunk_size)
+        buffer += chunk
+        position = 0
+        while True:
+            while position < len(buffer) and buffer[position] in " \t\r\n,":
+                position += 1
+            if position == len(buffer):
+                break
+            if not started:
+                if buffer[position] != "[":
+                    raise ValueError("Expected a JSON array")
+                started = True
+                position += 1
+                continue
+            if buffer[position] == "]":
+                return
+            try:
+                item, position = decoder.raw_decode(buffer, position)
+            except json.JSONDecodeError:
+                # the item is not complete yet
+                break
+            yield item
+        buffer = buffer[position:]
+        if not chunk:
+            raise ValueError("Unexpected end of JSON input")
+
+
+def iter_json_lines(file, on_error=None):
+    """Yields the decoded lines of a JSON Lines file.
+
+    A line that is not valid JSON raises ValueError, unless `on_error` is
+    given: it is then called with the line number and the error and the
+    line is skipped.
+    """
+    for number, line in enumerate(file, start=1):
+        if not line.strip():
+            continue
+        try:
+            yield json.loads(line)
+        except ValueError as e:
+            if on_error is None:
+                raise
+            on_error(number, e)
+
+
+def iter_csv_rows(file, fieldnames):
+    """Yields the rows of a headerless CSV file as dicts."""
+    for row in csv.reader(file):
+        if row:
+            yield dict(zip(fieldnames, row))
@@ -0,0 +1,94 @@
+# Generated by Django 4.2.9 on 2026-10-19 08:28
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def backfill_feeds(apps, schema_editor):
+    FeedEntry = apps.get_model("recipes", "FeedEntry")
+    Recipe = apps.get_model("recipes", "Recipe")
+    Subscription = apps.get_model("users", "Subscription")
+    for user_id, author_id in Subscription.objects.values_list(
+        "user_id", "author_id"
+    ).iterator():
+        recipes = Recipe.objects.filter(author_id=author_id).order_by("-created_at")[
+            :100
+        ]
+        FeedEntry.objects.bulk_create(
+            [
+                FeedEntry(
+                    user_id=user_id,
+                    recipe_id=recipe.pk,
+                    created_at=recipe.created_at,
+                )
+                for recipe in recipes
+            ],
+            ignore_conflicts=True,
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ("recipes", "0001_squashed_0003_alter_recipe_options"),
+        ("users", "0002_alter_foodgramuser_options"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="FeedEntry",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "created_at",
+                    models.DateTimeField(verbose_name="recipe date of creation"),
+                ),
+                (
+                    "recipe",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="feed_entries",
+                        to="recipes.recipe",
+                        verbose_name="recipe",
+                    ),
+                ),
+                (
+                    "user",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="feed",
+                        to=settings.AUTH_USER_MODEL,
+                        verbose_name="subscriber",
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Feed entry",
+                "verbose_name_plural": "Feed entries",
+                "ordering": ["-created_at", "-recipe"],
+                "indexes": [
+                    models.Index(
+                        fields=["user", "-created_at", "-recipe"],
+                        name="feed_user_created_idx",
+                    )
+                ],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name="feedentry",
+            constraint=models.UniqueConstraint(
+                fields=("user", "recipe"), name="unique_feed_entry"
+            ),
+        ),
+        migrations.RunPython(backfill_feeds, migrations.RunPython.noop),
+    ]
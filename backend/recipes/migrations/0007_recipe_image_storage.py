@@ -0,0 +1,23 @@
+# Generated by Django 4.2.9 on 2026-10-19 08:44
+
+from django.db import migrations, models
+import recipes.storage
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("recipes", "0006_recipe_image_variants"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="recipe",
+            name="image",
+            field=models.ImageField(
+                storage=recipes.storage.recipe_image_storage,
+                upload_to="recipes/",
+                verbose_name="image",
+            ),
+        ),
+    ]
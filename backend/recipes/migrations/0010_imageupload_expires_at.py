@@ -0,0 +1,23 @@
+# Generated by Django 4.2.9 on 2026-10-19 10:33
+
+from django.db import migrations, models
+import recipes.models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("recipes", "0009_recipe_changes"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="imageupload",
+            name="expires_at",
+            field=models.DateTimeField(
+                db_index=True,
+                default=recipes.models.get_upload_expiry,
+                verbose_name="date of expiry",
+            ),
+        ),
+    ]
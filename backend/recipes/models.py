@@ -1,7 +1,12 @@
+import uuid
+from datetime import timedelta
+from pathlib import Path
+
 from django.conf import settings
 from django.contrib.auth import get_user_model
 from django.core.validators import MinValueValidator
 from django.db import models
+from django.utils import timezone
 
 from foodgram_backend.constants import (
     DEFAULT_CHAR_FIELD_LENGTH,
@@ -9,6 +14,7 @@ from foodgram_backend.constants import (
     MIN_INGREDIENT_AMOUNT,
 )
 from recipes.mixins import CreatedAtMixin
+from recipes.storage import recipe_image_storage
 
 User = get_user_model()
 
@@ -82,23 +88,63 @@ class Recipe(CreatedAtMixin, models.Model):
     )
     image = models.ImageField(
         upload_to="recipes/",
+        storage=recipe_image_storage,
         verbose_name="image",
     )
+    image_variants = models.JSONField(
+        default=dict,
+        blank=True,
+        editable=False,
+        verbose_name="resized image variants",
+    )
     tags = models.ManyToManyField(
         Tag,
         related_name="recipes",
         verbose_name="tags",
     )
+    updated_at = models.DateTimeField("date of last change", auto_now=True)
 
     class Meta:
         verbose_name = "Recipe"
         verbose_name_plural = "Recipes"
+        indexes = [
+            models.Index(fields=["-created_at"], name="recipe_created_idx"),
+            models.Index(
+                fields=["author", "-created_at"],
+                name="recipe_author_created_idx",
+            ),
+            models.Index(
+                fields=["updated_at", "id"], name="recipe_updated_idx"
+            ),
+        ]
         ordering = ["-created_at"]
 
     def __str__(self):
         return self.name
 
 
+class RecipeTombstone(models.Model):
+    """Marks a deleted recipe for the clients syncing recipe changes."""
+
+    recipe_id = models.PositiveBigIntegerField(
+        unique=True, verbose_name="recipe id"
+    )
+    deleted_at = models.DateTimeField("date of deletion", default=timezone.now)
+
+    class Meta:
+        verbose_name = "Recipe tombstone"
+        verbose_name_plural = "Recipe tombstones"
+        indexes = [
+            models.Index(
+                fields=["deleted_at", "recipe_id"],
+                name="tombstone_deleted_idx",
+            )
+        ]
+
+    def __str__(self):
+        return f"{self.recipe_id} - {self.deleted_at}"
+
+
 class RecipeIngredientAmount(models.Model):
     recipe = models.ForeignKey(
         Recipe,
@@ -161,6 +207,12 @@ class ShoppingCart(UserCollection):
         verbose_name = "Shopping carts"
         verbose_name_plural = "Shopping cart items"
         default_related_name = "shopping_cart"
+        indexes = [
+            models.Index(
+                fields=["user", "-created_at"],
+                name="shoppingcart_user_created_idx",
+            )
+        ]
 
 
 class Favorite(UserCollection):
@@ -168,3 +220,97 @@ class Favorite(UserCollection):
         verbose_name = "Favorites"
         verbose_name_plural = "Favorite items"
         default_related_name = "favorites"
+        indexes = [
+            models.Index(
+                fields=["user", "-created_at"],
+                name="favorite_user_created_idx",
+            )
+        ]
+
+
+class FeedEntry(models.Model):
+    """A recipe pushed into a subscriber's timeline.
+
+    created_at is copied from the recipe so that a feed page is read
+    with a single index range scan over (user, created_at, recipe).
+    """
+
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name="feed",
+        verbose_name="subscriber",
+    )
+    recipe = models.ForeignKey(
+        Recipe,
+        on_delete=models.CASCADE,
+        related_name="feed_entries",
+        verbose_name="recipe",
+    )
+    created_at = models.DateTimeField("recipe date of creation")
+
+    class Meta:
+        verbose_name = "Feed entry"
+        verbose_name_plural = "Feed entries"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["user", "recipe"],
+                name="unique_feed_entry",
+            )
+        ]
+        indexes = [
+            models.Index(
+                fields=["user", "-created_at", "-recipe"],
+                name="feed_user_created_idx",
+            )
+        ]
+        ordering = ["-created_at", "-recipe"]
+
+    def __str__(self):
+        return f"{self.user} - {self.recipe}"
+
+
+def get_upload_expiry():
+    return timezone.now() + timedelta(seconds=settings.CHUNKED_UPLOAD_TTL)
+
+
+class ImageUpload(CreatedAtMixin, models.Model):
+    """A resumable chunked upload of a recipe image.
+
+    Chunks are written to a file under CHUNKED_UPLOAD_ROOT. Once the
+    upload is complete, its token can be used instead of an image in a
+    recipe payload. Uploads that are not used before expires_at are
+    removed by the delete_expired_uploads command, the file of a deleted
+    upload is removed by a post_delete receiver.
+    """
+
+    token = models.UUIDField(default=uuid.uuid4, unique=True, editable=False)
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name="image_uploads",
+        verbose_name="user",
+    )
+    size = models.PositiveIntegerField(verbose_name="size in bytes")
+    offset = models.PositiveIntegerField(
+        default=0, verbose_name="received bytes"
+    )
+    expires_at = models.DateTimeField(
+        "date of expiry", default=get_upload_expiry, db_index=True
+    )
+
+    class Meta:
+        verbose_name = "Image upload"
+        verbose_name_plural = "Image uploads"
+        ordering = ["-created_at"]
+
+    def __str__(self):
+        return f"{self.user} - {self.token}"
+
+    @property
+    def path(self):
+        return Path(settings.CHUNKED_UPLOAD_ROOT) / f"{self.token}.part"
+
+    @property
+    def completed(self):
+        return self.offset == self.size
@@ -0,0 +1,149 @@
+"""Process-wide read-only copies of the tags and ingredients.
+
+Both tables are small and almost never change, so every worker keeps
+them in memory as compact records indexed by id, tags also by slug.
+Changes are published on the invalidation bus: the process that made
+them reloads on its next read, other workers within
+CACHE_BUS_CHECK_SECONDS. bulk_create() sends no signals, code using it
+calls invalidate() itself.
+"""
+
+import asyncio
+from threading import Lock
+
+from django.db import DEFAULT_DB_ALIAS
+
+from invalidation.bus import get_model_key, invalidation_bus
+from recipes.models import Ingredient, Tag
+
+
+class Record:
+    """Immutable row of a reference table."""
+
+    __slots__ = ()
+    model = None
+
+    def __init__(self, *values):
+        for name, value in zip(self.__slots__, values):
+            object.__setattr__(self, name, value)
+
+    def __setattr__(self, name, value):
+        raise AttributeError(f"{type(self).__name__} is read-only")
+
+    def __delattr__(self, name):
+        raise AttributeError(f"{type(self).__name__} is read-only")
+
+    def __repr__(self):
+        values = ", ".join(
+            f"{name}={getattr(self, name)!r}" for name in self.__slots__
+        )
+        return f"{type(self).__name__}({values})"
+
+    @property
+    def pk(self):
+        return self.id
+
+    def to_model(self):
+        """Returns a model instance as if it was read from the database."""
+        return self.model.from_db(
+            DEFAULT_DB_ALIAS,
+            self.__slots__,
+            [getattr(self, name) for name in self.__slots__],
+        )
+
+
+class TagRecord(Record):
+    __slots__ = ("id", "name", "color", "slug")
+    model = Tag
+
+
+class IngredientRecord(Record):
+    __slots__ = ("id", "name", "measurement_unit")
+    model = Ingredient
+
+
+class Snapshot:
+    __slots__ = ("records", "by_id", "by_slug")
+
+    def __init__(self, records):
+        # in the default ordering of the model
+        self.records = records
+        self.by_id = {record.id: record for record in records}
+        self.by_slug = {
+            record.slug: record
+            for record in records
+            if hasattr(record, "slug")
+        }
+
+
+def in_event_loop():
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return False
+    return True
+
+
+class ReferenceTable:
+    """Snapshot of a reference table, dropped when its key is published."""
+
+    def __init__(self, record_class):
+        self.record_class = record_class
+        self.model = record_class.model
+        self.key = get_model_key(self.model)
+        self._lock = Lock()
+        self._snapshot = None
+        invalidation_bus.subscribe(self.key, self.clear)
+
+    def __deepcopy__(self, memo):
+        # serializer fields deep-copy their arguments
+        return self
+
+    def get(self):
+        """Returns the current snapshot, loading it when it is stale.
+
+        On an event loop a loaded snapshot is returned as is, async views
+        refresh it in a worker thread before serializing.
+        """
+        snapshot = self._snapshot
+        if snapshot is not None and in_event_loop():
+            return snapshot
+        invalidation_bus.poll()
+        with self._lock:
+            if self._snapshot is None:
+                self._snapshot = self.load()
+            return self._snapshot
+
+    def load(self):
+        fields = self.record_class.__slots__
+        return Snapshot(
+            tuple(
+                self.record_class(*row)
+                for row in self.model.objects.values_list(*fields)
+            )
+        )
+
+    def lookup(self, pk):
+        """Returns the record of pk, or the row if it is newer."""
+        record = self.get().by_id.get(pk)
+        if record is None:
+            return self.model.objects.filter(pk=pk).first()
+        return record
+
+    def invalidate(self):
+        """Publishes the key of the table once the transaction commits."""
+        invalidation_bus.publish(self.key)
+
+    def clear(self):
+        """Drops the snapshot of this process."""
+        with self._lock:
+            self._snapshot = None
+
+
+reference_tags = ReferenceTable(TagRecord)
+reference_ingredients = ReferenceTable(IngredientRecord)
+
+
+def refresh_reference_data():
+    for table in (reference_tags, reference_ingredients):
+        table.get()
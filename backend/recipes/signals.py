@@ -0,0 +1,40 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from recipes.feed import backfill_timeline, fan_out_recipe, prune_timeline
+from recipes.images import needs_variants, schedule_variants
+from recipes.models import ImageUpload, Recipe, RecipeTombstone
+from users.models import Subscription
+
+
+@receiver(post_save, sender=Recipe)
+def push_recipe_to_feeds(sender, instance, created, **kwargs):
+    if created:
+        fan_out_recipe(instance)
+
+
+@receiver(post_save, sender=Recipe)
+def render_image_variants(sender, instance, **kwargs):
+    if needs_variants(instance):
+        schedule_variants(instance)
+
+
+@receiver(post_delete, sender=Recipe)
+def bury_recipe(sender, instance, **kwargs):
+    RecipeTombstone.objects.create(recipe_id=instance.pk)
+
+
+@receiver(post_delete, sender=ImageUpload)
+def delete_upload_file(sender, instance, **kwargs):
+    instance.path.unlink(missing_ok=True)
+
+
+@receiver(post_save, sender=Subscription)
+def backfill_subscriber_feed(sender, instance, created, **kwargs):
+    if created:
+        backfill_timeline(instance.user_id, instance.author_id)
+
+
+@receiver(post_delete, sender=Subscription)
+def prune_subscriber_feed(sender, instance, **kwargs):
+    prune_timeline(instance.user_id, instance.author_id)
@@ -0,0 +1,45 @@
+import hashlib
+import os
+import posixpath
+
+from django.core.files.storage import FileSystemStorage, storages
+
+
+def recipe_image_storage():
+    return storages["recipe_images"]
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """Stores files under the SHA-256 of their content.
+
+    `recipes/photo.png` is saved as `recipes/ab/cd/abcd...ef.png`, so the
+    files are spread over 65536 small directories and a file that is
+    already stored is referenced again instead of being written twice.
+    Files are never overwritten, so deleting a blob is left to the
+    collect_image_garbage command.
+    """
+
+    def _save(self, name, content):
+        name = self.get_content_name(name, content)
+        if self.exists(name):
+            # restarts the grace period of collect_image_garbage for an
+            # orphaned blob that is referenced again
+            os.utime(self.path(name))
+            return name
+        return super()._save(name, content)
+
+    def get_content_name(self, name, content):
+        digest = hashlib.sha256()
+        content.seek(0)
+        for chunk in content.chunks():
+            digest.update(chunk)
+        content.seek(0)
+        content_hash = digest.hexdigest()
+        directory, file_name = posixpath.split(name)
+        _, extension = posixpath.splitext(file_name)
+        return posixpath.join(
+            directory,
+            content_hash[:2],
+            content_hash[2:4],
+            f"{content_hash}{extension.lower()}",
+        )
@@ -0,0 +1,31 @@
+# Generated by Django 4.2.9 on 2026-10-19 10:38
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def flag_fanout_on_read(apps, schema_editor):
+    FoodgramUser = apps.get_model("users", "FoodgramUser")
+    FoodgramUser.objects.annotate(subscribers_count=Count("subscribers")).filter(
+        subscribers_count__gt=5000
+    ).update(fanout_on_read=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("users", "0002_alter_foodgramuser_options"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="foodgramuser",
+            name="fanout_on_read",
+            field=models.BooleanField(
+                default=False,
+                editable=False,
+                verbose_name="recipes are merged into feeds on read",
+            ),
+        ),
+        migrations.RunPython(flag_fanout_on_read, migrations.RunPython.noop),
+    ]
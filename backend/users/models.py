@@ -29,6 +29,11 @@ class FoodgramUser(AbstractUser):
         max_length=USER_EMAIL_MAX_LENGTH,
         unique=True,
     )
+    fanout_on_read = models.BooleanField(
+        default=False,
+        editable=False,
+        verbose_name="recipes are merged into feeds on read",
+    )
 
     class Meta:
         verbose_name = "user"